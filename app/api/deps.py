@@ -8,9 +8,18 @@ from app.core.config import settings
 from app.db.mongodb import get_db
 from app.models import token as token_model
 from app.crud import customer, agent, admin
+from app.crud.loader import BatchLoader
 
 reusable_oauth2 = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
+
+def get_loader(db: AsyncIOMotorDatabase = Depends(get_db)) -> BatchLoader:
+    """
+    Batch loader shared by everything that runs within one request.
+    FastAPI caches dependencies per request, so all callers get the same instance.
+    """
+    return BatchLoader(db)
+
 async def get_current_user(
     db: AsyncIOMotorDatabase = Depends(get_db), token: str = Security(reusable_oauth2)
 ) -> dict:
@@ -1,14 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+import asyncio
+import json
+from enum import Enum
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Body
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from bson import ObjectId
 from typing import List, Optional
 
-from app.api.deps import get_current_admin
-from app.db.mongodb import get_db
+from app.api.deps import get_current_admin, get_loader
+from app.crud.loader import BatchLoader
+from app.db.mongodb import get_analytics_db, get_db
 from app.models.admin import AdminCreate, AdminInDB
 from app.crud import admin as crud_admin, customer as crud_customer, agent as crud_agent
+from app.crud import purchase_order as crud_purchase_order, sale_order as crud_sale_order
+from app.crud.crud_agent import AGENT_PROJECTION
+from app.crud.crud_order import ORDERS_CACHE_NAMESPACE, get_orders_page
+from app.crud.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, parse_fields
+from app.core.config import settings
 from app.core.security import get_password_hash
-from app.services.notification_service import create_and_dispatch_notification
+from app.services.notification_service import create_and_dispatch_notification, dispatch_notifications
 from app.models.admin import AdminCreate, AdminUpdate, AdminInDB, AdminOut
 from app.models.order import AllOrdersResponse, AgentOrdersResponse
+from app.utils.cache import cached
 
 router = APIRouter()
 
@@ -48,7 +61,8 @@ async def notify_users(
     message: str = Body(...),
     target_user_id: Optional[str] = Body(None, description="Specific user ID (customer or agent) to notify. If null, broadcasts to the target_group."),
     target_group: Optional[str] = Body(None, description="Group to notify ('customers' or 'agents'). Used if target_user_id is null."),
-    current_admin: dict = Depends(get_current_admin)
+    current_admin: dict = Depends(get_current_admin),
+    loader: BatchLoader = Depends(get_loader),
 ):
     """
     Send a notification from an admin to users.
@@ -56,8 +70,11 @@ async def notify_users(
     - If target_group ('customers' or 'agents') is provided, broadcasts to all users in that group.
     """
     if target_user_id:
-        # Find the specific user (check both collections)
-        user = await crud_customer.get(db, id=target_user_id) or await crud_agent.get(db, id=target_user_id)
+        # Find the specific user (probe both collections concurrently)
+        customer_doc, agent_doc = await asyncio.gather(
+            crud_customer.load(loader, target_user_id), crud_agent.load(loader, target_user_id)
+        )
+        user = customer_doc or agent_doc
         if not user:
             raise HTTPException(status_code=404, detail="Target user not found.")
         
@@ -71,13 +88,10 @@ async def notify_users(
         if target_group == "customers":
             users_to_notify = await db.customers.find().to_list(length=None)
         else: # target_group == "agents"
-            users_to_notify = await db.agents.find().to_list(length=None)
+            users_to_notify = await db.agents.find({}, AGENT_PROJECTION).to_list(length=None)
 
-        # Create a single broadcast notification record with target_user_id as null
-        # (This assumes create_and_dispatch_notification handles a null user_id for broadcast logging)
-        # For simplicity now, we will just iterate and create individual notifications.
-        for user in users_to_notify:
-            await create_and_dispatch_notification(db, user, subject, message)
+        # One notification per user, written in a single batch.
+        await dispatch_notifications(db, users_to_notify, subject, message)
             
     else:
         raise HTTPException(status_code=400, detail="Must provide either a 'target_user_id' or a valid 'target_group' ('customers' or 'agents').")
@@ -156,50 +170,107 @@ async def delete_admin(
 async def get_orders_linked_to_agent(
     agent_id: str,
     db=Depends(get_db),
-    current_admin: dict = Depends(get_current_admin)
+    current_admin: dict = Depends(get_current_admin),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    purchase_cursor: Optional[str] = None,
+    sale_cursor: Optional[str] = None,
 ):
     """
-    Get all orders a specific agent is linked to.
+    Get the orders a specific agent is linked to, one page at a time.
     """
-    purchase_orders = await db.purchase_orders.find({"linked_agents_ids": agent_id}).to_list(length=None)
-    sale_orders = await db.sale_orders.find({"linked_agents_ids": agent_id}).to_list(length=None)
-    return {"purchase_orders": purchase_orders, "sale_orders": sale_orders}
+    return await get_orders_page(
+        db, {"linked_agents_ids": agent_id},
+        limit=limit, purchase_cursor=purchase_cursor, sale_cursor=sale_cursor
+    )
 
 @router.get("/admin/orders/delivering/{agent_id}", response_model=AgentOrdersResponse)
 async def get_orders_delivered_by_agent(
     agent_id: str,
     db=Depends(get_db),
-    current_admin: dict = Depends(get_current_admin)
+    current_admin: dict = Depends(get_current_admin),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    purchase_cursor: Optional[str] = None,
+    sale_cursor: Optional[str] = None,
 ):
     """
-    Get all orders a specific agent is actively delivering.
+    Get the orders a specific agent is actively delivering, one page at a time.
     """
-    purchase_orders = await db.purchase_orders.find({"delivering_agent_id": agent_id}).to_list(length=None)
-    sale_orders = await db.sale_orders.find({"delivering_agent_id": agent_id}).to_list(length=None)
-    return {"purchase_orders": purchase_orders, "sale_orders": sale_orders}
+    return await get_orders_page(
+        db, {"delivering_agent_id": agent_id},
+        limit=limit, purchase_cursor=purchase_cursor, sale_cursor=sale_cursor
+    )
 
 
 @router.get("/admin/orders/undelivered", response_model=AllOrdersResponse)
+@cached(ORDERS_CACHE_NAMESPACE, ttl=settings.ORDER_LISTING_CACHE_SECONDS, key_params=("limit", "purchase_cursor", "sale_cursor"))
 async def get_all_undelivered_orders(
     db=Depends(get_db),
-    current_admin: dict = Depends(get_current_admin)
+    current_admin: dict = Depends(get_current_admin),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    purchase_cursor: Optional[str] = None,
+    sale_cursor: Optional[str] = None,
 ):
     """
-    Get all orders across the platform that have not yet been delivered.
+    Get the orders across the platform that have not yet been delivered,
+    one page at a time.
     """
-    purchase_orders = await db.purchase_orders.find({"isDelivered": False}).to_list(length=None)
-    sale_orders = await db.sale_orders.find({"isDelivered": False}).to_list(length=None)
-    return {"purchase_orders": purchase_orders, "sale_orders": sale_orders}
+    return await get_orders_page(
+        db, {"isDelivered": False},
+        limit=limit, purchase_cursor=purchase_cursor, sale_cursor=sale_cursor
+    )
 
 
 @router.get("/admin/orders/delivered", response_model=AllOrdersResponse)
+@cached(ORDERS_CACHE_NAMESPACE, ttl=settings.ORDER_LISTING_CACHE_SECONDS, key_params=("limit", "purchase_cursor", "sale_cursor"))
 async def get_all_delivered_orders(
     db=Depends(get_db),
-    current_admin: dict = Depends(get_current_admin)
+    current_admin: dict = Depends(get_current_admin),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    purchase_cursor: Optional[str] = None,
+    sale_cursor: Optional[str] = None,
+):
+    """
+    Get the orders across the platform that have been successfully delivered,
+    one page at a time.
+    """
+    return await get_orders_page(
+        db, {"isDelivered": True},
+        limit=limit, purchase_cursor=purchase_cursor, sale_cursor=sale_cursor
+    )
+
+
+class OrderExportType(str, Enum):
+    purchase = "purchase"
+    sale = "sale"
+
+
+@router.get("/admin/orders/export")
+async def export_orders(
+    order_type: OrderExportType,
+    db=Depends(get_analytics_db),
+    current_admin: dict = Depends(get_current_admin),
+    is_delivered: Optional[bool] = None,
+    agent_id: Optional[str] = Query(None, description="Only orders this agent is linked to."),
+    fields: Optional[str] = Query(None, description="Comma separated list of fields to include."),
 ):
     """
-    Get all orders across the platform that have been successfully delivered.
+    Stream every matching order as newline-delimited JSON (one order per line).
+    Documents are read in cursor batches, so memory use does not depend on
+    how many orders are exported.
     """
-    purchase_orders = await db.purchase_orders.find({"isDelivered": True}).to_list(length=None)
-    sale_orders = await db.sale_orders.find({"isDelivered": True}).to_list(length=None)
-    return {"purchase_orders": purchase_orders, "sale_orders": sale_orders}
+    crud_order = crud_purchase_order if order_type == OrderExportType.purchase else crud_sale_order
+    query = {}
+    if is_delivered is not None:
+        query["isDelivered"] = is_delivered
+    if agent_id:
+        query["linked_agents_ids"] = agent_id
+
+    async def ndjson_lines():
+        async for order in crud_order.stream(db, query=query, projection=parse_fields(fields)):
+            yield json.dumps(jsonable_encoder(order, custom_encoder={ObjectId: str})) + "\n"
+
+    return StreamingResponse(
+        ndjson_lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{order_type.value}_orders.ndjson"'},
+    )
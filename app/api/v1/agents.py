@@ -1,18 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+import mimetypes
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
 from app.crud import agent as crud_agent # <-- Use aliased import
 from app.db.mongodb import get_db
+from app.db.redis_client import get_redis
 # Import the new response model
 from app.models.agent import AgentCreate, AgentInDB, AgentUpdate, AgentRegisterOut
 from app.core.security import get_password_hash
 from app.api.deps import get_current_active_agent, get_current_user
-from app.services import face_verification
+from app.services import analytics_service, face_verification
+from app.core.config import settings
+from app.utils.uploads import UploadTooLargeError, spool_upload
 
 router = APIRouter()
 
 @router.post("/agents/register", response_model=AgentRegisterOut)
 async def register_agent(
     agent_in: AgentCreate,
-    db = Depends(get_db)
+    db = Depends(get_db),
+    redis = Depends(get_redis)
 ):
     agent = await crud_agent.get_by_email(db, email=agent_in.email)
     if agent:
@@ -26,10 +32,12 @@ async def register_agent(
         "hashed_password": hashed_password,
         "phone_number": agent_in.phone_number,
         "isEmailVerified": False,
-        "isPhoneNumberVerified": False
+        "isPhoneNumberVerified": False,
+        "created": datetime.utcnow()
     }
     result = await db.agents.insert_one(db_agent_data)
     created_agent = await db.agents.find_one({"_id": result.inserted_id})
+    await analytics_service.record_signup(redis, "agent")
     
     return {
         "id": str(created_agent["_id"]),
@@ -48,11 +56,22 @@ async def upload_face_verification_video(
     """
     Upload a video for face verification. Creates the face mapping.
     """
-    face_mapping = await face_verification.create_face_mapping_from_video(video)
+    # Some clients send no content type; judge those by the file name instead.
+    content_type = video.content_type or mimetypes.guess_type(video.filename or "")[0] or ""
+    if not content_type.startswith("video/"):
+        raise HTTPException(status_code=400, detail="Invalid file type. Please upload a video.")
+
+    try:
+        async with spool_upload(video, max_bytes=settings.MAX_VIDEO_UPLOAD_BYTES, suffix=".mp4") as video_path:
+            face_mapping = await face_verification.create_face_mapping_from_video(video_path)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not face_mapping:
         raise HTTPException(status_code=400, detail="Could not detect a face in the video.")
     
-    updated_agent = await crud_agent.agent.update(
-        db, db_obj=current_agent, obj_in={"face_mapping": face_mapping}
+    updated_agent = await crud_agent.set_face_mapping(
+        db, db_obj=current_agent, face_mapping=face_mapping
     )
     return updated_agent
\ No newline at end of file
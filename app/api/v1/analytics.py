@@ -1,98 +1,102 @@
-from fastapi import APIRouter, Depends, BackgroundTasks
-from typing import List
+from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException, Request, Response, status
+from redis.exceptions import RedisError
+from typing import List, Optional
 from datetime import datetime, timedelta, date
 
 from app.api.deps import get_current_admin
-from app.db.mongodb import get_db
-from app.models.analytics import DailyAnalyticsSnapshot
+from app.db.mongodb import get_analytics_db, get_db
+from app.db.redis_client import get_redis
+from app.models.analytics import AnalyticsGranularity, DailyAnalyticsSnapshot
+from app.core.config import settings
+from app.services import analytics_service
+from app.utils import cache
+from app.utils.cache import cached
 
 router = APIRouter()
 
-async def _calculate_metrics_for_period(db, start_date: datetime, end_date: datetime):
-    """Helper function to calculate metrics for a given time window."""
-    # User Metrics
-    total_customers = await db.customers.count_documents({})
-    total_agents = await db.agents.count_documents({})
-    new_customers = await db.customers.count_documents({"created": {"$gte": start_date, "$lt": end_date}})
-    new_agents = await db.agents.count_documents({"created": {"$gte": start_date, "$lt": end_date}})
-    dau_customers = await db.customers.count_documents({"last_login": {"$gte": start_date, "$lt": end_date}})
-    dau_agents = await db.agents.count_documents({"last_login": {"$gte": start_date, "$lt": end_date}})
-    
-    # Order Metrics
-    new_po = await db.purchase_orders.count_documents({"created": {"$gte": start_date, "$lt": end_date}})
-    new_so = await db.sale_orders.count_documents({"created": {"$gte": start_date, "$lt": end_date}})
-    
-    # Financials & Fulfillment
-    # Sum the 'amount' field from all transactions within the period
-    pipeline = [
-        {"$match": {"created": {"$gte": start_date, "$lt": end_date}}},
-        {"$group": {"_id": None, "total_value": {"$sum": "$amount"}}}
-    ]
-    total_value_cursor = db.transactions.aggregate(pipeline)
-    total_value_result = await total_value_cursor.to_list(length=1)
-    total_gmv = total_value_result[0]['total_value'] if total_value_result else 0
-    
-    fulfilled_orders = await db.transactions.count_documents({"created": {"$gte": start_date, "$lt": end_date}})
-    
-    return {
-        "date": start_date.date(),
-        "total_customers": total_customers, "total_agents": total_agents,
-        "new_customers_today": new_customers, "new_agents_today": new_agents,
-        "dau_customers": dau_customers, "dau_agents": dau_agents,
-        "new_purchase_orders_today": new_po, "new_sale_orders_today": new_so,
-        "orders_fulfilled_today": fulfilled_orders,
-        "total_transaction_value_today": total_gmv
-    }
-
 @router.get("/analytics/current", response_model=DailyAnalyticsSnapshot)
+@cached("analytics:current", ttl=settings.ANALYTICS_CURRENT_CACHE_SECONDS)
 async def get_current_analytics(
-    db=Depends(get_db),
+    db=Depends(get_analytics_db),
+    redis=Depends(get_redis),
     current_admin: dict = Depends(get_current_admin)
 ):
     """
-    Get real-time analytics calculated for the current day (since midnight UTC).
+    Get real-time analytics for the current day (since midnight UTC).
+    Served from counters kept up to date by the write paths; falls back to
+    querying MongoDB if Redis is unavailable. Cached for a few seconds.
     """
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    now = datetime.utcnow()
-    metrics = await _calculate_metrics_for_period(db, today_start, now)
+    try:
+        metrics = await analytics_service.read_current_metrics(redis, db)
+    except RedisError as e:
+        print(f"Analytics counters unavailable, querying MongoDB: {e}")
+        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        metrics = await analytics_service.calculate_metrics_for_period(db, today_start, datetime.utcnow())
     # Add a dummy ID for Pydantic validation
     metrics["_id"] = str(int(datetime.utcnow().timestamp()))
     return metrics
 
 @router.get("/analytics/historical", response_model=List[DailyAnalyticsSnapshot])
 async def get_historical_analytics(
-    db=Depends(get_db),
+    request: Request,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    granularity: AnalyticsGranularity = AnalyticsGranularity.day,
+    db=Depends(get_analytics_db),
     current_admin: dict = Depends(get_current_admin)
 ):
     """
-    Get all previously generated daily analytics snapshots.
-    Perfect for populating a time-series graph.
+    Get the daily analytics snapshots between `start_date` and `end_date`
+    (inclusive, default: the last 365 days), newest first, optionally rolled up
+    per week or month. Perfect for populating a time-series graph.
+    Responses carry an ETag; send it back in `If-None-Match` to get a 304.
     """
-    snapshots = await db.analytics.find().sort("date", -1).to_list(length=365)
-    return snapshots
+    end_date = end_date or datetime.utcnow().date()
+    start_date = start_date or end_date - timedelta(days=364)
+    if start_date > end_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start_date must not be after end_date.")
+
+    body, etag = await analytics_service.get_history_json(
+        db, start=start_date, end=end_date, granularity=granularity
+    )
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=60"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.post("/analytics/snapshot", status_code=202)
 async def create_daily_analytics_snapshot(
     background_tasks: BackgroundTasks,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
     current_admin: dict = Depends(get_current_admin)
 ):
     """
-    Triggers a background task to calculate analytics for the PREVIOUS full day
-    and save it to the database. Can be called by a cron job once per day.
+    Triggers a background task to calculate analytics for every full day between
+    `start_date` and `end_date` that has no snapshot yet, and save them to the
+    database. Both default to the PREVIOUS day, so a cron job can call this once
+    per day; pass a range to backfill.
     """
+    yesterday = datetime.utcnow().date() - timedelta(days=1)
+    end_date = end_date or yesterday
+    start_date = start_date or end_date
+    if end_date > yesterday:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Only completed days can be snapshotted.")
+    if start_date > end_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start_date must not be after end_date.")
+
     async def do_snapshot():
-        db = await anext(get_db()) # Get a new DB session for the background task
-        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        yesterday_start = today_start - timedelta(days=1)
-        
-        # Check if a snapshot for yesterday already exists
-        if await db.analytics.find_one({"date": yesterday_start.date()}):
-            print(f"Analytics snapshot for {yesterday_start.date()} already exists.")
+        db = await get_db() # Get the DB handle for the background task
+        redis = await get_redis()
+        created = await analytics_service.backfill_snapshots(db, start_date, end_date)
+        if not created:
+            print(f"Analytics snapshots for {start_date}..{end_date} already exist.")
             return
 
-        metrics = await _calculate_metrics_for_period(db, yesterday_start, today_start)
-        await db.analytics.insert_one(metrics)
-        print(f"Successfully created analytics snapshot for {yesterday_start.date()}")
+        await cache.invalidate(analytics_service.HISTORY_CACHE_NAMESPACE)
+        if yesterday in created:
+            await analytics_service.reconcile_counters(redis, db, yesterday, created[yesterday])
+        print(f"Successfully created {len(created)} analytics snapshot(s) for {start_date}..{end_date}")
 
     background_tasks.add_task(do_snapshot)
-    return {"message": "Daily analytics snapshot generation has been triggered in the background."}
\ No newline at end of file
+    return {"message": "Daily analytics snapshot generation has been triggered in the background."}
@@ -5,9 +5,11 @@ from datetime import timedelta, datetime
 from app.core import security
 from app.core.config import settings
 from app.db.mongodb import get_db
+from app.db.redis_client import get_redis
 from app.crud import customer, agent, admin
 from app.models import token as token_model
 from app.api.deps import get_current_user # <-- Corrected import
+from app.services import analytics_service
 
 router = APIRouter()
 
@@ -16,6 +18,7 @@ router = APIRouter()
 async def login(
     background_tasks: BackgroundTasks,
     db=Depends(get_db), 
+    redis=Depends(get_redis),
     form_data: OAuth2PasswordRequestForm = Depends()
 ):
     """
@@ -57,6 +60,7 @@ async def login(
         background_tasks.add_task(
             user_crud.update, db, db_obj=user, obj_in={"last_login": datetime.utcnow()}
         )
+        background_tasks.add_task(analytics_service.record_login, redis, user_type, str(user["_id"]))
 
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
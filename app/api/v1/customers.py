@@ -1,16 +1,20 @@
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
 from app.crud import customer as crud_customer # <-- Use aliased import for clarity
 from app.db.mongodb import get_db
+from app.db.redis_client import get_redis
 from app.models.customer import CustomerCreate, CustomerInDB, CustomerUpdate, CustomerRegisterOut 
 from app.core.security import get_password_hash
 from app.api.deps import get_current_active_customer, get_current_user
+from app.services import analytics_service
 
 router = APIRouter()
 
 @router.post("/customers/register", response_model=CustomerRegisterOut)
 async def register_customer(
     customer_in: CustomerCreate,
-    db = Depends(get_db)
+    db = Depends(get_db),
+    redis = Depends(get_redis)
 ):
     customer = await crud_customer.get_by_email(db, email=customer_in.email)
     if customer:
@@ -23,13 +27,15 @@ async def register_customer(
     db_customer_data = {
         "email": customer_in.email, 
         "hashed_password": hashed_password, 
-        "isEmailVerified": False
+        "isEmailVerified": False,
+        "created": datetime.utcnow()
     }
     
     # We cannot use the default CRUD create if the model has required fields.
     # We will insert directly and then fetch.
     result = await db.customers.insert_one(db_customer_data)
     created_customer = await db.customers.find_one({"_id": result.inserted_id})
+    await analytics_service.record_signup(redis, "customer")
 
     # Manually construct the response to match the response_model
     return {
@@ -1,17 +1,20 @@
 # app/api/v1/orders.py
 
-from fastapi import APIRouter, Depends, Body, HTTPException, BackgroundTasks, status
-from typing import Dict, Any
+from fastapi import APIRouter, Depends, Body, HTTPException, BackgroundTasks, Query, status
+from typing import Dict, Any, Optional
 
 from app.crud import purchase_order, sale_order # <-- CORRECTED IMPORT
+from app.crud.crud_order import get_orders_page
+from app.crud.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from app.db.mongodb import get_db
+from app.db.redis_client import get_redis
 from app.models.order import (
     PurchaseOrderCreate, PurchaseOrderCreateIn, PurchaseOrderInDB,
     SaleOrderCreate, SaleOrderInDB, AgentOrdersResponse, AllOrdersResponse
 )
 from app.api.deps import get_current_active_customer, get_current_user, get_current_active_agent
-from app.services import image_generation, geo
-from app.services.notification_service import create_and_dispatch_notification
+from app.services import analytics_service, geo
+from app.services.notification_service import dispatch_notifications
 from app.services.matching_service import run_matching_cycle
 
 router = APIRouter()
@@ -23,12 +26,14 @@ async def create_purchase_order(
     order_in: PurchaseOrderCreateIn,
     background_tasks: BackgroundTasks,
     db=Depends(get_db),
+    redis=Depends(get_redis),
     current_user: dict = Depends(get_current_active_customer),
 ):
     order_data = order_in.model_dump()
     order_data["creator_id"] = str(current_user["_id"])
     order_to_create = PurchaseOrderCreate(**order_data)
     new_order = await purchase_order.create(db, obj_in=order_to_create)
+    await analytics_service.record_order(redis, "purchase")
     
     longitude = current_user.get("location", {}).get("coordinates", [0, 0])[0]
     latitude = current_user.get("location", {}).get("coordinates", [0, 0])[1]
@@ -36,10 +41,9 @@ async def create_purchase_order(
     
     await purchase_order.update(db, db_obj=new_order, obj_in={"linked_agents_ids": [str(a["_id"]) for a in nearby_agents]})
     
-    for agent in nearby_agents:
-        subject = "New Order Alert!"
-        message_body = f"You have been linked to a new purchase order created near you. Order ID: {str(new_order['_id'])}"
-        await create_and_dispatch_notification(db, target_user=agent, subject=subject, message_body=message_body)
+    subject = "New Order Alert!"
+    message_body = f"You have been linked to a new purchase order created near you. Order ID: {str(new_order['_id'])}"
+    await dispatch_notifications(db, nearby_agents, subject=subject, message_body=message_body)
 
     background_tasks.add_task(run_matching_cycle, db, str(new_order["_id"]), "purchase")
 
@@ -83,10 +87,12 @@ async def create_sale_order(
     order_in: SaleOrderCreate,
     background_tasks: BackgroundTasks,
     db=Depends(get_db),
+    redis=Depends(get_redis),
     current_user: dict = Depends(get_current_active_customer),
 ):
     order_in.creator_id = str(current_user["_id"])
     new_order = await sale_order.create(db, obj_in=order_in)
+    await analytics_service.record_order(redis, "sale")
 
     background_tasks.add_task(run_matching_cycle, db, str(new_order["_id"]), "sale")
     
@@ -127,79 +133,71 @@ async def delete_sale_order(
 @router.get("/orders/linked/me", response_model=AgentOrdersResponse)
 async def get_my_linked_orders(
     db=Depends(get_db),
-    current_agent: dict = Depends(get_current_active_agent)
+    current_agent: dict = Depends(get_current_active_agent),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    purchase_cursor: Optional[str] = None,
+    sale_cursor: Optional[str] = None,
 ):
     """
-    Retrieve all purchase and sale orders that the current agent is linked to
-    but not yet actively delivering.
+    Retrieve the purchase and sale orders that the current agent is linked to
+    but not yet actively delivering, newest first. Pass the returned
+    `*_next_cursor` values back to fetch the following page.
     """
     agent_id = str(current_agent["_id"])
     
     # Find orders where the agent is in the `linked_agents_ids` array
     # and not yet the `delivering_agent_id`.
-    linked_purchase_orders = await db.purchase_orders.find({
-        "linked_agents_ids": agent_id,
-        "delivering_agent_id": None
-    }).to_list(length=None)
-    
-    linked_sale_orders = await db.sale_orders.find({
-        "linked_agents_ids": agent_id,
-        "delivering_agent_id": None
-    }).to_list(length=None)
-    
-    return {
-        "purchase_orders": linked_purchase_orders,
-        "sale_orders": linked_sale_orders
-    }
+    query = {"linked_agents_ids": agent_id, "delivering_agent_id": None}
+    return await get_orders_page(
+        db, query, limit=limit, purchase_cursor=purchase_cursor, sale_cursor=sale_cursor
+    )
 
 @router.get("/orders/delivering/me", response_model=AgentOrdersResponse)
 async def get_my_delivering_orders(
     db=Depends(get_db),
-    current_agent: dict = Depends(get_current_active_agent)
+    current_agent: dict = Depends(get_current_active_agent),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    purchase_cursor: Optional[str] = None,
+    sale_cursor: Optional[str] = None,
 ):
     """
-    Retrieve all purchase and sale orders that the current agent is
-    actively delivering.
+    Retrieve the purchase and sale orders that the current agent is
+    actively delivering, newest first.
     """
     agent_id = str(current_agent["_id"])
     
-    delivering_purchase_orders = await db.purchase_orders.find({
-        "delivering_agent_id": agent_id
-    }).to_list(length=None)
-    
-    delivering_sale_orders = await db.sale_orders.find({
-        "delivering_agent_id": agent_id
-    }).to_list(length=None)
-    
-    return {
-        "purchase_orders": delivering_purchase_orders,
-        "sale_orders": delivering_sale_orders
-    }
+    query = {"delivering_agent_id": agent_id}
+    return await get_orders_page(
+        db, query, limit=limit, purchase_cursor=purchase_cursor, sale_cursor=sale_cursor
+    )
 
 @router.get("/orders/my-orders", response_model=AllOrdersResponse)
 async def get_my_created_orders(
     db=Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    purchase_cursor: Optional[str] = None,
+    sale_cursor: Optional[str] = None,
 ):
     """
-    Retrieve all purchase and sale orders created by the currently
-    authenticated user.
+    Retrieve the purchase and sale orders created by the currently
+    authenticated user, newest first.
     """
     # 1. Get the ID of the authenticated user from the token.
     user_id = str(current_user["_id"])
     
-    # 2. Find all purchase orders where the 'creator_id' matches the user's ID.
-    my_purchase_orders = await db.purchase_orders.find({
-        "creator_id": user_id
-    }).to_list(length=None)
-    
-    # 3. Find all sale orders where the 'creator_id' matches the user's ID.
-    my_sale_orders = await db.sale_orders.find({
-        "creator_id": user_id
-    }).to_list(length=None)
+    # 2. Page through both order collections by 'creator_id'.
+    my_purchase_orders, next_purchase_cursor = await purchase_order.get_by_creator(
+        db, creator_id=user_id, limit=limit, cursor=purchase_cursor
+    )
+    my_sale_orders, next_sale_cursor = await sale_order.get_by_creator(
+        db, creator_id=user_id, limit=limit, cursor=sale_cursor
+    )
     
-    # 4. Return the orders structured by the response model.
+    # 3. Return the orders structured by the response model.
     return {
         "purchase_orders": my_purchase_orders,
-        "sale_orders": my_sale_orders
+        "sale_orders": my_sale_orders,
+        "purchase_orders_next_cursor": next_purchase_cursor,
+        "sale_orders_next_cursor": next_sale_cursor,
     }
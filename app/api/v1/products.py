@@ -1,16 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+import asyncio
+import json
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from typing import List, Dict, Any
 
 from app.api.deps import get_current_active_customer
 from app.db.mongodb import get_db
+from app.db.redis_client import get_redis
 from app.models.product import ProductCreate, ProductInDB, ProductAnalysisResponse
 from app.crud import product as crud_product
 from app.services import media_analysis_service
+from app.services.product_media_service import attach_image_variants
+from app.core.config import settings
+from app.utils.uploads import UploadTooLargeError, read_upload, spool_upload
 router = APIRouter()
 
 @router.post("/products", response_model=ProductInDB, status_code=status.HTTP_201_CREATED)
 async def create_product(
     product_in: ProductCreate,
+    background_tasks: BackgroundTasks,
     db=Depends(get_db),
     # Any active customer can create a product to sell
     current_user: dict = Depends(get_current_active_customer)
@@ -19,6 +28,9 @@ async def create_product(
     Create a new product listing.
     """
     created_product = await crud_product.create(db, obj_in=product_in)
+    if product_in.images:
+        # Thumbnails and model-input sizes are derived after the response is sent.
+        background_tasks.add_task(attach_image_variants, db, str(created_product["_id"]))
     return created_product
 
 @router.get("/products/{product_id}", response_model=ProductInDB)
@@ -35,6 +47,7 @@ async def get_product(product_id: str, db=Depends(get_db)):
 async def update_product(
     product_id: str,
     update_data: Dict[str, Any],
+    background_tasks: BackgroundTasks,
     db=Depends(get_db),
     current_user: dict = Depends(get_current_active_customer)
 ):
@@ -50,6 +63,8 @@ async def update_product(
     # For now, any authenticated customer can update, which should be tightened.
     
     updated_product = await crud_product.update(db, db_obj=product, obj_in=update_data)
+    if "images" in update_data:
+        background_tasks.add_task(attach_image_variants, db, product_id)
     return updated_product
 
 @router.delete("/products/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -71,6 +86,8 @@ async def delete_product(
 @router.post("/products/analyze-image", response_model=ProductAnalysisResponse)
 async def analyze_product_image(
     file: UploadFile = File(...),
+    db=Depends(get_db),
+    redis=Depends(get_redis),
     current_user: dict = Depends(get_current_active_customer)
 ):
     """
@@ -80,16 +97,19 @@ async def analyze_product_image(
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="Invalid file type. Please upload an image.")
     
-    media_bytes = await file.read()
+    try:
+        media_bytes = await read_upload(file, max_bytes=settings.MAX_IMAGE_UPLOAD_BYTES)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
     
     try:
         # Get name, description, and keywords from the Vision model
-        product_details = await media_analysis_service.generate_product_details_from_media(
-            media_bytes, file.content_type
+        product_details = await media_analysis_service.analyze_media(
+            db, redis, media_bytes, file.content_type
         )
         
         # Use the generated text to find the best category
-        text_for_categorization = f"{product_details['name']} {' '.join(product_details['keywords'])}"
+        text_for_categorization = media_analysis_service.categorization_text(product_details)
         suggested_category = media_analysis_service.find_best_category(text_for_categorization)
         
         return {
@@ -104,6 +124,8 @@ async def analyze_product_image(
 @router.post("/products/analyze-video", response_model=ProductAnalysisResponse)
 async def analyze_product_video(
     file: UploadFile = File(...),
+    db=Depends(get_db),
+    redis=Depends(get_redis),
     current_user: dict = Depends(get_current_active_customer)
 ):
     """
@@ -113,19 +135,23 @@ async def analyze_product_video(
     if not file.content_type.startswith("video/"):
         raise HTTPException(status_code=400, detail="Invalid file type. Please upload a video.")
     
-    video_bytes = await file.read()
+    try:
+        # Stream the upload to a temp file and extract a representative frame from it
+        async with spool_upload(file, max_bytes=settings.MAX_VIDEO_UPLOAD_BYTES, suffix=".mp4") as video_path:
+            frame_bytes = await media_analysis_service.extract_frame_from_video(video_path)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
     
     try:
-        # Extract a representative frame from the video
-        frame_bytes = media_analysis_service.extract_frame_from_video(video_bytes)
-        
         # Analyze the extracted frame (pass as JPEG)
-        product_details = await media_analysis_service.generate_product_details_from_media(
-            frame_bytes, "image/jpeg"
+        product_details = await media_analysis_service.analyze_media(
+            db, redis, frame_bytes, "image/jpeg", preprocess=False
         )
         
         # Use the generated text to find the best category
-        text_for_categorization = f"{product_details['name']} {' '.join(product_details['keywords'])}"
+        text_for_categorization = media_analysis_service.categorization_text(product_details)
         suggested_category = media_analysis_service.find_best_category(text_for_categorization)
         
         return {
@@ -134,4 +160,101 @@ async def analyze_product_video(
             "suggested_category": suggested_category
         }
     except ValueError as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/products/analyze-images")
+async def analyze_product_images(
+    files: List[UploadFile] = File(...),
+    db=Depends(get_db),
+    redis=Depends(get_redis),
+    current_user: dict = Depends(get_current_active_customer)
+):
+    """
+    Upload several product images at once. Each one is analyzed like
+    `/products/analyze-image`, with up to PRODUCT_ANALYSIS_CONCURRENCY running
+    at the same time. Results are streamed back as newline-delimited JSON, one
+    line per image as soon as it is ready, each with the image's `index` and
+    `filename` and either the analysis or an `error`.
+    """
+    if len(files) > settings.MAX_BATCH_ANALYSIS_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.MAX_BATCH_ANALYSIS_FILES} images can be analyzed at once."
+        )
+
+    # Read the uploads before streaming starts; the request's files are closed
+    # once the endpoint returns.
+    uploads = []
+    for file in files:
+        if not (file.content_type or "").startswith("image/"):
+            uploads.append(ValueError("Invalid file type. Please upload an image."))
+            continue
+        try:
+            uploads.append(await read_upload(file, max_bytes=settings.MAX_IMAGE_UPLOAD_BYTES))
+        except UploadTooLargeError as e:
+            uploads.append(e)
+
+    semaphore = asyncio.Semaphore(settings.PRODUCT_ANALYSIS_CONCURRENCY)
+
+    async def analyze(index: int) -> dict:
+        if isinstance(uploads[index], Exception):
+            raise uploads[index]
+        async with semaphore:
+            return await media_analysis_service.analyze_media(db, redis, uploads[index], files[index].content_type)
+
+    def error_line(item: dict, e: Exception) -> str:
+        # The 200 is already sent, so a failure only ever ends its own line.
+        if not isinstance(e, ValueError):
+            print(f"Batch analysis of {item['filename']!r} failed: {e!r}")
+            e = ValueError("Could not analyze this image.")
+        return json.dumps({**item, "error": str(e)}) + "\n"
+
+    async def categorize(texts: List[str]) -> List[Any]:
+        """Categories for `texts`, or the exception for each one that failed."""
+        try:
+            return await run_in_threadpool(media_analysis_service.find_best_categories, texts)
+        except Exception:
+            if len(texts) == 1:
+                raise
+        results = []
+        for text in texts:
+            try:
+                results.append((await run_in_threadpool(media_analysis_service.find_best_categories, [text]))[0])
+            except Exception as e:
+                results.append(e)
+        return results
+
+    async def ndjson_lines():
+        pending = {asyncio.ensure_future(analyze(index)): index for index in range(len(files))}
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                analyzed = []
+                for task in done:
+                    index = pending.pop(task)
+                    item = {"index": index, "filename": files[index].filename}
+                    try:
+                        details = task.result()
+                        analyzed.append((
+                            {**item, "name": details["name"], "description": details["description"]},
+                            media_analysis_service.categorization_text(details),
+                        ))
+                    except Exception as e:
+                        yield error_line(item, e)
+                if not analyzed:
+                    continue
+                # Everything that finished together is categorized in one embedding batch.
+                try:
+                    categories = await categorize([text for _, text in analyzed])
+                except Exception as e:
+                    categories = [e] * len(analyzed)
+                for (result, _), category in zip(analyzed, categories):
+                    if isinstance(category, Exception):
+                        yield error_line({"index": result["index"], "filename": result["filename"]}, category)
+                    else:
+                        yield json.dumps({**result, "suggested_category": category}) + "\n"
+        finally:
+            for task in pending:
+                task.cancel()
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
@@ -1,24 +1,33 @@
 # app/api/v1/reviews.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from typing import List, Dict, Any, Optional
 
 from app.api.deps import get_current_active_customer, get_current_user
 from app.db.mongodb import get_db
 from app.models.review import ReviewCreate, ReviewInDB
 from app.crud import review as crud_review
+from app.crud.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 router = APIRouter()
 
 @router.get("/reviews/me", response_model=List[ReviewInDB])
 async def get_my_reviews(
+    response: Response,
     db=Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
 ):
     """
-    Get all reviews written by the currently authenticated user.
+    Get the reviews written by the currently authenticated user, newest first.
+    The cursor for the next page is returned in the `X-Next-Cursor` header.
     """
-    reviews = await db.reviews.find({"author_id": str(current_user["_id"])}).to_list(length=None)
+    reviews, next_cursor = await crud_review.get_page(
+        db, query={"author_id": str(current_user["_id"])}, limit=limit, cursor=cursor
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return reviews
 
 @router.post("/reviews", response_model=ReviewInDB, status_code=status.HTTP_201_CREATED)
@@ -35,11 +44,22 @@ async def create_review(
     return created_review
 
 @router.get("/agents/{agent_id}/reviews", response_model=List[ReviewInDB])
-async def get_reviews_for_agent(agent_id: str, db=Depends(get_db)):
+async def get_reviews_for_agent(
+    agent_id: str,
+    response: Response,
+    db=Depends(get_db),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+):
     """
-    Get all reviews for a specific agent.
+    Get the reviews for a specific agent, newest first.
+    The cursor for the next page is returned in the `X-Next-Cursor` header.
     """
-    reviews = await db.reviews.find({"target_agent_id": agent_id}).to_list(length=None)
+    reviews, next_cursor = await crud_review.get_page(
+        db, query={"target_agent_id": agent_id}, limit=limit, cursor=cursor
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return reviews
 
 @router.put("/reviews/{review_id}", response_model=ReviewInDB)
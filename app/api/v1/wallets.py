@@ -1,23 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import uuid
+from redis.exceptions import RedisError
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from typing import List, Optional
 
 from app.api.deps import get_current_user
-from app.crud import wallet as crud_wallet, customer as crud_customer, agent as crud_agent
-from app.db.mongodb import get_db
-from app.models.wallet import WalletCreate, WalletInDB, WithdrawalRequest
-from app.services import payment_service
+from app.crud import wallet as crud_wallet, transaction as crud_transaction, customer as crud_customer, agent as crud_agent
+from app.crud.crud_ledger import ledger as crud_ledger
+from app.crud.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate
+from app.db.mongodb import get_db, run_in_transaction
+from app.db.redis_client import get_redis
+from app.models.ledger import LedgerEntryInDB, LedgerEntryType
+from app.models.wallet import WalletCreate, WalletInDB, WithdrawalRequest, WithdrawalTransaction, WalletTransactionStatus
+from app.services import transfer_recipient_service, wallet_provisioning_service, withdrawal_service
+from app.services.payment_service import PaystackRejectedError, paystack_service
 from app.core import security 
+from app.core.config import settings
+from app.utils.limiter import limiter
 
 router = APIRouter()
 
 @router.post("/wallets", response_model=WalletInDB, status_code=status.HTTP_201_CREATED)
 async def create_wallet(
     db=Depends(get_db),
+    redis=Depends(get_redis),
     current_user: dict = Depends(get_current_user)
 ):
     """
     Create a new wallet for the authenticated user.
     A user can only have one wallet at a time.
-    This also creates a dedicated virtual account via Paystack.
+    The wallet is returned as `pending`; its Paystack dedicated virtual account
+    is provisioned in the background and it turns `active` once that is done.
+    Poll `/wallets/me` for the status.
     """
     user_id = str(current_user["_id"])
 
@@ -29,44 +42,24 @@ async def create_wallet(
             detail="A wallet already exists for this user."
         )
 
-    # 2. Create a customer on Paystack and a dedicated virtual account (DVA)
-    try:
-        # Note: Paystack's create customer is idempotent, it won't create duplicates for the same email.
-        ps_customer = await payment_service.create_customer(
-            email=current_user["email"],
-            first_name=current_user.get("fName", "User"),
-            last_name=current_user.get("lName", str(current_user["_id"])),
-            phone=current_user.get("phone_number", "")
-        )
-
-        dva_data = await payment_service.create_dedicated_virtual_account(
-            customer_code=ps_customer["customer_code"]
-        )
-        # The DVA number is what the user will pay into. We store it as the wallet's unique account ID.
-        paystack_account_id = dva_data.get("account_number")
-        
-        if not paystack_account_id:
-             raise Exception("Failed to retrieve account number from payment service.")
-
-    except Exception as e:
-        # If any Paystack operation fails, we should not create the wallet in our DB.
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail=f"Payment service provider error: {e}"
-        )
-
-    # 3. Create the wallet in our database
+    # 2. Create the wallet in our database, pending its dedicated account
     wallet_in = WalletCreate(
         owner_id=user_id,
         balance=0.0 # Wallets start with a zero balance
     )
-    # The CRUD create method now needs to be updated to accept the Paystack ID
-    new_wallet = await crud_wallet.create(db, obj_in=wallet_in, paystack_id=paystack_account_id)
+    new_wallet = await crud_wallet.create(db, obj_in=wallet_in, owner_type=current_user["user_type"])
     
-    # 4. Link the new wallet ID back to the user's document
+    # 3. Link the new wallet ID back to the user's document
     user_crud = crud_agent if current_user["user_type"] == "agent" else crud_customer
     await user_crud.update(db, db_obj=current_user, obj_in={"wallet_id": str(new_wallet["_id"])})
 
+    # 4. Hand the Paystack customer/DVA creation to the provisioning worker.
+    # If the queue is unreachable, the worker's periodic sweep still picks it up.
+    try:
+        await wallet_provisioning_service.enqueue_wallet(redis, new_wallet["_id"])
+    except RedisError as e:
+        print(f"Could not queue wallet {new_wallet['_id']} for provisioning: {e}")
+
     return new_wallet
 
 @router.get("/wallets/me", response_model=WalletInDB)
@@ -82,6 +75,28 @@ async def read_my_wallet(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Wallet not found for this user.")
     return wallet
 
+@router.get("/wallets/me/ledger", response_model=List[LedgerEntryInDB])
+async def read_my_ledger(
+    response: Response,
+    db=Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+):
+    """
+    Retrieve the current user's wallet ledger (deposits, withdrawals, fees,
+    commissions), newest first. The next page cursor is in `X-Next-Cursor`.
+    """
+    wallet = await crud_wallet.get_by_owner_id(db, owner_id=str(current_user["_id"]))
+    if not wallet:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Wallet not found for this user.")
+    entries, next_cursor = await paginate(
+        db[crud_ledger.entries_collection], {"wallet_id": str(wallet["_id"])}, limit=limit, cursor=cursor
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return entries
+
 @router.delete("/wallets/me", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_my_wallet(
     db=Depends(get_db),
@@ -111,10 +126,49 @@ async def delete_my_wallet(
     
     return
 
+@router.get("/wallets/banks")
+async def list_banks(
+    redis=Depends(get_redis),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    List the banks available for withdrawals, with the `code` to use as `bank_code`.
+    """
+    try:
+        return await transfer_recipient_service.get_banks(redis)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Payment service provider error: {e}"
+        )
+
+@router.get("/wallets/resolve-account")
+@limiter.limit(settings.RESOLVE_ACCOUNT_RATE_LIMIT)
+async def resolve_bank_account(
+    request: Request,
+    account_number: str = Query(..., min_length=10, max_length=10),
+    bank_code: str = Query(...),
+    redis=Depends(get_redis),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Look up the account holder's name for a bank account before withdrawing to it.
+    """
+    try:
+        return await transfer_recipient_service.resolve_account(
+            redis, account_number=account_number, bank_code=bank_code
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Payment service provider error: {e}"
+        )
+
 @router.post("/wallets/withdraw")
 async def request_withdrawal(
     request_data: WithdrawalRequest,
     db=Depends(get_db),
+    redis=Depends(get_redis),
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -136,53 +190,103 @@ async def request_withdrawal(
             detail="Invalid 2FA code."
         )
 
-    # 2. Wallet & Balance Check
+    # 2. Debit the wallet through the ledger and 3. record the withdrawal, in
+    # one transaction: a debit without its withdrawal record could never be
+    # reconciled. The balance check and the debit are one conditional update,
+    # so concurrent withdrawals cannot overdraw the wallet.
     wallet = await crud_wallet.get_by_owner_id(db, owner_id=user_id)
     if not wallet:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Wallet not found for this user.")
-    if wallet["balance"] < request_data.amount:
+
+    amount_in_kobo = int(round(request_data.amount * 100))
+    reference = f"wd_{uuid.uuid4().hex}"
+
+    async def debit_and_record(session):
+        debit = await crud_ledger.post(
+            db,
+            wallet_id=wallet["_id"],
+            entry_type=LedgerEntryType.withdrawal,
+            amount_kobo=-amount_in_kobo,
+            reference=reference,
+            require_funds=True,
+            session=session,
+        )
+        if not debit:
+            return None
+        withdrawal = await crud_transaction.create_withdrawal(db, withdrawal_in=WithdrawalTransaction(
+            wallet_id=str(wallet["_id"]),
+            owner_id=user_id,
+            amount=request_data.amount,
+            reference=reference,
+        ), session=session)
+        return debit, withdrawal
+
+    recorded = await run_in_transaction(db, debit_and_record)
+    if not recorded:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient wallet balance.")
+    debit, withdrawal = recorded
+
+    # 4. Paystack Transfer Flow. A debit is only reversed when the transfer
+    # definitely did not happen; otherwise Paystack may have queued it, and a
+    # refund would pay the user twice.
+    async def reverse_withdrawal(reason: str) -> HTTPException:
+        await withdrawal_service.settle_transfer(
+            db, reference=reference, event="transfer.failed", failure_reason=reason
+        )
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Payment service provider error: {reason}"
+        )
 
-    # 3. Paystack Transfer Flow
     try:
-        # Step 3a: Create a transfer recipient on Paystack. This validates the account details.
-        recipient_data = await payment_service.create_transfer_recipient(
+        # Step 4a: Get the Paystack transfer recipient for this account. It is
+        # created (and the account validated) only the first time it is used.
+        recipient_code = await transfer_recipient_service.get_or_create_recipient(
+            db, redis,
+            owner_id=user_id,
             name=f"{current_user.get('fName')} {current_user.get('lName')}",
             account_number=request_data.account_number,
             bank_code=request_data.bank_code
         )
-        recipient_code = recipient_data.get("recipient_code")
-
-        if not recipient_code:
-            raise Exception("Failed to create transfer recipient with payment provider.")
+    except Exception as e:
+        # No transfer was requested yet, so the debit can safely be reversed.
+        raise await reverse_withdrawal(str(e))
 
-        # Step 3b: Initiate the transfer to the newly created recipient
-        amount_in_kobo = int(request_data.amount * 100)
-        transfer_data = await payment_service.initiate_transfer(
+    try:
+        # Step 4b: Initiate the transfer to the recipient
+        transfer_data = await paystack_service.initiate_transfer(
             amount_kobo=amount_in_kobo,
             recipient_code=recipient_code,
-            reason="o42 Marketplace Wallet Withdrawal"
+            reason="o42 Marketplace Wallet Withdrawal",
+            reference=withdrawal["reference"]
         )
-        
-        if transfer_data.get("status") != "success" and transfer_data.get("status") != "pending":
-            raise Exception(f"Transfer initiation failed: {transfer_data.get('message')}")
-
+    except PaystackRejectedError as e:
+        raise await reverse_withdrawal(str(e))
     except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail=f"Payment service provider error: {e}"
-        )
+        # Timeout, transport error or 5xx: the outcome is unknown. The withdrawal
+        # stays pending until the transfer webhook or the reconciler settles it.
+        print(f"Transfer {reference} outcome unknown, leaving it pending: {e}")
+        return {
+            "message": "Withdrawal submitted. Its status is being confirmed with the payment provider.",
+            "transfer_status": WalletTransactionStatus.pending,
+            "new_balance": debit["balance_after_kobo"] / 100
+        }
 
-    # 4. Update Wallet Balance in our Database
-    # This should only happen AFTER the transfer has been successfully initiated.
-    new_balance = wallet["balance"] - request_data.amount
-    updated_wallet = await crud_wallet.update(db, db_obj=wallet, obj_in={"balance": new_balance})
+    if transfer_data.get("status") in withdrawal_service.FAILED_INITIATION_STATUSES:
+        raise await reverse_withdrawal(f"Transfer initiation failed: {transfer_data.get('message')}")
 
-    # Note: For a production system, you should also log this transaction in your `transactions` collection
-    # for auditing and record-keeping purposes.
+    # 5. Mark the withdrawal with the transfer's outcome, unless its webhook
+    # already settled it.
+    await crud_transaction.set_withdrawal_status_by_reference(
+        db,
+        reference=reference,
+        status=WalletTransactionStatus.success if transfer_data.get("status") == "success" else WalletTransactionStatus.pending,
+        from_statuses=[WalletTransactionStatus.pending],
+        transfer_code=transfer_data.get("transfer_code"),
+    )
 
     return {
         "message": "Withdrawal initiated successfully. The transfer is being processed.",
         "transfer_status": transfer_data.get("status"),
-        "new_balance": updated_wallet["balance"]
-    }
\ No newline at end of file
+        "new_balance": debit["balance_after_kobo"] / 100
+    }
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+
+from app.db.redis_client import get_redis
+from app.services.webhook_service import enqueue_paystack_event, verify_paystack_signature
+
+router = APIRouter()
+
+@router.post("/webhooks/paystack", status_code=status.HTTP_200_OK)
+async def paystack_webhook(request: Request, redis=Depends(get_redis)):
+    """
+    Receives Paystack events (DVA deposits, transfer outcomes). The signature
+    is verified and the event is queued in Redis; crediting happens in the
+    background consumer, so Paystack gets its acknowledgement immediately.
+    """
+    body = await request.body()
+    if not verify_paystack_signature(body, request.headers.get("x-paystack-signature")):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid signature.")
+
+    await enqueue_paystack_event(redis, body)
+    return {"status": "accepted"}
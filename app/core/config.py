@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -13,12 +15,31 @@ class Settings(BaseSettings):
     REDIS_HOST: str
     REDIS_PORT: int
 
+    # Connection pools. Size these per worker: each Gunicorn worker holds its own pools.
+    MONGO_MAX_POOL_SIZE: int = 50
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: int = 60000
+    MONGO_CONNECT_TIMEOUT_MS: int = 5000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGO_SOCKET_TIMEOUT_MS: Optional[int] = None
+    MONGO_COMPRESSORS: str = "zstd,zlib"
+    # Read preference for read-only analytics/admin queries (a pymongo ReadPreference name).
+    MONGO_ANALYTICS_READ_PREFERENCE: str = "SECONDARY_PREFERRED"
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_SOCKET_TIMEOUT_SECONDS: float = 5.0
+    REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    REDIS_HEALTH_CHECK_INTERVAL_SECONDS: int = 30
+    DB_CONNECT_RETRIES: int = 5
+    DB_CONNECT_RETRY_DELAY_SECONDS: float = 1.0
+
 
     AGENT_LINKING_RADIUS_KM: int = 10
     MIN_WALLET_BALANCE_FOR_PURCHASE: int = 1000
     DEFAULT_SALE_COMMISSION: float = 0.10
     TRANSACTION_FEE_PERCENTAGE: float = 0.005
     STARTER_AGENT_WITHDRAWAL_DAYS: int = 7
+    LEDGER_SNAPSHOT_MIN_ENTRIES: int = 50
+    LEDGER_COMPACTION_INTERVAL_SECONDS: int = 300
 
 
     AGENT_TYCOON_PRICE: int
@@ -27,6 +48,44 @@ class Settings(BaseSettings):
 
 
     PAYSTACK_SECRET_KEY: str
+    PAYSTACK_MAX_CONNECTIONS: int = 20
+    PAYSTACK_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    PAYSTACK_TIMEOUT_SECONDS: float = 10.0
+    PAYSTACK_MAX_RETRIES: int = 3
+    PAYSTACK_RETRY_BACKOFF_SECONDS: float = 0.5
+    PAYSTACK_WEBHOOK_BATCH_SIZE: int = 100
+    WITHDRAWAL_RECONCILE_AFTER_SECONDS: int = 600
+    WITHDRAWAL_RECONCILE_INTERVAL_SECONDS: int = 300
+    # Account resolution reveals the holder's name, so it is rate limited per client.
+    RESOLVE_ACCOUNT_RATE_LIMIT: str = "10/minute"
+    WALLET_PROVISIONING_MAX_ATTEMPTS: int = 6
+    WALLET_PROVISIONING_SWEEP_SECONDS: int = 30
+    ANALYTICS_BACKFILL_CONCURRENCY: int = 4
+    ANALYTICS_HISTORY_CACHE_SECONDS: int = 300
+    ANALYTICS_CURRENT_CACHE_SECONDS: int = 15
+    ORDER_LISTING_CACHE_SECONDS: int = 30
+    MAX_IMAGE_UPLOAD_BYTES: int = 10 * 1024 * 1024
+    MAX_VIDEO_UPLOAD_BYTES: int = 100 * 1024 * 1024
+    MEDIA_WORKER_PROCESSES: int = 2
+    FRAME_EXTRACTION_TIMEOUT_SECONDS: float = 30
+    FRAME_SAMPLE_COUNT: int = 5
+    FRAME_MAX_DIMENSION: int = 1024
+    FRAME_JPEG_QUALITY: int = 85
+    FACE_SAMPLE_COUNT: int = 12
+    FACE_DETECTION_MAX_DIMENSION: int = 640
+    FACE_STABLE_FRAMES: int = 3
+    FACE_STABLE_DISTANCE: float = 0.35
+    FACE_ENCODING_TIMEOUT_SECONDS: float = 60
+    # Uploaded photos are resized and re-encoded before being sent to Gemini.
+    VISION_IMAGE_MAX_DIMENSION: int = 1024
+    VISION_IMAGE_FORMAT: str = "JPEG"  # or "WEBP"
+    VISION_IMAGE_QUALITY: int = 85
+    IMAGE_PROCESSING_TIMEOUT_SECONDS: float = 15
+    MAX_BATCH_ANALYSIS_FILES: int = 20
+    IMAGE_THUMBNAIL_MAX_DIMENSION: int = 320
+    IMAGE_MODEL_INPUT_MIN_DIMENSION: int = 224
+    IMAGE_VARIANT_QUALITY: int = 80
+    PRODUCT_ANALYSIS_CONCURRENCY: int = 4
     TWILIO_ACCOUNT_SID: str
     TWILIO_AUTH_TOKEN: str
     TWILIO_PHONE_NUMBER: str
@@ -36,6 +95,10 @@ class Settings(BaseSettings):
     GOOGLE_CLOUD_PROJECT: str
     GOOGLE_CLOUD_REGION: str
     GCS_BUCKET_NAME: str
+    # "gcs", or "local" to keep media on disk and serve it under LOCAL_STORAGE_BASE_URL.
+    STORAGE_BACKEND: str = "gcs"
+    LOCAL_STORAGE_PATH: str = "media"
+    LOCAL_STORAGE_BASE_URL: str = "/media"
 
     SYSTEM_ADMIN_USER_ID: str = "042_MARKETPLACE_ADMIN"
 
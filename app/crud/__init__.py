@@ -1,18 +1,25 @@
 # app/crud/__init__.py
 
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from typing import Any, AsyncIterator, Dict, Generic, List, Optional, Tuple, Type, TypeVar, Union
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
 from bson import ObjectId
 
+from app.crud import pagination
+from app.crud.loader import BatchLoader
+
 # --- BASE CLASS DEFINITION (Keep this part) ---
 
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 class CRUDBase(Generic[CreateSchemaType, UpdateSchemaType]):
+    # Fields left out of `get`, `load`, `get_multi` and `update` reads (e.g. large blobs).
+    projection: Optional[Dict[str, Any]] = None
+
     def __init__(self, collection_name: str):
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
@@ -24,32 +31,94 @@ class CRUDBase(Generic[CreateSchemaType, UpdateSchemaType]):
         self.collection_name = collection_name
 
     async def get(self, db: AsyncIOMotorDatabase, id: str) -> Optional[Dict]:
-        return await db[self.collection_name].find_one({"_id": ObjectId(id)})
+        return await db[self.collection_name].find_one({"_id": ObjectId(id)}, self.projection)
+
+    async def load(self, loader: BatchLoader, id: Any) -> Optional[Dict]:
+        """Like `get`, but batched with other lookups issued in the same tick."""
+        return await loader.load(self.collection_name, id, self.projection)
 
     async def get_multi(
         self, db: AsyncIOMotorDatabase, *, skip: int = 0, limit: int = 100
     ) -> List[Dict]:
-        return await db[self.collection_name].find().skip(skip).limit(limit).to_list(length=limit)
+        cursor = db[self.collection_name].find({}, self.projection)
+        return await cursor.skip(skip).limit(limit).to_list(length=limit)
+
+    async def get_page(
+        self,
+        db: AsyncIOMotorDatabase,
+        *,
+        query: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        sort_field: str = "_id",
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Keyset-paginated read, newest first. Returns the page and the cursor
+        for the next one (None on the last page).
+        """
+        return await pagination.paginate(
+            db[self.collection_name], query,
+            limit=limit, cursor=cursor, sort_field=sort_field, projection=projection,
+        )
+
+    def stream(
+        self,
+        db: AsyncIOMotorDatabase,
+        *,
+        query: Optional[Dict[str, Any]] = None,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Dict]:
+        """Iterates over every matching document without loading them all at once."""
+        return pagination.stream(db[self.collection_name], query, projection=projection)
 
     async def create(self, db: AsyncIOMotorDatabase, *, obj_in: CreateSchemaType) -> Dict:
         obj_in_data = jsonable_encoder(obj_in)
+        return await self._insert(db, obj_in_data)
+
+    async def create_multi(self, db: AsyncIOMotorDatabase, *, objs_in: List[CreateSchemaType]) -> List[Dict]:
+        """Like `create` for several documents, in one `insert_many`."""
+        if not objs_in:
+            return []
+        obj_in_data = [jsonable_encoder(obj_in) for obj_in in objs_in]
+        result = await db[self.collection_name].insert_many(obj_in_data)
+        for doc, inserted_id in zip(obj_in_data, result.inserted_ids):
+            doc["_id"] = inserted_id
+        return obj_in_data
+
+    async def _insert(self, db: AsyncIOMotorDatabase, obj_in_data: Dict[str, Any]) -> Dict:
+        """
+        Inserts an already-encoded document and returns it with its new `_id`.
+        The returned record is built from the payload, so no re-read is needed.
+        """
         result = await db[self.collection_name].insert_one(obj_in_data)
-        created_record = await self.get(db, result.inserted_id)
-        return created_record
+        obj_in_data["_id"] = result.inserted_id
+        return obj_in_data
 
     async def update(
-        self, db: AsyncIOMotorDatabase, *, db_obj: Dict, obj_in: Union[UpdateSchemaType, Dict[str, Any]]
-    ) -> Dict:
+        self,
+        db: AsyncIOMotorDatabase,
+        *,
+        db_obj: Dict,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict]:
+        """
+        Applies `obj_in` with `$set` and returns the updated document in the
+        same round trip, limited to `projection` (by default the CRUD
+        object's own `projection`).
+        """
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.model_dump(exclude_unset=True)
-        
-        await db[self.collection_name].update_one(
-            {"_id": db_obj["_id"]}, {"$set": update_data}
+
+        return await db[self.collection_name].find_one_and_update(
+            {"_id": db_obj["_id"]},
+            {"$set": update_data},
+            projection=projection if projection is not None else self.projection,
+            return_document=ReturnDocument.AFTER,
         )
-        updated_record = await self.get(db, db_obj["_id"])
-        return updated_record
 
     async def remove(self, db: AsyncIOMotorDatabase, *, id: str) -> bool:
         delete_result = await db[self.collection_name].delete_one({"_id": ObjectId(id)})
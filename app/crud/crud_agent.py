@@ -1,11 +1,26 @@
 from typing import Optional, Dict
+from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from app.crud import CRUDBase
 from app.models.agent import AgentCreate, AgentUpdate
 
+# The face encoding is only needed to verify a face, so every other read
+# (including get_current_user on each request) leaves it out.
+AGENT_PROJECTION = {"face_mapping": 0}
+
 class CRUDAgent(CRUDBase[AgentCreate, AgentUpdate]):
+    projection = AGENT_PROJECTION
+
     async def get_by_email(self, db: AsyncIOMotorDatabase, *, email: str) -> Optional[Dict]:
-        return await db[self.collection_name].find_one({"email": email})
+        return await db[self.collection_name].find_one({"email": email}, AGENT_PROJECTION)
+
+    async def get_face_mapping(self, db: AsyncIOMotorDatabase, *, id: str) -> Optional[bytes]:
+        """The agent's packed float32 face encoding, if one was recorded."""
+        doc = await db[self.collection_name].find_one({"_id": ObjectId(id)}, {"face_mapping": 1})
+        return doc.get("face_mapping") if doc else None
+
+    async def set_face_mapping(self, db: AsyncIOMotorDatabase, *, db_obj: Dict, face_mapping: bytes) -> Optional[Dict]:
+        return await self.update(db, db_obj=db_obj, obj_in={"face_mapping": face_mapping})
 
-agent = CRUDAgent("agents")
\ No newline at end of file
+agent = CRUDAgent("agents")
@@ -0,0 +1,250 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.db.mongodb import run_in_transaction
+from app.models.ledger import BalanceSnapshot, LedgerEntryType
+
+
+# Integer kobo value of a pre-ledger wallet's float NGN `balance`.
+_LEGACY_BALANCE_KOBO = {"$toLong": {"$round": [{"$multiply": [{"$ifNull": ["$balance", 0]}, 100]}, 0]}}
+
+
+def _apply_amount(amount_kobo: int, entries: int = 1) -> List[Dict[str, Any]]:
+    """
+    Update pipeline that moves a wallet's integer balance and ledger position
+    together, and keeps the NGN `balance` mirror exact (derived, not accumulated).
+    Wallets that predate the ledger are converted on their first posting.
+    """
+    return [
+        {"$set": {
+            "balance_kobo": {"$ifNull": ["$balance_kobo", _LEGACY_BALANCE_KOBO]},
+            "opening_balance_kobo": {"$ifNull": ["$opening_balance_kobo", _LEGACY_BALANCE_KOBO]},
+        }},
+        {"$set": {
+            "balance_kobo": {"$add": ["$balance_kobo", amount_kobo]},
+            "ledger_seq": {"$add": [{"$ifNull": ["$ledger_seq", 0]}, entries]},
+            "lastUpdated": "$$NOW",
+        }},
+        {"$set": {"balance": {"$divide": ["$balance_kobo", 100]}}},
+    ]
+
+
+class CRUDLedger:
+    """
+    Append-only wallet ledger (`ledger_entries`) with periodic balance
+    snapshots (`balance_snapshots`).
+
+    Every posting bumps the wallet's `balance_kobo` and `ledger_seq` and
+    appends the entry carrying that `seq` in one transaction, so the balance
+    never moves without its entry. The wallet document therefore always holds
+    an O(1) working balance, while the full history stays auditable and the
+    authoritative balance can be rebuilt from the latest snapshot plus the
+    entries after it. Pass `session` to make a posting part of a larger
+    transaction (e.g. together with the event that caused it).
+    """
+
+    entries_collection = "ledger_entries"
+    snapshots_collection = "balance_snapshots"
+
+    async def post(
+        self,
+        db: AsyncIOMotorDatabase,
+        *,
+        wallet_id: Any,
+        entry_type: LedgerEntryType,
+        amount_kobo: int,
+        reference: Optional[str] = None,
+        require_funds: bool = False,
+        metadata: Optional[Dict[str, Any]] = None,
+        event_id: Optional[str] = None,
+        session=None,
+    ) -> Optional[Dict]:
+        """
+        Posts a signed amount to a wallet and returns the new ledger entry.
+        With `require_funds`, a debit only applies if the balance covers it;
+        otherwise (or if the wallet does not exist) None is returned.
+        `event_id` (unique across entries) ties the posting to the provider
+        event that caused it, so that event can never be posted twice.
+        """
+        if session is None:
+            return await run_in_transaction(db, lambda session: self.post(
+                db, wallet_id=wallet_id, entry_type=entry_type, amount_kobo=amount_kobo, reference=reference,
+                require_funds=require_funds, metadata=metadata, event_id=event_id, session=session,
+            ))
+
+        wallet_filter = {"_id": ObjectId(wallet_id) if isinstance(wallet_id, str) else wallet_id}
+        if require_funds and amount_kobo < 0:
+            wallet_filter["$or"] = [
+                {"balance_kobo": {"$gte": -amount_kobo}},
+                {"balance_kobo": {"$exists": False}, "balance": {"$gte": -amount_kobo / 100}},
+            ]
+
+        wallet = await db.wallets.find_one_and_update(
+            wallet_filter,
+            _apply_amount(amount_kobo),
+            projection={"balance_kobo": 1, "ledger_seq": 1},
+            return_document=ReturnDocument.AFTER,
+            session=session,
+        )
+        if not wallet:
+            return None
+
+        entry = self._entry(wallet, wallet["ledger_seq"], wallet["balance_kobo"], {
+            "entry_type": entry_type, "amount_kobo": amount_kobo, "reference": reference,
+            "metadata": metadata, "event_id": event_id,
+        })
+        result = await db[self.entries_collection].insert_one(entry, session=session)
+        entry["_id"] = result.inserted_id
+        return entry
+
+    @staticmethod
+    def _entry(wallet: Dict, seq: int, balance_after_kobo: int, posting: Dict[str, Any]) -> Dict:
+        entry = {
+            "wallet_id": str(wallet["_id"]),
+            "seq": seq,
+            "type": LedgerEntryType(posting["entry_type"]).value,
+            "amount_kobo": posting["amount_kobo"],
+            "balance_after_kobo": balance_after_kobo,
+            "reference": posting.get("reference"),
+            "metadata": posting.get("metadata") or {},
+            "created": datetime.utcnow(),
+        }
+        # Only set when present: the unique index on it is partial.
+        if posting.get("event_id"):
+            entry["event_id"] = posting["event_id"]
+        return entry
+
+    async def post_batch(
+        self, db: AsyncIOMotorDatabase, *, postings: List[Dict[str, Any]], session=None
+    ) -> List[Dict]:
+        """
+        Applies many credits at once, in one transaction. Postings are grouped
+        per wallet so each wallet is bumped by one update (total amount,
+        `seq` += count), and all resulting entries are appended with a single
+        bulk insert. Each posting is a dict with `wallet_id`, `entry_type`,
+        `amount_kobo` and optionally `reference`, `metadata` and `event_id`.
+        Funds are not checked.
+        """
+        if session is None:
+            return await run_in_transaction(db, lambda session: self.post_batch(db, postings=postings, session=session))
+
+        by_wallet: Dict[Any, List[Dict[str, Any]]] = {}
+        for posting in postings:
+            by_wallet.setdefault(posting["wallet_id"], []).append(posting)
+
+        entries = []
+        # Sequential: a session runs one operation at a time.
+        for wallet_id, wallet_postings in by_wallet.items():
+            wallet = await db.wallets.find_one_and_update(
+                {"_id": ObjectId(wallet_id) if isinstance(wallet_id, str) else wallet_id},
+                _apply_amount(sum(p["amount_kobo"] for p in wallet_postings), entries=len(wallet_postings)),
+                projection={"balance_kobo": 1, "ledger_seq": 1},
+                return_document=ReturnDocument.AFTER,
+                session=session,
+            )
+            if not wallet:
+                continue
+            first_seq = wallet["ledger_seq"] - len(wallet_postings) + 1
+            balance = wallet["balance_kobo"] - sum(p["amount_kobo"] for p in wallet_postings)
+            for offset, posting in enumerate(wallet_postings):
+                balance += posting["amount_kobo"]
+                entries.append(self._entry(wallet, first_seq + offset, balance, posting))
+
+        if entries:
+            await db[self.entries_collection].insert_many(entries, session=session)
+        return entries
+
+    async def get_latest_snapshot(self, db: AsyncIOMotorDatabase, *, wallet_id: str) -> Optional[Dict]:
+        return await db[self.snapshots_collection].find_one(
+            {"wallet_id": wallet_id}, sort=[("seq", DESCENDING)]
+        )
+
+    async def get_balance(self, db: AsyncIOMotorDatabase, *, wallet_id: str) -> Dict[str, int]:
+        """
+        Rebuilds a wallet's balance from its latest snapshot plus the entries
+        posted since. The compactor keeps that tail short, so this stays cheap.
+        """
+        snapshot = await self.get_latest_snapshot(db, wallet_id=wallet_id)
+        if snapshot:
+            base_seq, base_balance = snapshot["seq"], snapshot["balance_kobo"]
+        else:
+            wallet = await db.wallets.find_one({"_id": ObjectId(wallet_id)}, {"opening_balance_kobo": 1})
+            base_seq, base_balance = 0, (wallet or {}).get("opening_balance_kobo", 0)
+
+        pipeline = [
+            {"$match": {"wallet_id": wallet_id, "seq": {"$gt": base_seq}}},
+            {"$group": {
+                "_id": None,
+                "total": {"$sum": "$amount_kobo"},
+                "last_seq": {"$max": "$seq"},
+                "count": {"$sum": 1},
+            }},
+        ]
+        tail = await db[self.entries_collection].aggregate(pipeline).to_list(length=1)
+        if not tail:
+            return {"balance_kobo": base_balance, "seq": base_seq, "complete": True}
+        return {
+            "balance_kobo": base_balance + tail[0]["total"],
+            "seq": tail[0]["last_seq"],
+            # A gap in `seq` would mean a lost entry; such a tail is never snapshotted.
+            "complete": tail[0]["count"] == tail[0]["last_seq"] - base_seq,
+        }
+
+    async def snapshot(self, db: AsyncIOMotorDatabase, *, wallet_id: str) -> Optional[Dict]:
+        """
+        Rolls a new snapshot at the wallet's latest ledger position. Returns
+        None if the tail has a gap (so no entry is ever left out) or if another
+        worker rolled the same snapshot first.
+        """
+        balance = await self.get_balance(db, wallet_id=wallet_id)
+        if not balance["complete"]:
+            return None
+        snapshot = BalanceSnapshot(wallet_id=wallet_id, seq=balance["seq"], balance_kobo=balance["balance_kobo"])
+        snapshot_data = snapshot.model_dump()
+        try:
+            result = await db[self.snapshots_collection].update_one(
+                {"wallet_id": wallet_id, "seq": snapshot.seq}, {"$setOnInsert": snapshot_data}, upsert=True
+            )
+            rolled = result.upserted_id is not None
+        except DuplicateKeyError:
+            # Two compactors upserted the same snapshot at once; the other one won.
+            rolled = False
+        await db.wallets.update_one(
+            {"_id": ObjectId(wallet_id), "snapshot_seq": {"$not": {"$gte": snapshot.seq}}},
+            {"$set": {"snapshot_seq": snapshot.seq}},
+        )
+        return snapshot_data if rolled else None
+
+    async def wallets_due_for_snapshot(self, db: AsyncIOMotorDatabase, *, min_entries: int) -> List[str]:
+        """Ids of wallets with at least `min_entries` entries since their last snapshot."""
+        cursor = db.wallets.find(
+            {"$expr": {"$gte": [
+                {"$subtract": [{"$ifNull": ["$ledger_seq", 0]}, {"$ifNull": ["$snapshot_seq", 0]}]},
+                min_entries,
+            ]}},
+            {"_id": 1},
+        )
+        return [str(wallet["_id"]) async for wallet in cursor]
+
+    async def migrate_legacy_balances(self, db: AsyncIOMotorDatabase) -> int:
+        """
+        One-off, idempotent conversion of wallets that predate the ledger: their
+        float NGN balance becomes the integer opening balance of the ledger.
+        """
+        result = await db.wallets.update_many(
+            {"balance_kobo": {"$exists": False}},
+            [{"$set": {
+                "opening_balance_kobo": _LEGACY_BALANCE_KOBO,
+                "ledger_seq": 0,
+                "snapshot_seq": 0,
+            }},
+             {"$set": {"balance_kobo": "$opening_balance_kobo"}}],
+        )
+        return result.modified_count
+
+ledger = CRUDLedger()
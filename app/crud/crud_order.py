@@ -1,19 +1,70 @@
-from typing import List, Dict
+from typing import Any, List, Dict, Optional, Tuple
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from app.crud import CRUDBase
 from app.models.order import SaleOrderCreate, PurchaseOrderCreate, SaleOrderUpdate, PurchaseOrderUpdate
+from app.utils import cache
 
+# Response cache namespace of the admin order listings.
+ORDERS_CACHE_NAMESPACE = "orders"
 
-class CRUDSaleOrder(CRUDBase[SaleOrderCreate, SaleOrderUpdate]):
-    async def get_by_creator(self, db: AsyncIOMotorDatabase, *, creator_id: str) -> List[Dict]:
-        cursor = db[self.collection_name].find({"creator_id": creator_id})
-        return await cursor.to_list(length=None)
 
-class CRUDPurchaseOrder(CRUDBase[PurchaseOrderCreate, PurchaseOrderUpdate]):
-    async def get_by_creator(self, db: AsyncIOMotorDatabase, *, creator_id: str) -> List[Dict]:
-        cursor = db[self.collection_name].find({"creator_id": creator_id})
-        return await cursor.to_list(length=None)
+class OrderCacheInvalidationMixin:
+    """Drops the cached order listings after every write to an order collection."""
+
+    async def create(self, db: AsyncIOMotorDatabase, *, obj_in: Any) -> Dict:
+        created = await super().create(db, obj_in=obj_in)
+        await cache.invalidate(ORDERS_CACHE_NAMESPACE)
+        return created
+
+    async def update(self, db: AsyncIOMotorDatabase, *, db_obj: Dict, obj_in: Any, **kwargs) -> Optional[Dict]:
+        updated = await super().update(db, db_obj=db_obj, obj_in=obj_in, **kwargs)
+        await cache.invalidate(ORDERS_CACHE_NAMESPACE)
+        return updated
+
+    async def remove(self, db: AsyncIOMotorDatabase, *, id: str) -> bool:
+        removed = await super().remove(db, id=id)
+        await cache.invalidate(ORDERS_CACHE_NAMESPACE)
+        return removed
+
+
+class CRUDSaleOrder(OrderCacheInvalidationMixin, CRUDBase[SaleOrderCreate, SaleOrderUpdate]):
+    async def get_by_creator(
+        self, db: AsyncIOMotorDatabase, *, creator_id: str, limit: Optional[int] = None, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict], Optional[str]]:
+        return await self.get_page(db, query={"creator_id": creator_id}, limit=limit, cursor=cursor)
+
+class CRUDPurchaseOrder(OrderCacheInvalidationMixin, CRUDBase[PurchaseOrderCreate, PurchaseOrderUpdate]):
+    async def get_by_creator(
+        self, db: AsyncIOMotorDatabase, *, creator_id: str, limit: Optional[int] = None, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict], Optional[str]]:
+        return await self.get_page(db, query={"creator_id": creator_id}, limit=limit, cursor=cursor)
 
 sale_order = CRUDSaleOrder("sale_orders")
-purchase_order = CRUDPurchaseOrder("purchase_orders")
\ No newline at end of file
+purchase_order = CRUDPurchaseOrder("purchase_orders")
+
+
+async def get_orders_page(
+    db: AsyncIOMotorDatabase,
+    query: Dict[str, Any],
+    *,
+    limit: Optional[int] = None,
+    purchase_cursor: Optional[str] = None,
+    sale_cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Pages purchase and sale orders matching the same query side by side.
+    Each collection has its own cursor so clients can page them independently.
+    """
+    purchase_orders, next_purchase_cursor = await purchase_order.get_page(
+        db, query=query, limit=limit, cursor=purchase_cursor
+    )
+    sale_orders, next_sale_cursor = await sale_order.get_page(
+        db, query=query, limit=limit, cursor=sale_cursor
+    )
+    return {
+        "purchase_orders": purchase_orders,
+        "sale_orders": sale_orders,
+        "purchase_orders_next_cursor": next_purchase_cursor,
+        "sale_orders_next_cursor": next_sale_cursor,
+    }
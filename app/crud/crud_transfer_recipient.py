@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+
+class CRUDTransferRecipient:
+    """Paystack transfer recipients, one per (owner, account number, bank)."""
+
+    collection_name = "transfer_recipients"
+
+    async def get(
+        self, db: AsyncIOMotorDatabase, *, owner_id: str, account_number: str, bank_code: str
+    ) -> Optional[Dict]:
+        return await db[self.collection_name].find_one(
+            {"owner_id": owner_id, "account_number": account_number, "bank_code": bank_code}
+        )
+
+    async def upsert(
+        self, db: AsyncIOMotorDatabase, *, owner_id: str, account_number: str, bank_code: str,
+        recipient_code: str, account_name: Optional[str] = None
+    ) -> Dict:
+        now = datetime.utcnow()
+        return await db[self.collection_name].find_one_and_update(
+            {"owner_id": owner_id, "account_number": account_number, "bank_code": bank_code},
+            {
+                "$set": {"recipient_code": recipient_code, "account_name": account_name, "lastUpdated": now},
+                "$setOnInsert": {"created": now},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+
+transfer_recipient = CRUDTransferRecipient()
@@ -1,9 +1,11 @@
-from typing import Optional, Dict
+from datetime import datetime, timedelta
+from typing import Any, List, Optional, Dict
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
 from bson import ObjectId
 
 from app.crud import CRUDBase
-from app.models.wallet import WalletCreate, Transaction, WalletUpdate
+from app.models.wallet import WalletCreate, Transaction, WalletUpdate, WithdrawalTransaction, WalletStatus, WalletTransactionStatus
 from pydantic import BaseModel
 from fastapi.encoders import jsonable_encoder
 
@@ -12,21 +14,108 @@ class CRUDWallet(CRUDBase[WalletCreate, WalletUpdate]):
         return await db[self.collection_name].find_one({"owner_id": owner_id})
 
     # MODIFIED: Override the base create method to include the paystack_id
-    async def create(self, db: AsyncIOMotorDatabase, *, obj_in: WalletCreate, paystack_id: str) -> Dict:
+    async def create(
+        self,
+        db: AsyncIOMotorDatabase,
+        *,
+        obj_in: WalletCreate,
+        paystack_id: Optional[str] = None,
+        owner_type: Optional[str] = None,
+    ) -> Dict:
+        """
+        Inserts a wallet. Without a `paystack_id` the wallet starts `pending`
+        until the provisioning worker attaches its dedicated account.
+        """
         obj_in_data = jsonable_encoder(obj_in)
         # Add the paystack_account_id to the data before inserting
         obj_in_data["paystack_account_id"] = paystack_id
-        
-        result = await db[self.collection_name].insert_one(obj_in_data)
-        created_record = await self.get(db, result.inserted_id)
-        return created_record
+        obj_in_data["owner_type"] = owner_type
+        obj_in_data["status"] = WalletStatus.active.value if paystack_id else WalletStatus.pending.value
+        obj_in_data["provisioning_attempts"] = 0
+        # Ledger bookkeeping: balances move only through app.crud.crud_ledger.
+        obj_in_data["balance_kobo"] = int(round(obj_in.balance * 100))
+        obj_in_data["opening_balance_kobo"] = obj_in_data["balance_kobo"]
+        obj_in_data["ledger_seq"] = 0
+        obj_in_data["snapshot_seq"] = 0
+        return await self._insert(db, obj_in_data)
+
+    async def claim_for_provisioning(
+        self, db: AsyncIOMotorDatabase, *, wallet_id: Any, lease_seconds: int
+    ) -> Optional[Dict]:
+        """
+        Leases a pending wallet that is due for a provisioning attempt. Only one
+        worker can hold the lease, so Paystack is never called twice at once.
+        """
+        now = datetime.utcnow()
+        return await db[self.collection_name].find_one_and_update(
+            {
+                "_id": ObjectId(wallet_id) if isinstance(wallet_id, str) else wallet_id,
+                "status": WalletStatus.pending.value,
+                "provisioning_lease_until": {"$not": {"$gt": now}},
+                "provisioning_next_attempt": {"$not": {"$gt": now}},
+            },
+            {
+                "$set": {"provisioning_lease_until": now + timedelta(seconds=lease_seconds)},
+                "$inc": {"provisioning_attempts": 1},
+            },
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def get_due_for_provisioning(self, db: AsyncIOMotorDatabase, *, limit: int = 100) -> List[Any]:
+        now = datetime.utcnow()
+        cursor = db[self.collection_name].find(
+            {
+                "status": WalletStatus.pending.value,
+                "provisioning_lease_until": {"$not": {"$gt": now}},
+                "provisioning_next_attempt": {"$not": {"$gt": now}},
+            },
+            {"_id": 1},
+        ).limit(limit)
+        return [wallet["_id"] async for wallet in cursor]
 
 class CRUDTransaction:
     async def create(self, db: AsyncIOMotorDatabase, *, transaction_in: Transaction) -> Dict:
         trans_data = transaction_in.model_dump(by_alias=True, exclude=["id"])
         result = await db["transactions"].insert_one(trans_data)
-        created = await db["transactions"].find_one({"_id": result.inserted_id})
-        return created
+        trans_data["_id"] = result.inserted_id
+        return trans_data
+
+    async def create_withdrawal(
+        self, db: AsyncIOMotorDatabase, *, withdrawal_in: WithdrawalTransaction, session=None
+    ) -> Dict:
+        trans_data = withdrawal_in.model_dump()
+        result = await db["transactions"].insert_one(trans_data, session=session)
+        trans_data["_id"] = result.inserted_id
+        return trans_data
+
+    async def set_withdrawal_status_by_reference(
+        self, db: AsyncIOMotorDatabase, *, reference: str, status: str, from_statuses: List[str], session=None,
+        **fields,
+    ) -> Optional[Dict]:
+        """
+        Moves a withdrawal to `status` only if it is currently in one of
+        `from_statuses`. Returns the withdrawal if this call changed it, so
+        follow-up actions (like a reversal) run exactly once.
+        """
+        return await db["transactions"].find_one_and_update(
+            {"type": "withdrawal", "reference": reference, "status": {"$in": from_statuses}},
+            {"$set": {"status": status, "lastUpdated": datetime.utcnow(), **fields}},
+            session=session,
+        )
+
+    async def get_stale_pending_withdrawals(
+        self, db: AsyncIOMotorDatabase, *, older_than: datetime, limit: int = 100
+    ) -> List[Dict]:
+        """Pending withdrawals not updated since `older_than`, oldest first."""
+        return await db["transactions"].find(
+            {"type": "withdrawal", "status": WalletTransactionStatus.pending, "lastUpdated": {"$lt": older_than}}
+        ).sort("lastUpdated", 1).to_list(length=limit)
+
+    async def set_status(self, db: AsyncIOMotorDatabase, *, transaction_id: Any, status: str, **fields) -> None:
+        await db["transactions"].update_one(
+            {"_id": transaction_id},
+            {"$set": {"status": status, "lastUpdated": datetime.utcnow(), **fields}},
+        )
 
 wallet = CRUDWallet("wallets")
-transaction = CRUDTransaction()
\ No newline at end of file
+transaction = CRUDTransaction()
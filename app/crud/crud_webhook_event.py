@@ -0,0 +1,51 @@
+from datetime import datetime
+from typing import Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+
+class CRUDWebhookEvent:
+    """Remembers processed provider events so redeliveries are ignored."""
+
+    collection_name = "webhook_events"
+
+    async def claim(self, db: AsyncIOMotorDatabase, *, event: Dict, session=None) -> bool:
+        """
+        Records `event` (with a unique `event_id`) and returns False if it was
+        already processed. Run it in the same transaction as the event's
+        effects, so a claim only ever persists together with them. Concurrent
+        consumers are kept apart by the unique index on `event_id`.
+        """
+        collection = db[self.collection_name]
+        if await collection.find_one({"event_id": event["event_id"]}, {"_id": 1}, session=session):
+            return False
+        await collection.insert_one(
+            {"event_id": event["event_id"], "event": event.get("event"), "received": datetime.utcnow()},
+            session=session,
+        )
+        return True
+
+    async def claim_many(self, db: AsyncIOMotorDatabase, *, events: List[Dict], session=None) -> List[Dict]:
+        """
+        Like `claim` for a batch of events with distinct `event_id`s, in two
+        round trips. Returns the events that were not processed before.
+        """
+        if not events:
+            return []
+        collection = db[self.collection_name]
+        seen = {
+            doc["event_id"]
+            async for doc in collection.find(
+                {"event_id": {"$in": [event["event_id"] for event in events]}}, {"event_id": 1}, session=session
+            )
+        }
+        new_events = [event for event in events if event["event_id"] not in seen]
+        if new_events:
+            now = datetime.utcnow()
+            await collection.insert_many(
+                [{"event_id": event["event_id"], "event": event.get("event"), "received": now} for event in new_events],
+                session=session,
+            )
+        return new_events
+
+webhook_event = CRUDWebhookEvent()
@@ -0,0 +1,106 @@
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+
+def _normalize_id(id: Any) -> Any:
+    """Stored `_id`s are usually ObjectIds, but ids arrive as hex strings."""
+    if isinstance(id, str) and ObjectId.is_valid(id):
+        return ObjectId(id)
+    return id
+
+
+BatchKey = Tuple[str, Optional[Tuple[Tuple[str, Any], ...]]]
+
+
+def _batch_key(collection_name: str, projection: Optional[Dict[str, Any]]) -> BatchKey:
+    return collection_name, tuple(sorted(projection.items())) if projection is not None else None
+
+
+class BatchLoader:
+    """
+    Request-scoped document loader (DataLoader pattern).
+
+    `load()` calls issued in the same event-loop tick are coalesced into a
+    single `{"_id": {"$in": [...]}}` query per collection, and every result
+    (including misses) is memoized for the lifetime of the loader. Create one
+    per request via `app.api.deps.get_loader`, or one per background job.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.db = db
+        # Keyed by collection and projection, so differently shaped reads never mix.
+        self._cache: Dict[BatchKey, Dict[Any, asyncio.Future]] = {}
+        self._pending: Dict[BatchKey, Dict[Any, asyncio.Future]] = {}
+        # The event loop only keeps weak references to tasks.
+        self._tasks: Set[asyncio.Task] = set()
+
+    def load(
+        self, collection_name: str, id: Any, projection: Optional[Dict[str, Any]] = None
+    ) -> "asyncio.Future[Optional[Dict]]":
+        """
+        Returns a future for the document (None if there is none), limited to
+        `projection`. Each caller gets its own shielded view, so a cancelled
+        caller does not cancel the lookup for everyone else waiting on it.
+        """
+        key = _normalize_id(id)
+        batch_key = _batch_key(collection_name, projection)
+        cache = self._cache.setdefault(batch_key, {})
+        future = cache.get(key)
+        if future is None or future.cancelled():
+            future = asyncio.get_running_loop().create_future()
+            cache[key] = future
+            pending = self._pending.setdefault(batch_key, {})
+            if not pending:
+                # First request for this collection in this tick: dispatch once
+                # every other coroutine scheduled for the tick has queued its id.
+                task = asyncio.create_task(self._dispatch(batch_key))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            pending[key] = future
+        return asyncio.shield(future)
+
+    async def load_many(
+        self, collection_name: str, ids: Iterable[Any], projection: Optional[Dict[str, Any]] = None
+    ) -> List[Optional[Dict]]:
+        return list(await asyncio.gather(*(self.load(collection_name, id, projection) for id in ids)))
+
+    def prime(self, collection_name: str, doc: Dict, projection: Optional[Dict[str, Any]] = None) -> None:
+        """Seeds the cache with a document that is already in hand (read with `projection`)."""
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(doc)
+        self._cache.setdefault(_batch_key(collection_name, projection), {})[doc["_id"]] = future
+
+    def _evict(self, batch_key: BatchKey, batch: Dict[Any, asyncio.Future]) -> None:
+        cache = self._cache.get(batch_key, {})
+        for key, future in batch.items():
+            if cache.get(key) is future:
+                del cache[key]
+
+    async def _dispatch(self, batch_key: BatchKey) -> None:
+        batch = self._pending.pop(batch_key, {})
+        if not batch:
+            return
+        collection_name, projection = batch_key
+        try:
+            cursor = self.db[collection_name].find(
+                {"_id": {"$in": list(batch)}}, dict(projection) if projection is not None else None
+            )
+            docs = {doc["_id"]: doc async for doc in cursor}
+        except asyncio.CancelledError:
+            self._evict(batch_key, batch)
+            for future in batch.values():
+                future.cancel()
+            raise
+        except Exception as e:
+            # Failed lookups must not stay memoized for the request.
+            self._evict(batch_key, batch)
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(docs.get(key))
@@ -0,0 +1,105 @@
+import base64
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from bson import json_util
+from bson.errors import InvalidId
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+EXPORT_BATCH_SIZE = 500
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    """Keeps a requested page size within [1, MAX_PAGE_SIZE]."""
+    if not limit:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Dict[str, int]]:
+    """Turns a comma separated `fields` query parameter into a Mongo projection."""
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    return {name: 1 for name in names} or None
+
+
+def encode_cursor(doc: Dict[str, Any], sort_field: str = "_id") -> str:
+    """Builds an opaque cursor pointing just past `doc` in a `sort_field` ordering."""
+    payload = {"id": doc["_id"]}
+    if sort_field != "_id":
+        payload["v"] = doc.get(sort_field)
+    raw = json_util.dumps(payload).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str, sort_field: str = "_id") -> Dict[str, Any]:
+    """
+    Turns a cursor produced by `encode_cursor` into the keyset filter that
+    selects every document after it (newest first, `_id` as tie-breaker).
+    """
+    try:
+        payload = json_util.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        last_id = payload["id"]
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise InvalidCursorError(f"Invalid pagination cursor: {e}")
+
+    if sort_field == "_id":
+        return {"_id": {"$lt": last_id}}
+    last_value = payload.get("v")
+    return {
+        "$or": [
+            {sort_field: {"$lt": last_value}},
+            {sort_field: last_value, "_id": {"$lt": last_id}},
+        ]
+    }
+
+
+async def paginate(
+    collection: AsyncIOMotorCollection,
+    query: Optional[Dict[str, Any]] = None,
+    *,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    sort_field: str = "_id",
+    projection: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Returns one page of `query` results ordered newest first, and the cursor for
+    the next page (None when this is the last one). Uses a keyset filter instead
+    of skip() so the cost of a page does not grow with its depth.
+    """
+    limit = clamp_limit(limit)
+    filters = dict(query or {})
+    if cursor:
+        filters = {"$and": [filters, decode_cursor(cursor, sort_field)]}
+
+    if projection is not None and sort_field not in projection:
+        projection = {**projection, sort_field: 1}
+
+    sort = [("_id", -1)] if sort_field == "_id" else [(sort_field, -1), ("_id", -1)]
+    # Fetch one extra document to know whether another page exists.
+    docs = await collection.find(filters, projection).sort(sort).limit(limit + 1).to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1], sort_field)
+    return docs, next_cursor
+
+
+async def stream(
+    collection: AsyncIOMotorCollection,
+    query: Optional[Dict[str, Any]] = None,
+    *,
+    projection: Optional[Dict[str, Any]] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[Dict]:
+    """Yields every matching document, holding at most one cursor batch in memory."""
+    async for doc in collection.find(query or {}, projection).sort("_id", -1).batch_size(batch_size):
+        yield doc
@@ -0,0 +1,163 @@
+"""
+Declarative registry of the MongoDB indexes backing the app's query paths.
+
+Indexes are applied idempotently on startup by `connect_to_mongo`, and can also
+be applied or checked by hand:
+
+    python -m app.db.indexes          # create any missing indexes
+    python -m app.db.indexes --check  # only report missing indexes
+"""
+
+import asyncio
+import sys
+from typing import Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.core.config import settings
+
+# Listing endpoints page newest first on `_id`, so equality filters are
+# paired with `_id` descending to serve both the match and the sort.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "agents": [
+        IndexModel([("location", GEOSPHERE)]),
+        IndexModel([("email", ASCENDING)], unique=True),
+        # Signup and daily-active counts for analytics.
+        IndexModel([("created", ASCENDING)]),
+        IndexModel([("last_login", ASCENDING)]),
+    ],
+    "customers": [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("created", ASCENDING)]),
+        IndexModel([("last_login", ASCENDING)]),
+    ],
+    "admins": [
+        IndexModel([("email", ASCENDING)], unique=True),
+    ],
+    "wallets": [
+        IndexModel([("owner_id", ASCENDING)], unique=True),
+        # Deposit webhooks identify the wallet by its dedicated account number.
+        IndexModel([("paystack_account_id", ASCENDING)]),
+        # Only the few wallets still awaiting provisioning are indexed.
+        IndexModel([("status", ASCENDING)], partialFilterExpression={"status": "pending"}),
+    ],
+    "transfer_recipients": [
+        IndexModel([("owner_id", ASCENDING), ("account_number", ASCENDING), ("bank_code", ASCENDING)], unique=True),
+    ],
+    "webhook_events": [
+        IndexModel([("event_id", ASCENDING)], unique=True),
+    ],
+    "unmatched_deposits": [
+        # Parked deposits are replayed once their account's wallet is provisioned.
+        IndexModel([("account_number", ASCENDING)]),
+    ],
+    "purchase_orders": [
+        IndexModel([("creator_id", ASCENDING), ("_id", DESCENDING)]),
+        IndexModel([("linked_agents_ids", ASCENDING), ("delivering_agent_id", ASCENDING), ("_id", DESCENDING)]),
+        IndexModel([("delivering_agent_id", ASCENDING), ("_id", DESCENDING)]),
+        IndexModel([("isDelivered", ASCENDING), ("_id", DESCENDING)]),
+        IndexModel([("created", ASCENDING)]),
+    ],
+    "sale_orders": [
+        IndexModel([("creator_id", ASCENDING), ("_id", DESCENDING)]),
+        IndexModel([("linked_agents_ids", ASCENDING), ("delivering_agent_id", ASCENDING), ("_id", DESCENDING)]),
+        IndexModel([("delivering_agent_id", ASCENDING), ("_id", DESCENDING)]),
+        IndexModel([("isDelivered", ASCENDING), ("_id", DESCENDING)]),
+        IndexModel([("created", ASCENDING)]),
+    ],
+    "reviews": [
+        IndexModel([("target_agent_id", ASCENDING), ("_id", DESCENDING)]),
+        IndexModel([("author_id", ASCENDING), ("_id", DESCENDING)]),
+    ],
+    "transactions": [
+        IndexModel([("created", ASCENDING)]),
+        # Withdrawal references are sent to Paystack and must never repeat.
+        IndexModel([("reference", ASCENDING)], unique=True, sparse=True),
+        # Only withdrawals still awaiting their transfer outcome are reconciled.
+        IndexModel([("lastUpdated", ASCENDING)], partialFilterExpression={"status": "pending"}),
+    ],
+    "ledger_entries": [
+        IndexModel([("wallet_id", ASCENDING), ("seq", ASCENDING)], unique=True),
+        IndexModel([("reference", ASCENDING)]),
+        # A provider event moves money at most once, even if its claim is lost.
+        IndexModel([("event_id", ASCENDING)], unique=True, partialFilterExpression={"event_id": {"$exists": True}}),
+    ],
+    "balance_snapshots": [
+        IndexModel([("wallet_id", ASCENDING), ("seq", DESCENDING)], unique=True),
+    ],
+    "analytics": [
+        IndexModel([("date", ASCENDING)], unique=True),
+    ],
+    "prompt_cache": [
+        # Cached search results and generated images expire on their own.
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "messages": [
+        # Serves both branches of the inbox `$or` plus the sort on `created`.
+        IndexModel([("sender_id", ASCENDING), ("receiver_id", ASCENDING), ("created", ASCENDING)]),
+    ],
+    "notifications": [
+        IndexModel([("target_user_id", ASCENDING), ("_id", DESCENDING)]),
+    ],
+}
+
+
+def _key_of(index: IndexModel) -> tuple:
+    return tuple(index.document["key"].items())
+
+
+async def find_missing_indexes(db: AsyncIOMotorDatabase) -> Dict[str, List[IndexModel]]:
+    """Returns the registered indexes that do not exist yet, grouped by collection."""
+    missing = {}
+    for collection_name, indexes in INDEXES.items():
+        existing = {
+            tuple(info["key"].items())
+            async for info in db[collection_name].list_indexes()
+        }
+        absent = [index for index in indexes if _key_of(index) not in existing]
+        if absent:
+            missing[collection_name] = absent
+    return missing
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase) -> Dict[str, List[IndexModel]]:
+    """
+    Creates every registered index that is missing. Safe to run repeatedly.
+    A failure on one collection (e.g. duplicate emails blocking a unique index)
+    is reported and does not stop the others. Returns the indexes still missing.
+    """
+    missing = await find_missing_indexes(db)
+    for collection_name, indexes in missing.items():
+        try:
+            await db[collection_name].create_indexes(indexes)
+            print(f"Created {len(indexes)} index(es) on '{collection_name}'.")
+        except OperationFailure as e:
+            print(f"WARNING: Could not create indexes on '{collection_name}': {e}")
+    return await find_missing_indexes(db)
+
+
+def format_report(missing: Dict[str, List[IndexModel]]) -> str:
+    if not missing:
+        return "All registered indexes are present."
+    lines = ["Missing indexes:"]
+    for collection_name, indexes in missing.items():
+        for index in indexes:
+            lines.append(f"  {collection_name}: {index.document['name']}")
+    return "\n".join(lines)
+
+
+async def _main(check_only: bool) -> int:
+    client = AsyncIOMotorClient(settings.MONGO_DETAILS)
+    try:
+        db = client[settings.DB_NAME]
+        missing = await (find_missing_indexes(db) if check_only else ensure_indexes(db))
+        print(format_report(missing))
+        return 1 if missing else 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(check_only="--check" in sys.argv[1:])))
@@ -1,24 +1,135 @@
+import asyncio
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict
+
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import ReadPreference, monitoring
+from pymongo.errors import PyMongoError
+
 from app.core.config import settings
+from app.db.indexes import ensure_indexes, format_report
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Tracks open and checked-out connections per server for the health endpoint."""
+
+    def __init__(self):
+        self.open: Dict[str, int] = defaultdict(int)
+        self.checked_out: Dict[str, int] = defaultdict(int)
+
+    def _key(self, event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+
+    def pool_cleared(self, event):
+        self.checked_out[self._key(event)] = 0
+
+    def pool_closed(self, event):
+        self.open.pop(self._key(event), None)
+        self.checked_out.pop(self._key(event), None)
+
+    def connection_created(self, event):
+        self.open[self._key(event)] += 1
+
+    def connection_ready(self, event): pass
+
+    def connection_closed(self, event):
+        self.open[self._key(event)] = max(0, self.open[self._key(event)] - 1)
+
+    def connection_check_out_started(self, event): pass
+    def connection_check_out_failed(self, event): pass
+
+    def connection_checked_out(self, event):
+        self.checked_out[self._key(event)] += 1
+
+    def connection_checked_in(self, event):
+        self.checked_out[self._key(event)] = max(0, self.checked_out[self._key(event)] - 1)
+
 
 class DataBase:
     client: AsyncIOMotorClient = None
     db: AsyncIOMotorDatabase = None
+    analytics_db: AsyncIOMotorDatabase = None
+    pool_stats: PoolStatsListener = None
 
 database = DataBase()
 
 async def get_db() -> AsyncIOMotorDatabase:
     return database.db
 
+async def get_analytics_db() -> AsyncIOMotorDatabase:
+    """
+    Database handle for heavy read-only queries (analytics, order exports).
+    Uses MONGO_ANALYTICS_READ_PREFERENCE so these reads can be served by secondaries.
+    """
+    if database.analytics_db is None:
+        return database.db
+    return database.analytics_db
+
+async def run_in_transaction(db: AsyncIOMotorDatabase, callback: Callable[[Any], Awaitable[Any]]) -> Any:
+    """
+    Runs `callback(session)` inside a multi-document transaction and returns its
+    result. Transient errors (e.g. write conflicts) retry the whole callback.
+    Transactions need a replica set; a single-node one is enough.
+    """
+    async with await db.client.start_session() as session:
+        return await session.with_transaction(callback)
+
 async def connect_to_mongo():
     print("Connecting to MongoDB...")
-    database.client = AsyncIOMotorClient(settings.MONGO_DETAILS)
+    database.pool_stats = PoolStatsListener()
+    database.client = AsyncIOMotorClient(
+        settings.MONGO_DETAILS,
+        maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+        minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+        connectTimeoutMS=settings.MONGO_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        socketTimeoutMS=settings.MONGO_SOCKET_TIMEOUT_MS,
+        compressors=settings.MONGO_COMPRESSORS,
+        event_listeners=[database.pool_stats],
+    )
     database.db = database.client[settings.DB_NAME]
+    database.analytics_db = database.client.get_database(
+        settings.DB_NAME,
+        read_preference=getattr(ReadPreference, settings.MONGO_ANALYTICS_READ_PREFERENCE.upper()),
+    )
 
-    await database.db.agents.create_index([("location", "2dsphere")])
+    for attempt in range(1, settings.DB_CONNECT_RETRIES + 1):
+        try:
+            await database.client.admin.command("ping")
+            break
+        except PyMongoError as e:
+            if attempt == settings.DB_CONNECT_RETRIES:
+                raise
+            print(f"MongoDB ping failed (attempt {attempt}/{settings.DB_CONNECT_RETRIES}): {e}")
+            await asyncio.sleep(settings.DB_CONNECT_RETRY_DELAY_SECONDS * attempt)
+
+    missing = await ensure_indexes(database.db)
+    if missing:
+        print(format_report(missing))
     print("MongoDB connected!")
 
 async def close_mongo_connection():
     print("Closing MongoDB connection...")
     database.client.close()
-    print("MongoDB connection closed.")
\ No newline at end of file
+    print("MongoDB connection closed.")
+
+async def mongo_health() -> dict:
+    """Pings MongoDB and reports connection pool usage per server."""
+    try:
+        await database.client.admin.command("ping")
+        status = "ok"
+    except Exception as e:
+        # The endpoint is public, so the details only go to the log.
+        print(f"MongoDB health check failed: {e}")
+        status = "error"
+    return {
+        "status": status,
+        "max_pool_size": settings.MONGO_MAX_POOL_SIZE,
+        "open_connections": dict(database.pool_stats.open) if database.pool_stats else {},
+        "checked_out_connections": dict(database.pool_stats.checked_out) if database.pool_stats else {},
+    }
@@ -1,6 +1,26 @@
+import asyncio
+
 import redis.asyncio as redis
+from redis.exceptions import RedisError
+
 from app.core.config import settings
 
+class CountingConnectionPool(redis.ConnectionPool):
+    """Counts checked-out connections for the health endpoint."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.in_use = 0
+
+    async def get_connection(self, *args, **kwargs):
+        connection = await super().get_connection(*args, **kwargs)
+        self.in_use += 1
+        return connection
+
+    async def release(self, connection):
+        self.in_use = max(0, self.in_use - 1)
+        await super().release(connection)
+
 class RedisClient:
     client: redis.Redis = None
 
@@ -11,14 +31,46 @@ async def get_redis() -> redis.Redis:
 
 async def connect_to_redis():
     print("Connecting to Redis...")
-    redis_client.client = redis.Redis(
+    pool = CountingConnectionPool(
         host=settings.REDIS_HOST,
         port=settings.REDIS_PORT,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+        socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL_SECONDS,
         decode_responses=True
     )
+    redis_client.client = redis.Redis(connection_pool=pool)
+
+    for attempt in range(1, settings.DB_CONNECT_RETRIES + 1):
+        try:
+            await redis_client.client.ping()
+            break
+        except RedisError as e:
+            if attempt == settings.DB_CONNECT_RETRIES:
+                raise
+            print(f"Redis ping failed (attempt {attempt}/{settings.DB_CONNECT_RETRIES}): {e}")
+            await asyncio.sleep(settings.DB_CONNECT_RETRY_DELAY_SECONDS * attempt)
     print("Redis connected!")
 
 async def close_redis_connection():
     print("Closing Redis connection...")
     await redis_client.client.close()
-    print("Redis connection closed.")
\ No newline at end of file
+    await redis_client.client.connection_pool.disconnect()
+    print("Redis connection closed.")
+
+async def redis_health() -> dict:
+    """Pings Redis and reports connection pool usage."""
+    try:
+        await redis_client.client.ping()
+        status = "ok"
+    except Exception as e:
+        # The endpoint is public, so the details only go to the log.
+        print(f"Redis health check failed: {e}")
+        status = "error"
+    pool = redis_client.client.connection_pool
+    return {
+        "status": status,
+        "max_connections": pool.max_connections,
+        "in_use_connections": getattr(pool, "in_use", None),
+    }
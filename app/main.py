@@ -1,12 +1,22 @@
+import os
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
-from app.api.v1 import agents, auth, customers, messaging, orders, wallets, admin, analytics, products, users
+from app.api.v1 import agents, auth, customers, messaging, orders, wallets, admin, analytics, products, users, webhooks
 from app.core.config import settings
-from app.db.mongodb import close_mongo_connection, connect_to_mongo
-from app.db.redis_client import close_redis_connection, connect_to_redis
+from app.crud.pagination import InvalidCursorError
+from app.db.mongodb import close_mongo_connection, connect_to_mongo, mongo_health
+from app.db.redis_client import close_redis_connection, connect_to_redis, redis_health
+from app.services.ledger_service import start_ledger, stop_ledger
+from app.services.media_workers import start_media_workers, stop_media_workers
+from app.services.payment_service import paystack_service
+from app.services.wallet_provisioning_service import start_wallet_provisioning, stop_wallet_provisioning
+from app.services.webhook_service import start_webhook_consumer, stop_webhook_consumer
+from app.services.withdrawal_service import start_withdrawal_reconciler, stop_withdrawal_reconciler
 from app.utils.limiter import limiter
 
 
@@ -20,10 +30,27 @@ app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 
+@app.exception_handler(InvalidCursorError)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursorError):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
 app.add_event_handler("startup", connect_to_mongo)
 app.add_event_handler("startup", connect_to_redis)
+app.add_event_handler("startup", paystack_service.start)
+app.add_event_handler("startup", start_ledger)
+app.add_event_handler("startup", start_webhook_consumer)
+app.add_event_handler("startup", start_wallet_provisioning)
+app.add_event_handler("startup", start_withdrawal_reconciler)
+app.add_event_handler("startup", start_media_workers)
+app.add_event_handler("shutdown", stop_media_workers)
+app.add_event_handler("shutdown", stop_withdrawal_reconciler)
+app.add_event_handler("shutdown", stop_wallet_provisioning)
+app.add_event_handler("shutdown", stop_webhook_consumer)
+app.add_event_handler("shutdown", stop_ledger)
 app.add_event_handler("shutdown", close_mongo_connection)
 app.add_event_handler("shutdown", close_redis_connection)
+app.add_event_handler("shutdown", paystack_service.close)
 
 
 # if settings.CLIENT_ORIGIN:
@@ -56,7 +83,29 @@ app.include_router(wallets.router, prefix=settings.API_V1_STR, tags=["Wallets &
 app.include_router(messaging.router, prefix=settings.API_V1_STR, tags=["Messaging"])
 app.include_router(admin.router, prefix=settings.API_V1_STR, tags=["Admin"])
 app.include_router(analytics.router, prefix=settings.API_V1_STR, tags=["Analytics"])
+app.include_router(webhooks.router, prefix=settings.API_V1_STR, tags=["Webhooks"])
+
+if settings.STORAGE_BACKEND == "local":
+    os.makedirs(settings.LOCAL_STORAGE_PATH, exist_ok=True)
+    app.mount(settings.LOCAL_STORAGE_BASE_URL, StaticFiles(directory=settings.LOCAL_STORAGE_PATH), name="media")
 
 @app.get("/", tags=["Root"])
 async def read_root():
-    return {"message": f"Welcome to {settings.PROJECT_NAME}"}
\ No newline at end of file
+    return {"message": f"Welcome to {settings.PROJECT_NAME}"}
+
+@app.get("/health", tags=["Root"])
+async def health():
+    """
+    Liveness/readiness check. Pings MongoDB and Redis and reports connection
+    pool usage so pool sizes can be tuned against worker counts.
+    """
+    checks = {"mongodb": await mongo_health(), "redis": await redis_health()}
+    healthy = all(check["status"] == "ok" for check in checks.values())
+    return JSONResponse(
+        status_code=200 if healthy else 503,
+        content={
+            "status": "ok" if healthy else "degraded",
+            **checks,
+            "paystack_latency": paystack_service.get_metrics(),
+        },
+    )
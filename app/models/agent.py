@@ -43,7 +43,8 @@ class AgentInDB(AgentBase):
     isPhoneNumberVerified: bool = False
     personal_identification: Optional[str] = None
     isPersonalIdentificationVerified: bool = False
-    face_mapping: Optional[Any] = None
+    # Packed float32 face encoding; never part of an API response.
+    face_mapping: Optional[bytes] = Field(default=None, exclude=True)
     subscription_tier: AgentSubscriptionTier = AgentSubscriptionTier.starter
     wallet_id: Optional[str] = None
     two_fa_secret: Optional[str] = None
@@ -1,7 +1,13 @@
 from pydantic import BaseModel, Field
 from datetime import date
+from enum import Enum
 
 class DailyAnalyticsSnapshot(BaseModel):
+    """
+    One day of metrics. In week/month rollups `date` is the start of the
+    period, the `*_today` counts are summed over it, DAU is the daily average
+    and the totals are as of the period's last snapshot.
+    """
     id: str = Field(..., alias="_id")
     date: date
     
@@ -19,4 +25,9 @@ class DailyAnalyticsSnapshot(BaseModel):
     orders_fulfilled_today: int
     
     # Financial Metrics
-    total_transaction_value_today: float # Gross Merchandise Value (GMV)
\ No newline at end of file
+    total_transaction_value_today: float # Gross Merchandise Value (GMV)
+
+class AnalyticsGranularity(str, Enum):
+    day = "day"
+    week = "week"
+    month = "month"
@@ -0,0 +1,34 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Optional
+from datetime import datetime
+from enum import Enum
+
+class LedgerEntryType(str, Enum):
+    deposit = "deposit"
+    withdrawal = "withdrawal"
+    withdrawal_reversal = "withdrawal_reversal"
+    fee = "fee"
+    commission = "commission"
+    settlement = "settlement"
+
+class LedgerEntryInDB(BaseModel):
+    """
+    One immutable movement of funds. Amounts are signed integers in kobo
+    (credits positive, debits negative); `seq` is the per-wallet position.
+    """
+    id: str = Field(..., alias="_id")
+    wallet_id: str
+    seq: int
+    type: LedgerEntryType
+    amount_kobo: int
+    balance_after_kobo: int
+    reference: Optional[str] = None
+    metadata: Dict[str, Any] = {}
+    created: datetime = Field(default_factory=datetime.utcnow)
+
+class BalanceSnapshot(BaseModel):
+    """Wallet balance as of ledger entry `seq`, used as the base for balance reads."""
+    wallet_id: str
+    seq: int
+    balance_kobo: int
+    created: datetime = Field(default_factory=datetime.utcnow)
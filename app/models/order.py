@@ -58,11 +58,15 @@ class AgentOrdersResponse(BaseModel):
     """A response model to show orders linked to or delivered by an agent."""
     purchase_orders: List[PurchaseOrderInDB]
     sale_orders: List[SaleOrderInDB]
+    purchase_orders_next_cursor: Optional[str] = None
+    sale_orders_next_cursor: Optional[str] = None
 
 class AllOrdersResponse(BaseModel):
     """A response model for returning a list of all order types."""
     purchase_orders: List[PurchaseOrderInDB]
     sale_orders: List[SaleOrderInDB]
+    purchase_orders_next_cursor: Optional[str] = None
+    sale_orders_next_cursor: Optional[str] = None
 
 class SaleOrderUpdate(BaseModel):
     """Defines fields that can be updated for a Sale Order."""
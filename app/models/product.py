@@ -37,8 +37,15 @@ class ProductBase(BaseModel):
 class ProductCreate(ProductBase):
     pass
 
+class ImageVariants(BaseModel):
+    """Smaller renditions of one product image, derived in the background."""
+    original: str
+    thumbnail: Optional[str] = None
+    model_input: Optional[str] = None  # sized for the image similarity model
+
 class ProductInDB(ProductBase):
     id: str = Field(..., alias="_id")
+    image_variants: List[ImageVariants] = []
     created: datetime = Field(default_factory=datetime.utcnow)
     lastUpdated: datetime = Field(default_factory=datetime.utcnow)
 
@@ -1,6 +1,12 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
+from enum import Enum
+
+class WalletStatus(str, Enum):
+    pending = "pending"  # created; dedicated account still being provisioned
+    active = "active"
+    failed = "failed"  # provisioning gave up after repeated errors
 
 class WalletBase(BaseModel):
     owner_id: str
@@ -12,6 +18,9 @@ class WalletCreate(WalletBase):
 class WalletInDB(WalletBase):
     id: str = Field(..., alias="_id")
     paystack_account_id: Optional[str] = None
+    status: WalletStatus = WalletStatus.active
+    provisioning_error: Optional[str] = None
+    balance_kobo: Optional[int] = None
     restrictions: List[str] = []
     created: datetime = Field(default_factory=datetime.utcnow)
     lastUpdated: datetime = Field(default_factory=datetime.utcnow)
@@ -29,6 +38,24 @@ class Transaction(BaseModel):
     created: datetime = Field(default_factory=datetime.utcnow)
     lastUpdated: datetime = Field(default_factory=datetime.utcnow)
 
+class WalletTransactionStatus(str, Enum):
+    pending = "pending"
+    success = "success"
+    failed = "failed"
+
+class WithdrawalTransaction(BaseModel):
+    """A withdrawal recorded in the `transactions` collection alongside order settlements."""
+    type: str = "withdrawal"
+    wallet_id: str
+    owner_id: str
+    amount: float
+    reference: str
+    status: WalletTransactionStatus = WalletTransactionStatus.pending
+    transfer_code: Optional[str] = None
+    failure_reason: Optional[str] = None
+    created: datetime = Field(default_factory=datetime.utcnow)
+    lastUpdated: datetime = Field(default_factory=datetime.utcnow)
+
 class WithdrawalRequest(BaseModel):
     amount: float = Field(..., gt=0, description="Amount to withdraw in NGN")
     account_number: str = Field(..., description="Destination bank account number")
@@ -0,0 +1,304 @@
+import asyncio
+import hashlib
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.models.analytics import AnalyticsGranularity, DailyAnalyticsSnapshot
+from app.utils import cache
+
+# Real-time counters: one hash of per-day counts, one HyperLogLog of active
+# users per user type and day, and a hash of running totals. Day keys only
+# need to outlive the nightly snapshot that reconciles them.
+COUNTERS_DAY_KEY = "analytics:day:{day}"
+COUNTERS_DAU_KEY = "analytics:dau:{user_type}s:{day}"
+COUNTERS_TOTALS_KEY = "analytics:totals"
+COUNTERS_TTL_SECONDS = 7 * 24 * 3600
+
+COUNTER_FIELDS = (
+    "new_customers_today", "new_agents_today",
+    "new_purchase_orders_today", "new_sale_orders_today",
+    "orders_fulfilled_today",
+)
+
+
+async def _user_metrics(db: AsyncIOMotorDatabase, collection_name: str, start_date: datetime, end_date: datetime) -> Dict[str, int]:
+    """
+    Signups and active users for the period in one aggregation. The leading
+    `$or` match is served by the `created` and `last_login` indexes, so only
+    the users touched in the period are scanned.
+    """
+    window = {"$gte": start_date, "$lt": end_date}
+    pipeline = [
+        {"$match": {"$or": [{"created": window}, {"last_login": window}]}},
+        {"$group": {
+            "_id": None,
+            "new": {"$sum": {"$cond": [
+                {"$and": [{"$gte": ["$created", start_date]}, {"$lt": ["$created", end_date]}]}, 1, 0
+            ]}},
+            "active": {"$sum": {"$cond": [
+                {"$and": [{"$gte": ["$last_login", start_date]}, {"$lt": ["$last_login", end_date]}]}, 1, 0
+            ]}},
+        }},
+    ]
+    result = await db[collection_name].aggregate(pipeline).to_list(length=1)
+    return result[0] if result else {"new": 0, "active": 0}
+
+
+async def _transaction_metrics(db: AsyncIOMotorDatabase, start_date: datetime, end_date: datetime) -> Dict[str, float]:
+    """Fulfilled orders and GMV for the period in one aggregation."""
+    pipeline = [
+        {"$match": {"created": {"$gte": start_date, "$lt": end_date}, "type": {"$ne": "withdrawal"}}},
+        {"$group": {"_id": None, "count": {"$sum": 1}, "total_value": {"$sum": "$amount"}}},
+    ]
+    result = await db.transactions.aggregate(pipeline).to_list(length=1)
+    return result[0] if result else {"count": 0, "total_value": 0}
+
+
+def _total_users(db: AsyncIOMotorDatabase, collection_name: str, end_date: datetime):
+    """
+    Users that existed by `end_date`. For a period that has not ended yet that
+    is everyone, read from collection metadata without a scan; past periods
+    (e.g. backfills) count the users created before the period ended. Users
+    with no usable `created` are counted as always having existed.
+    """
+    if end_date > datetime.utcnow():
+        return db[collection_name].estimated_document_count()
+    return db[collection_name].count_documents({"created": {"$not": {"$gte": end_date}}})
+
+
+async def calculate_metrics_for_period(db: AsyncIOMotorDatabase, start_date: datetime, end_date: datetime) -> Dict:
+    """
+    Computes the dashboard metrics for a time window. Every query is
+    independent, so they all run concurrently.
+    """
+    period = {"created": {"$gte": start_date, "$lt": end_date}}
+    (
+        total_customers, total_agents,
+        customers, agents,
+        new_po, new_so,
+        transactions,
+    ) = await asyncio.gather(
+        _total_users(db, "customers", end_date),
+        _total_users(db, "agents", end_date),
+        _user_metrics(db, "customers", start_date, end_date),
+        _user_metrics(db, "agents", start_date, end_date),
+        db.purchase_orders.count_documents(period),
+        db.sale_orders.count_documents(period),
+        _transaction_metrics(db, start_date, end_date),
+    )
+
+    return {
+        "date": start_date.date(),
+        "total_customers": total_customers, "total_agents": total_agents,
+        "new_customers_today": customers["new"], "new_agents_today": agents["new"],
+        "dau_customers": customers["active"], "dau_agents": agents["active"],
+        "new_purchase_orders_today": new_po, "new_sale_orders_today": new_so,
+        "orders_fulfilled_today": transactions["count"],
+        "total_transaction_value_today": transactions["total_value"]
+    }
+
+
+def _today() -> str:
+    return datetime.utcnow().date().isoformat()
+
+
+async def _increment(redis, fields: Dict[str, float], totals: Optional[Dict[str, int]] = None) -> None:
+    # Counters are best effort: a Redis outage must not fail the write that
+    # triggered them, and the nightly snapshot corrects any drift.
+    day_key = COUNTERS_DAY_KEY.format(day=_today())
+    try:
+        pipe = redis.pipeline(transaction=False)
+        for field, amount in fields.items():
+            if isinstance(amount, float):
+                pipe.hincrbyfloat(day_key, field, amount)
+            else:
+                pipe.hincrby(day_key, field, amount)
+        pipe.expire(day_key, COUNTERS_TTL_SECONDS)
+        for field, amount in (totals or {}).items():
+            pipe.hincrby(COUNTERS_TOTALS_KEY, field, amount)
+        await pipe.execute()
+    except RedisError as e:
+        print(f"Analytics counter update failed: {e}")
+
+
+async def record_signup(redis, user_type: str) -> None:
+    await _increment(redis, {f"new_{user_type}s_today": 1}, totals={f"total_{user_type}s": 1})
+
+
+async def record_login(redis, user_type: str, user_id: str) -> None:
+    dau_key = COUNTERS_DAU_KEY.format(user_type=user_type, day=_today())
+    try:
+        pipe = redis.pipeline(transaction=False)
+        pipe.pfadd(dau_key, user_id)
+        pipe.expire(dau_key, COUNTERS_TTL_SECONDS)
+        await pipe.execute()
+    except RedisError as e:
+        print(f"Analytics DAU update failed: {e}")
+
+
+async def record_order(redis, order_type: str) -> None:
+    await _increment(redis, {f"new_{order_type}_orders_today": 1})
+
+
+async def record_transaction(redis, amount: float) -> None:
+    await _increment(redis, {"orders_fulfilled_today": 1, "total_transaction_value_today": float(amount)})
+
+
+async def read_current_metrics(redis, db: AsyncIOMotorDatabase) -> Dict:
+    """
+    Today's metrics from the Redis counters, fetched in a single pipelined
+    round trip. Totals missing from Redis (e.g. after a flush) are seeded from
+    Mongo's collection metadata.
+    """
+    day = _today()
+    pipe = redis.pipeline(transaction=False)
+    pipe.hgetall(COUNTERS_DAY_KEY.format(day=day))
+    pipe.pfcount(COUNTERS_DAU_KEY.format(user_type="customer", day=day))
+    pipe.pfcount(COUNTERS_DAU_KEY.format(user_type="agent", day=day))
+    pipe.hgetall(COUNTERS_TOTALS_KEY)
+    counters, dau_customers, dau_agents, totals = await pipe.execute()
+
+    if "total_customers" not in totals or "total_agents" not in totals:
+        totals = await _seed_totals(redis, db)
+
+    metrics = {field: int(counters.get(field, 0)) for field in COUNTER_FIELDS}
+    metrics.update({
+        "date": date.fromisoformat(day),
+        "total_customers": int(totals["total_customers"]),
+        "total_agents": int(totals["total_agents"]),
+        "dau_customers": dau_customers,
+        "dau_agents": dau_agents,
+        "total_transaction_value_today": float(counters.get("total_transaction_value_today", 0)),
+    })
+    return metrics
+
+
+async def _seed_totals(redis, db: AsyncIOMotorDatabase) -> Dict[str, int]:
+    total_customers, total_agents = await asyncio.gather(
+        db.customers.estimated_document_count(),
+        db.agents.estimated_document_count(),
+    )
+    totals = {"total_customers": total_customers, "total_agents": total_agents}
+    await redis.hset(COUNTERS_TOTALS_KEY, mapping=totals)
+    return totals
+
+
+async def reconcile_counters(redis, db: AsyncIOMotorDatabase, day: date, metrics: Dict) -> None:
+    """
+    Compares a finished day's Redis counters with the Mongo-computed snapshot,
+    logs any drift, and resets the running totals from Mongo.
+    """
+    try:
+        counters = await redis.hgetall(COUNTERS_DAY_KEY.format(day=day.isoformat()))
+        drift = {
+            field: (float(counters.get(field, 0)), metrics[field])
+            for field in COUNTER_FIELDS + ("total_transaction_value_today",)
+            if abs(float(counters.get(field, 0)) - metrics[field]) > 0.005
+        }
+        if drift:
+            print(f"Analytics counters drifted for {day} (redis, mongo): {drift}")
+        await _seed_totals(redis, db)
+    except RedisError as e:
+        print(f"Analytics counter reconciliation failed: {e}")
+
+
+def _day_start(day: date) -> datetime:
+    # Snapshots store `date` as midnight UTC; BSON has no date-only type.
+    return datetime.combine(day, time.min)
+
+
+async def create_snapshot(db: AsyncIOMotorDatabase, day: date) -> Optional[Dict]:
+    """
+    Computes and stores the snapshot for one full day. Returns the metrics, or
+    None if a snapshot for that day already exists.
+    """
+    start = _day_start(day)
+    metrics = await calculate_metrics_for_period(db, start, start + timedelta(days=1))
+    doc = {**metrics, "_id": day.isoformat(), "date": start}
+    try:
+        await db.analytics.insert_one(doc)
+    except DuplicateKeyError:
+        return None
+    return metrics
+
+
+async def backfill_snapshots(db: AsyncIOMotorDatabase, start: date, end: date) -> Dict[date, Dict]:
+    """
+    Creates the snapshots missing between `start` and `end` (inclusive),
+    computing up to ANALYTICS_BACKFILL_CONCURRENCY days at a time. Returns the
+    metrics of each day that was created.
+    """
+    existing = {
+        doc["date"].date()
+        async for doc in db.analytics.find(
+            {"date": {"$gte": _day_start(start), "$lte": _day_start(end)}}, {"date": 1}
+        )
+    }
+    missing = [
+        start + timedelta(days=offset)
+        for offset in range((end - start).days + 1)
+        if start + timedelta(days=offset) not in existing
+    ]
+    semaphore = asyncio.Semaphore(settings.ANALYTICS_BACKFILL_CONCURRENCY)
+
+    async def run(day: date) -> Optional[Dict]:
+        async with semaphore:
+            return await create_snapshot(db, day)
+
+    results = await asyncio.gather(*(run(day) for day in missing))
+    return {day: metrics for day, metrics in zip(missing, results) if metrics}
+
+
+async def get_snapshot_series(
+    db: AsyncIOMotorDatabase, *, start: date, end: date, granularity: AnalyticsGranularity
+) -> List[Dict]:
+    """Snapshots between `start` and `end`, newest first, rolled up per `granularity`."""
+    match = {"date": {"$gte": _day_start(start), "$lte": _day_start(end)}}
+    if granularity == AnalyticsGranularity.day:
+        return await db.analytics.find(match).sort("date", -1).to_list(length=None)
+
+    truncate = {"date": "$date", "unit": granularity.value}
+    if granularity == AnalyticsGranularity.week:
+        truncate["startOfWeek"] = "monday"
+    group = {"_id": {"$dateTrunc": truncate}}
+    for field in COUNTER_FIELDS + ("total_transaction_value_today",):
+        group[field] = {"$sum": f"${field}"}
+    for field in ("dau_customers", "dau_agents"):
+        group[field] = {"$avg": f"${field}"}
+    for field in ("total_customers", "total_agents"):
+        group[field] = {"$last": f"${field}"}
+
+    pipeline = [{"$match": match}, {"$sort": {"date": 1}}, {"$group": group}, {"$sort": {"_id": -1}}]
+    periods = await db.analytics.aggregate(pipeline).to_list(length=None)
+    for period in periods:
+        period["date"] = period["_id"]
+        period["_id"] = period["_id"].date().isoformat()
+        period["dau_customers"] = round(period["dau_customers"])
+        period["dau_agents"] = round(period["dau_agents"])
+    return periods
+
+
+HISTORY_CACHE_NAMESPACE = "analytics:history"
+
+
+async def get_history_json(
+    db: AsyncIOMotorDatabase, *, start: date, end: date, granularity: AnalyticsGranularity
+) -> Tuple[str, str]:
+    """
+    The serialized snapshot series and its ETag. Cached until the TTL expires
+    or a new snapshot invalidates the namespace.
+    """
+    async def produce() -> List[Dict]:
+        series = await get_snapshot_series(db, start=start, end=end, granularity=granularity)
+        return [DailyAnalyticsSnapshot(**doc).model_dump(by_alias=True) for doc in series]
+
+    body = await cache.get_or_set(
+        HISTORY_CACHE_NAMESPACE, f"{start}:{end}:{granularity.value}",
+        settings.ANALYTICS_HISTORY_CACHE_SECONDS, produce,
+    )
+    return body, f'"{hashlib.sha1(body.encode("utf-8")).hexdigest()}"'
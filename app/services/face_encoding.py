@@ -0,0 +1,89 @@
+"""
+CPU-bound face detection and encoding, run in the media worker processes.
+Importing it loads OpenCV and face_recognition (dlib), in the web process
+(through face_verification) as well as in each worker that runs a job.
+"""
+
+from typing import List, Optional
+
+import cv2
+import face_recognition
+import numpy as np
+
+
+def _largest_face_encoding(rgb_frame: np.ndarray, detection_max_dimension: int) -> Optional[np.ndarray]:
+    """
+    Detects faces on a downscaled copy of the frame (HOG detection cost grows
+    with the pixel count), then encodes the largest one at full resolution.
+    """
+    height, width = rgb_frame.shape[:2]
+    scale = min(1.0, detection_max_dimension / max(height, width))
+    small = rgb_frame
+    if scale < 1:
+        small = cv2.resize(rgb_frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+
+    locations = face_recognition.face_locations(small)
+    if not locations:
+        return None
+    top, right, bottom, left = max(locations, key=lambda box: (box[2] - box[0]) * (box[1] - box[3]))
+    location = tuple(int(round(edge / scale)) for edge in (top, right, bottom, left))
+
+    encodings = face_recognition.face_encodings(rgb_frame, [location])
+    return encodings[0] if encodings else None
+
+
+def pack_encoding(encoding: np.ndarray) -> bytes:
+    """Face encodings are stored as packed float32, a quarter of the size of a list of floats."""
+    return np.asarray(encoding, dtype=np.float32).tobytes()
+
+
+def encode_face_from_video(
+    video_path: str, samples: int, detection_max_dimension: int, stable_frames: int, stable_distance: float
+) -> Optional[bytes]:
+    """
+    Samples up to `samples` frames spread evenly through the video and encodes
+    the face found in each. Stops early once `stable_frames` encodings agree to
+    within `stable_distance` of their mean, and returns that mean (more robust
+    than any single frame) packed with `pack_encoding`, or None if no face was
+    found.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError("Could not open video file.")
+
+    encodings: List[np.ndarray] = []
+    try:
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        positions = sorted({total_frames * (i + 1) // (samples + 1) for i in range(samples)}) if total_frames > 0 else [0]
+
+        for position in positions:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+            ret, frame = cap.read()
+            if not ret:
+                continue
+            encoding = _largest_face_encoding(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), detection_max_dimension)
+            if encoding is None:
+                continue
+            encodings.append(encoding)
+
+            recent = np.array(encodings[-stable_frames:])
+            if len(recent) == stable_frames and np.all(
+                face_recognition.face_distance(recent, recent.mean(axis=0)) <= stable_distance
+            ):
+                encodings = list(recent)
+                break
+    finally:
+        cap.release()
+
+    if not encodings:
+        return None
+    return pack_encoding(np.mean(encodings, axis=0))
+
+
+def encode_face_from_image(image_bytes: bytes, detection_max_dimension: int) -> Optional[bytes]:
+    """Encodes and packs the largest face in an image, or returns None if there is none."""
+    frame = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError("Could not decode image.")
+    encoding = _largest_face_encoding(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), detection_max_dimension)
+    return None if encoding is None else pack_encoding(encoding)
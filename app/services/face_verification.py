@@ -1,74 +1,78 @@
-import face_recognition
-import cv2
-import numpy as np
-
-async def create_face_mapping_from_video(video_file) -> list:
-    """
-    Processes a video file to find a face and create a face encoding (mapping).
-    This is a simplified example. A real implementation would need more robust error handling
-    and might average encodings from multiple frames.
-    """
-    print("--- CREATING FACE MAPPING FROM VIDEO ---")
-
-    contents = await video_file.read()
-    nparr = np.frombuffer(contents, np.uint8)
-    
+import asyncio
+from typing import Optional, Union
 
-    cap = cv2.VideoCapture()
-    cap.open(video_file.filename, cv2.CAP_FFMPEG)
-    
-    face_encoding = None
-    
+import numpy as np
 
-    for _ in range(30):
-        ret, frame = cap.read()
-        if not ret:
-            break
+from app.core.config import settings
+from app.services import face_encoding, media_workers
+from app.utils.uploads import read_upload
 
+# face_recognition's own default: smaller distances mean the same person.
+FACE_MATCH_TOLERANCE = 0.6
 
-        rgb_frame = frame[:, :, ::-1]
-        
 
-        face_locations = face_recognition.face_locations(rgb_frame)
-        face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
+def unpack_face_mapping(face_mapping: Union[bytes, list]) -> np.ndarray:
+    """Decodes a stored face mapping without a per-float parse. Older agents still hold a list."""
+    if isinstance(face_mapping, list):
+        return np.asarray(face_mapping, dtype=np.float32)
+    return np.frombuffer(face_mapping, dtype=np.float32)
 
-        if face_encodings:
 
-            face_encoding = face_encodings[0]
-            print("--- FACE FOUND AND ENCODING CREATED ---")
-            break
+async def create_face_mapping_from_video(video_path: str) -> Optional[bytes]:
+    """
+    Creates a face encoding (mapping) from the video at `video_path`, averaged
+    over several sampled frames and packed as float32 bytes. Detection runs in
+    the media worker processes so it never blocks the event loop. Returns None
+    if no face was found.
+    """
+    print("--- CREATING FACE MAPPING FROM VIDEO ---")
+    try:
+        face_mapping = await media_workers.run_in_pool(
+            face_encoding.encode_face_from_video,
+            video_path,
+            settings.FACE_SAMPLE_COUNT,
+            settings.FACE_DETECTION_MAX_DIMENSION,
+            settings.FACE_STABLE_FRAMES,
+            settings.FACE_STABLE_DISTANCE,
+            timeout=settings.FACE_ENCODING_TIMEOUT_SECONDS,
+        )
+    except asyncio.TimeoutError:
+        raise ValueError("Timed out looking for a face in the video.")
 
-    cap.release()
-    
-    if face_encoding is not None:
-        return face_encoding.tolist()
-    else:
+    if face_mapping is None:
         print("--- NO FACE FOUND IN VIDEO ---")
-        return None
+    else:
+        print("--- FACE FOUND AND ENCODING CREATED ---")
+    return face_mapping
 
-async def verify_face(known_face_mapping: list, image_file) -> bool:
-    """
 
-    Compares a face in a new image with the known face mapping.
+async def verify_face(known_face_mapping: bytes, image_file) -> bool:
+    """
+    Compares a face in a new image with the known face mapping (as stored, see
+    `crud_agent.get_face_mapping`).
     """
     print("--- VERIFYING FACE ---")
-    known_encoding = np.array(known_face_mapping)
-    
-    image_contents = await image_file.read()
-    image = face_recognition.load_image_file(image_contents)
-    
-    unknown_encodings = face_recognition.face_encodings(image)
-    
-    if not unknown_encodings:
+    known_encoding = unpack_face_mapping(known_face_mapping)
+
+    image_contents = await read_upload(image_file, max_bytes=settings.MAX_IMAGE_UPLOAD_BYTES)
+    try:
+        unknown_encoding = await media_workers.run_in_pool(
+            face_encoding.encode_face_from_image,
+            image_contents,
+            settings.FACE_DETECTION_MAX_DIMENSION,
+            timeout=settings.FACE_ENCODING_TIMEOUT_SECONDS,
+        )
+    except asyncio.TimeoutError:
+        raise ValueError("Timed out looking for a face in the image.")
+
+    if unknown_encoding is None:
         print("--- NO FACE FOUND IN VERIFICATION IMAGE ---")
         return False
-        
 
-    results = face_recognition.compare_faces([known_encoding], unknown_encodings[0])
-    
-    if results[0]:
+    # Same comparison as face_recognition.compare_faces.
+    verified = bool(np.linalg.norm(known_encoding - unpack_face_mapping(unknown_encoding)) <= FACE_MATCH_TOLERANCE)
+    if verified:
         print("--- FACE VERIFIED SUCCESSFULLY ---")
     else:
         print("--- FACE VERIFICATION FAILED ---")
-        
-    return results[0]
\ No newline at end of file
+    return verified
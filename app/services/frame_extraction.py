@@ -0,0 +1,59 @@
+"""
+CPU-bound video frame extraction, run in the media worker processes.
+Kept free of heavy imports so spawned workers start quickly.
+"""
+
+import cv2
+import numpy as np
+
+
+def _downscale(frame: np.ndarray, max_dimension: int) -> np.ndarray:
+    height, width = frame.shape[:2]
+    scale = max_dimension / max(height, width)
+    if scale >= 1:
+        return frame
+    return cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+
+
+def _sharpness(frame: np.ndarray) -> float:
+    """Variance of the Laplacian: higher means more edges, i.e. less blur."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def extract_sharpest_frame(video_path: str, samples: int, max_dimension: int, jpeg_quality: int) -> bytes:
+    """
+    Reads `samples` frames spread evenly through the video (skipping the very
+    start and end), keeps the sharpest one, downscales it so its longest side
+    is at most `max_dimension` and returns it as JPEG bytes.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError("Could not open video file.")
+
+    try:
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        positions = sorted({total_frames * (i + 1) // (samples + 1) for i in range(samples)}) if total_frames > 0 else [0]
+
+        best_frame, best_score = None, -1.0
+        for position in positions:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+            ret, frame = cap.read()
+            if not ret:
+                continue
+            # Scoring the downscaled frame is cheaper and compares like with like.
+            frame = _downscale(frame, max_dimension)
+            score = _sharpness(frame)
+            if score > best_score:
+                best_frame, best_score = frame, score
+    finally:
+        cap.release()
+
+    if best_frame is None:
+        raise ValueError("Could not read any frame of the video.")
+
+    # Encode the frame as a JPEG image in memory
+    is_success, buffer = cv2.imencode(".jpg", best_frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+    if not is_success:
+        raise ValueError("Could not encode frame to JPEG.")
+    return buffer.tobytes()
@@ -1,6 +1,7 @@
 from typing import List, Dict
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.core.config import settings
+from app.crud.crud_agent import AGENT_PROJECTION
 from app.models.agent import AgentSubscriptionTier
 
 async def get_agents_in_radius(db: AsyncIOMotorDatabase, longitude: float, latitude: float) -> List[Dict]:
@@ -21,6 +22,8 @@ async def get_agents_in_radius(db: AsyncIOMotorDatabase, longitude: float, latit
                 "spherical": True,
             }
         },
+        # Drop the face encoding before the rest of the pipeline carries it along.
+        {"$project": AGENT_PROJECTION},
 
         {
             "$addFields": {
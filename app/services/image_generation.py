@@ -1,14 +1,22 @@
 
 
+import hashlib
+import json
 import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Optional
+
 import vertexai
 from vertexai.preview.vision_models import ImageGenerationModel
-from google.cloud import storage
-from google.api_core import exceptions as google_exceptions
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from starlette.concurrency import run_in_threadpool
 
 from app.core.config import settings
+from app.services import product_media_service
+from app.services.storage import get_storage
+from app.utils import cache
 
 
 try:
@@ -16,70 +24,64 @@ try:
     vertexai.init(project=settings.GOOGLE_CLOUD_PROJECT, location=settings.GOOGLE_CLOUD_REGION)
     
 
-    storage_client = storage.Client(project=settings.GOOGLE_CLOUD_PROJECT)
-    
-
     google_search_service = build("customsearch", "v1", developerKey=settings.GOOGLE_API_KEY)
 
 except Exception as e:
     print(f"CRITICAL: Failed to initialize Google Cloud services: {e}")
     print("Please ensure you have authenticated with 'gcloud auth application-default login'")
-    storage_client = None
     google_search_service = None
 
 
+IMAGE_GENERATION_MODEL_NAME = "imagegeneration@006"
 
 FORBIDDEN_PROMPT_KEYWORDS = [
     "nudity", "naked", "obscene", "violence", "hate speech",
     "self-harm", "graphic", "person", "celebrity", "portrait"
 ]
 
-async def _upload_to_gcs(image_bytes: bytes, destination_blob_name: str) -> str:
-    """Uploads image bytes to GCS and returns the public URL."""
-    if not storage_client:
-        raise Exception("Google Cloud Storage client not initialized.")
-        
-    try:
-        bucket = storage_client.bucket(settings.GCS_BUCKET_NAME)
-        blob = bucket.blob(destination_blob_name)
+PROMPT_CACHE_COLLECTION = "prompt_cache"
+GENERATED_IMAGE_CACHE_SECONDS = 30 * 24 * 3600
+SEARCH_RESULTS_CACHE_SECONDS = 24 * 3600
 
-        blob.upload_from_string(
-            image_bytes,
-            content_type="image/png"
-        )
+_image_model: Optional[ImageGenerationModel] = None
 
 
-        blob.make_public()
-        
-        return blob.public_url
-    except google_exceptions.NotFound:
-        raise Exception(f"GCS bucket '{settings.GCS_BUCKET_NAME}' not found.")
+def _get_image_model() -> ImageGenerationModel:
+    """The Imagen model handle is loaded once and shared by every request."""
+    global _image_model
+    if _image_model is None:
+        _image_model = ImageGenerationModel.from_pretrained(IMAGE_GENERATION_MODEL_NAME)
+    return _image_model
+
+
+async def _upload_image(image_bytes: bytes, destination_path: str) -> str:
+    """Saves image bytes to the configured storage backend and returns the public URL."""
+    try:
+        return await get_storage().save(image_bytes, destination_path, "image/png")
     except Exception as e:
-        print(f"Failed to upload to GCS: {e}")
+        print(f"Failed to upload generated image: {e}")
         raise Exception("Could not save generated image to cloud storage.")
 
 
-async def generate_product_image_from_prompt(prompt: str) -> str:
+async def generate_product_image_from_prompt(prompt: str, db: Optional[AsyncIOMotorDatabase] = None) -> str:
     """
-    Generates an image using Vertex AI Gemini/Imagen, saves it to GCS, 
-    and returns the public URL.
+    Generates an image using Vertex AI Gemini/Imagen, saves it to storage,
+    and returns the public URL. The blocking SDK calls run in a worker thread.
+    Given `db`, the thumbnail and model-input variants are derived as well.
     """
 
     if any(keyword in prompt.lower() for keyword in FORBIDDEN_PROMPT_KEYWORDS):
         raise ValueError("The provided description contains terms that are not allowed.")
 
     print(f"--- GENERATING IMAGE WITH VERTEX AI FOR PROMPT: '{prompt}' ---")
-    
-
-
-    model = ImageGenerationModel.from_pretrained("imagegeneration@006")
-
 
     try:
+        model = await run_in_threadpool(_get_image_model)
 
         enhanced_prompt = f"A professional, clean e-commerce product photo of: {prompt}. Centered, on a white background, without text or watermarks, hyper-realistic."
         
-        response = model.generate_images(
+        response = await run_in_threadpool(
+            model.generate_images,
             prompt=enhanced_prompt,
             number_of_images=1,
             aspect_ratio="1:1",
@@ -98,9 +100,15 @@ async def generate_product_image_from_prompt(prompt: str) -> str:
 
 
     filename = f"products/{uuid.uuid4()}.png"
-    public_url = await _upload_to_gcs(image_bytes, filename)
+    public_url = await _upload_image(image_bytes, filename)
     
     print(f"--- IMAGE GENERATED AND SAVED: {public_url} ---")
+    if db is not None:
+        try:
+            await product_media_service.create_variants(db, public_url, image_bytes)
+        except Exception as e:
+            # Products fall back to deriving them when the image is attached.
+            print(f"Could not derive variants for {public_url}: {e}")
     return public_url
 
 
@@ -114,13 +122,73 @@ async def search_google_for_prompt(prompt: str) -> dict:
         
     print(f"--- GOOGLE SEARCH FOR PROMPT: '{prompt}' ---")
     try:
-        result = (
-            google_search_service.cse()
-            .list(q=prompt, cx=settings.GOOGLE_CSE_ID, num=5)
-            .execute()
+        result = await run_in_threadpool(
+            google_search_service.cse().list(q=prompt, cx=settings.GOOGLE_CSE_ID, num=5).execute
         )
         print("--- GOOGLE SEARCH SUCCESSFUL ---")
         return result
     except HttpError as e:
         print(f"Error during Google Search API call: {e}")
-        return {"error": f"Google Search failed: {e.reason}"}
\ No newline at end of file
+        return {"error": f"Google Search failed: {e.reason}"}
+
+
+class _SearchFailed(Exception):
+    """Keeps failed searches out of the prompt cache."""
+
+
+def normalize_prompt(prompt: str) -> str:
+    return " ".join(prompt.lower().split())
+
+
+async def _cached_by_prompt(
+    db: AsyncIOMotorDatabase, kind: str, prompt: str, ttl: int, produce: Callable[[], Awaitable[Any]]
+) -> Any:
+    """
+    Returns the stored result for `prompt`, calling `produce` only if neither
+    Redis nor Mongo has it. Concurrent identical prompts share one call.
+    """
+    digest = hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+    doc_id = f"{kind}:{digest}"
+
+    async def from_mongo_or_upstream() -> Any:
+        stored = await db[PROMPT_CACHE_COLLECTION].find_one({"_id": doc_id})
+        if stored:
+            return json.loads(stored["result"])
+        result = await produce()
+        await db[PROMPT_CACHE_COLLECTION].update_one(
+            {"_id": doc_id},
+            {"$set": {
+                "prompt": normalize_prompt(prompt),
+                # Stored as JSON: search results have keys Mongo may reject.
+                "result": json.dumps(result),
+                "expires_at": datetime.utcnow() + timedelta(seconds=ttl),
+            }},
+            upsert=True,
+        )
+        return result
+
+    return json.loads(await cache.get_or_set(f"prompt:{kind}", digest, ttl, from_mongo_or_upstream))
+
+
+async def get_or_generate_product_image(db: AsyncIOMotorDatabase, prompt: str) -> str:
+    """Like `generate_product_image_from_prompt`, reusing the image already generated for the same prompt."""
+    if any(keyword in prompt.lower() for keyword in FORBIDDEN_PROMPT_KEYWORDS):
+        raise ValueError("The provided description contains terms that are not allowed.")
+    return await _cached_by_prompt(
+        db, "image", prompt, GENERATED_IMAGE_CACHE_SECONDS,
+        lambda: generate_product_image_from_prompt(prompt, db=db),
+    )
+
+
+async def get_or_search_google(db: AsyncIOMotorDatabase, prompt: str) -> dict:
+    """Like `search_google_for_prompt`, reusing recent results for the same prompt."""
+    async def search() -> dict:
+        result = await search_google_for_prompt(prompt)
+        if "error" in result:
+            raise _SearchFailed(result)
+        return result
+
+    try:
+        return await _cached_by_prompt(db, "search", prompt, SEARCH_RESULTS_CACHE_SECONDS, search)
+    except _SearchFailed as e:
+        return e.args[0]
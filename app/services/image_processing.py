@@ -0,0 +1,75 @@
+"""
+CPU-bound image preprocessing, run in the media worker processes.
+Kept free of heavy imports so spawned workers start quickly.
+"""
+
+import io
+from typing import Dict, Tuple
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+EXIF_ORIENTATION = 0x0112
+
+
+def prepare_image(image_bytes: bytes, max_dimension: int, image_format: str, quality: int) -> Tuple[bytes, str]:
+    """
+    Decodes an uploaded image, applies its EXIF orientation, shrinks it so its
+    longest side is at most `max_dimension` and re-encodes it as `image_format`
+    (JPEG or WEBP) at `quality`. Returns the new bytes and their MIME type.
+    The original is returned when re-encoding would not make it any smaller.
+    """
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        original_format, original_size = image.format, image.size
+        rotated = image.getexif().get(EXIF_ORIENTATION, 1) != 1
+        # For JPEGs, let the decoder downscale by a power of two while decoding.
+        image.draft("RGB", (max_dimension, max_dimension))
+        oriented = ImageOps.exif_transpose(image)
+    except (UnidentifiedImageError, OSError) as e:
+        raise ValueError(f"Could not decode image: {e}")
+
+    changed = rotated or max(original_size) > max_dimension
+    oriented = oriented.convert("RGB")
+    oriented.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+    output = io.BytesIO()
+    oriented.save(output, format=image_format, quality=quality, optimize=True)
+    encoded = output.getvalue()
+
+    if not changed and original_format == image_format and len(encoded) >= len(image_bytes):
+        encoded = image_bytes
+    return encoded, Image.MIME[image_format]
+
+
+def derive_variants(image_bytes: bytes, thumbnail_max_dimension: int, model_input_min_dimension: int, quality: int) -> Dict[str, bytes]:
+    """
+    Decodes an image once and returns JPEG-encoded variants of it:
+    `thumbnail`, whose longest side is at most `thumbnail_max_dimension`, and
+    `model_input`, whose shortest side is `model_input_min_dimension` (what
+    CLIP-style models resize to before center-cropping).
+    """
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        # JPEG can decode at a reduced scale, as long as both variants still fit.
+        draft_dimension = max(thumbnail_max_dimension, model_input_min_dimension)
+        image.draft("RGB", (draft_dimension, draft_dimension))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+    except (UnidentifiedImageError, OSError) as e:
+        raise ValueError(f"Could not decode image: {e}")
+
+    thumbnail = image.copy()
+    thumbnail.thumbnail((thumbnail_max_dimension, thumbnail_max_dimension), Image.LANCZOS)
+
+    model_input = image
+    scale = model_input_min_dimension / min(image.size)
+    if scale < 1:
+        model_input = image.resize(
+            (round(image.width * scale), round(image.height * scale)), Image.LANCZOS
+        )
+
+    variants = {}
+    for name, variant in (("thumbnail", thumbnail), ("model_input", model_input)):
+        output = io.BytesIO()
+        variant.save(output, format="JPEG", quality=quality, optimize=True)
+        variants[name] = output.getvalue()
+    return variants
@@ -0,0 +1,56 @@
+import asyncio
+from typing import Optional
+
+from pymongo.errors import PyMongoError
+
+from app.core.config import settings
+from app.crud.crud_ledger import ledger
+from app.db.mongodb import get_db
+
+_compactor_task: Optional[asyncio.Task] = None
+
+
+async def compact_once(db) -> int:
+    """
+    Snapshots every wallet whose ledger tail has grown past the threshold.
+    Every worker runs a compactor; snapshots are idempotent, and a failure on
+    one wallet does not stop the pass.
+    """
+    rolled = 0
+    wallet_ids = await ledger.wallets_due_for_snapshot(db, min_entries=settings.LEDGER_SNAPSHOT_MIN_ENTRIES)
+    for wallet_id in wallet_ids:
+        try:
+            if await ledger.snapshot(db, wallet_id=wallet_id):
+                rolled += 1
+        except PyMongoError as e:
+            print(f"Ledger compactor could not snapshot wallet {wallet_id}: {e}")
+    return rolled
+
+
+async def _run_compactor():
+    db = await get_db()
+    while True:
+        try:
+            rolled = await compact_once(db)
+            if rolled:
+                print(f"Ledger compactor rolled {rolled} balance snapshot(s).")
+        except Exception as e:
+            print(f"Ledger compactor error: {e}")
+        await asyncio.sleep(settings.LEDGER_COMPACTION_INTERVAL_SECONDS)
+
+
+async def start_ledger():
+    """Startup hook: migrates pre-ledger wallets and starts the background compactor."""
+    global _compactor_task
+    migrated = await ledger.migrate_legacy_balances(await get_db())
+    if migrated:
+        print(f"Migrated {migrated} wallet(s) onto the ledger.")
+    _compactor_task = asyncio.create_task(_run_compactor())
+
+
+async def stop_ledger():
+    """Shutdown hook: stops the background compactor."""
+    global _compactor_task
+    if _compactor_task:
+        _compactor_task.cancel()
+        _compactor_task = None
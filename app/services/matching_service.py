@@ -1,5 +1,6 @@
 # app/services/matching_service.py
 
+import asyncio
 import torch
 import httpx
 from PIL import Image
@@ -9,7 +10,9 @@ from transformers import CLIPProcessor, CLIPModel
 from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 
-from app.crud import purchase_order, sale_order
+from app.crud import purchase_order, sale_order, product
+from app.crud.loader import BatchLoader
+from app.services.product_media_service import get_variants
 
 # --- Load Models at Startup ---
 # This ensures that the models are loaded into memory only once, not on every call.
@@ -103,6 +106,21 @@ async def get_text_similarity(text1: str, text2: str) -> float:
         return 0.0
 
 
+def product_model_image(product_doc: dict) -> str:
+    """The product's first image, in its model-input size when that has been derived."""
+    image_url = product_doc["images"][0]
+    for variants in product_doc.get("image_variants") or []:
+        if variants.get("original") == image_url and variants.get("model_input"):
+            return variants["model_input"]
+    return image_url
+
+
+async def model_images_for_urls(db: AsyncIOMotorDatabase, urls: list) -> dict:
+    """Maps each image URL to its model-input variant, or to itself if it has none."""
+    variants = await get_variants(db, list(set(urls)))
+    return {url: variants.get(url, {}).get("model_input") or url for url in urls}
+
+
 # --- Main Matching Logic (No changes needed here) ---
 
 async def run_matching_cycle(db: AsyncIOMotorDatabase, new_order_id: str, order_type: str):
@@ -111,19 +129,25 @@ async def run_matching_cycle(db: AsyncIOMotorDatabase, new_order_id: str, order_
     This function now calls the actual AI/ML implementations.
     """
     print(f"Starting matching cycle for new {order_type} order: {new_order_id}")
+    loader = BatchLoader(db)
 
     if order_type == "purchase":
         # ... (logic remains exactly the same as before) ...
         new_po = await purchase_order.purchase_order.get(db, id=new_order_id)
         if not new_po: return
         all_so = await sale_order.sale_order.get_multi(db, limit=1000)
+        # Fetch every sale order's product in a single batched query.
+        so_products = await asyncio.gather(*(product.load(loader, so["product_id"]) for so in all_so))
+        # CLIP only needs 224px, so compare the small variants rather than the originals.
+        po_image = None
+        if new_po.get("product_image"):
+            po_image = (await model_images_for_urls(db, [new_po["product_image"]]))[new_po["product_image"]]
         scored_matches = []
-        for so in all_so:
-            so_product = await db.products.find_one({"_id": so["product_id"]})
+        for so, so_product in zip(all_so, so_products):
             if not so_product: continue
             score = 0
-            if so_product.get("images") and new_po.get("product_image"):
-                score = await get_image_similarity(so_product["images"][0], new_po["product_image"])
+            if so_product.get("images") and po_image:
+                score = await get_image_similarity(product_model_image(so_product), po_image)
             elif so_product.get("description") and new_po.get("product_description"):
                 score = await get_text_similarity(so_product["description"], new_po["product_description"])
             if score > 0:
@@ -136,14 +160,15 @@ async def run_matching_cycle(db: AsyncIOMotorDatabase, new_order_id: str, order_
         # ... (logic remains exactly the same as before) ...
         new_so = await sale_order.sale_order.get(db, id=new_order_id)
         if not new_so: return
-        so_product = await db.products.find_one({"_id": new_so["product_id"]})
+        so_product = await product.load(loader, new_so["product_id"])
         if not so_product: return
         all_po = await purchase_order.purchase_order.get_multi(db, limit=1000)
+        po_images = await model_images_for_urls(db, [po["product_image"] for po in all_po if po.get("product_image")])
         scored_matches = []
         for po in all_po:
             score = 0
             if so_product.get("images") and po.get("product_image"):
-                score = await get_image_similarity(so_product["images"][0], po["product_image"])
+                score = await get_image_similarity(product_model_image(so_product), po_images[po["product_image"]])
             elif so_product.get("description") and po.get("product_description"):
                 score = await get_text_similarity(so_product["description"], po["product_description"])
             if score > 0:
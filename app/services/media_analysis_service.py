@@ -1,63 +1,71 @@
-import cv2
+import asyncio
+import hashlib
+from datetime import datetime
+from typing import List, Optional
+
 import numpy as np
 import vertexai
 from vertexai.generative_models import GenerativeModel, Part, FinishReason
 import vertexai.preview.generative_models as generative_models
 from sklearn.metrics.pairwise import cosine_similarity
 import json
+from motor.motor_asyncio import AsyncIOMotorDatabase
 # Import the text model we already loaded in the matching service
 from app.services.matching_service import text_model
 from app.models.product import ProductCategory
+from app.core.config import settings
+from app.services import frame_extraction, image_processing, media_workers
+from app.utils import cache
 
 # --- Video Processing ---
 
-def extract_frame_from_video(video_bytes: bytes) -> bytes:
+async def extract_frame_from_video(video_path: str) -> bytes:
     """
-    Extracts a single frame from the middle of a video byte stream.
-    Returns the frame as JPEG image bytes.
+    Picks the sharpest of several frames sampled across the video at
+    `video_path` and returns it, downscaled, as JPEG image bytes. Decoding runs
+    in the media worker processes so it never blocks the event loop.
     """
-    # Write video bytes to a temporary file, as OpenCV works best with file paths
-    temp_video_path = "/tmp/temp_video.mp4"
-    with open(temp_video_path, "wb") as f:
-        f.write(video_bytes)
-
-    cap = cv2.VideoCapture(temp_video_path)
-    if not cap.isOpened():
-        raise ValueError("Could not open video file.")
-
     try:
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        # Go to the frame in the middle of the video
-        middle_frame_index = total_frames // 2
-        cap.set(cv2.CAP_PROP_POS_FRAMES, middle_frame_index)
-
-        ret, frame = cap.read()
-        if not ret:
-            raise ValueError("Could not read the middle frame of the video.")
+        return await media_workers.run_in_pool(
+            frame_extraction.extract_sharpest_frame,
+            video_path,
+            settings.FRAME_SAMPLE_COUNT,
+            settings.FRAME_MAX_DIMENSION,
+            settings.FRAME_JPEG_QUALITY,
+            timeout=settings.FRAME_EXTRACTION_TIMEOUT_SECONDS,
+        )
+    except asyncio.TimeoutError:
+        raise ValueError("Timed out extracting a frame from the video.")
 
-        # Encode the frame as a JPEG image in memory
-        is_success, buffer = cv2.imencode(".jpg", frame)
-        if not is_success:
-            raise ValueError("Could not encode frame to JPEG.")
 
-        return buffer.tobytes()
-    finally:
-        cap.release()
+async def prepare_image_for_vision(image_bytes: bytes) -> tuple:
+    """
+    Orients, downsizes and re-encodes an uploaded photo so the vision call
+    carries a smaller payload. Returns the new bytes and their MIME type.
+    """
+    try:
+        return await media_workers.run_in_pool(
+            image_processing.prepare_image,
+            image_bytes,
+            settings.VISION_IMAGE_MAX_DIMENSION,
+            settings.VISION_IMAGE_FORMAT.upper(),
+            settings.VISION_IMAGE_QUALITY,
+            timeout=settings.IMAGE_PROCESSING_TIMEOUT_SECONDS,
+        )
+    except asyncio.TimeoutError:
+        raise ValueError("Timed out processing the image.")
 
 
 # --- AI Model Services ---
 
-async def generate_product_details_from_media(media_bytes: bytes, mime_type: str) -> dict:
-    """
-    Uses the Gemini Pro Vision model to generate a name, description, and keywords
-    from a given image or video frame.
-    """
-    if not mime_type.startswith("image/"):
-        raise ValueError("Invalid MIME type for media analysis, must be an image.")
-
-    model = GenerativeModel("gemini-1.5-flash-001")
+ANALYSIS_MODEL_NAME = "gemini-1.5-flash-001"
+# Bump when the prompt or generation settings change, so cached results are not reused.
+ANALYSIS_PROMPT_VERSION = "1"
+ANALYSIS_CACHE_KEY = "media_analysis:{digest}"
+ANALYSIS_CACHE_TTL_SECONDS = 7 * 24 * 3600
+ANALYSIS_COLLECTION = "media_analyses"
 
-    prompt = """
+ANALYSIS_PROMPT = """
     You are an expert e-commerce catalog manager for a Nigerian marketplace called 'o42'.
     Analyze this image of a product. Based ONLY on the visual information, provide a response in valid JSON format with three keys: "name", "description", and "keywords".
 
@@ -73,21 +81,40 @@ async def generate_product_details_from_media(media_bytes: bytes, mime_type: str
     }
     """
 
+GENERATION_CONFIG = {"max_output_tokens": 2048, "temperature": 0.4, "top_p": 1.0, "top_k": 32}
+SAFETY_SETTINGS = {
+    generative_models.HarmCategory.HARM_CATEGORY_HATE_SPEECH: generative_models.SafetySetting.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+    generative_models.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: generative_models.SafetySetting.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+    generative_models.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: generative_models.SafetySetting.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+    generative_models.HarmCategory.HARM_CATEGORY_HARASSMENT: generative_models.SafetySetting.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+}
+
+_model: Optional[GenerativeModel] = None
+
+
+def _get_model() -> GenerativeModel:
+    """The Gemini client is created once and shared by every request."""
+    global _model
+    if _model is None:
+        _model = GenerativeModel(ANALYSIS_MODEL_NAME)
+    return _model
+
+
+async def generate_product_details_from_media(media_bytes: bytes, mime_type: str) -> dict:
+    """
+    Uses the Gemini Pro Vision model to generate a name, description, and keywords
+    from a given image or video frame.
+    """
+    if not mime_type.startswith("image/"):
+        raise ValueError("Invalid MIME type for media analysis, must be an image.")
+
     media_part = Part.from_data(data=media_bytes, mime_type=mime_type)
-    
-    generation_config = {"max_output_tokens": 2048, "temperature": 0.4, "top_p": 1.0, "top_k": 32}
-    safety_settings = {
-        generative_models.HarmCategory.HARM_CATEGORY_HATE_SPEECH: generative_models.SafetySetting.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-        generative_models.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: generative_models.SafetySetting.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-        generative_models.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: generative_models.SafetySetting.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-        generative_models.HarmCategory.HARM_CATEGORY_HARASSMENT: generative_models.SafetySetting.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-    }
 
     try:
-        response = await model.generate_content_async(
-            [media_part, prompt],
-            generation_config=generation_config,
-            safety_settings=safety_settings
+        response = await _get_model().generate_content_async(
+            [media_part, ANALYSIS_PROMPT],
+            generation_config=GENERATION_CONFIG,
+            safety_settings=SAFETY_SETTINGS
         )
         # Assuming the model returns a clean JSON string
         return json.loads(response.text)
@@ -96,25 +123,77 @@ async def generate_product_details_from_media(media_bytes: bytes, mime_type: str
         raise ValueError("Failed to generate product details from media.")
 
 
-def find_best_category(text_to_compare: str) -> str:
+def media_digest(media_bytes: bytes) -> str:
+    """Content hash identifying an analysis: same bytes, same model and prompt, same result."""
+    digest = hashlib.sha256(f"{ANALYSIS_MODEL_NAME}:{ANALYSIS_PROMPT_VERSION}:".encode("utf-8"))
+    digest.update(media_bytes)
+    return digest.hexdigest()
+
+
+async def analyze_media(
+    db: AsyncIOMotorDatabase, redis, media_bytes: bytes, mime_type: str, *, preprocess: bool = True
+) -> dict:
     """
-    Finds the most semantically similar category from the ProductCategory enum
-    using the pre-loaded sentence-transformer model.
+    Like `generate_product_details_from_media`, but identical media is only
+    sent to Gemini once: results are cached in Redis and persisted in Mongo
+    under the content hash of the media. Unless `preprocess` is False (e.g.
+    for frames that are already downscaled), the image is prepared with
+    `prepare_image_for_vision` on a cache miss.
+    """
+    digest = media_digest(media_bytes)
+    cache_key = ANALYSIS_CACHE_KEY.format(digest=digest)
+    cached = await cache.read(redis, cache_key)
+    if cached:
+        return json.loads(cached)
+
+    stored = await db[ANALYSIS_COLLECTION].find_one({"_id": digest})
+    if stored:
+        details = stored["details"]
+    else:
+        if preprocess:
+            media_bytes, mime_type = await prepare_image_for_vision(media_bytes)
+        details = await generate_product_details_from_media(media_bytes, mime_type)
+        await db[ANALYSIS_COLLECTION].update_one(
+            {"_id": digest},
+            {"$set": {"details": details, "created": datetime.utcnow()}},
+            upsert=True,
+        )
+
+    await cache.write(redis, cache_key, json.dumps(details), ANALYSIS_CACHE_TTL_SECONDS)
+    return details
+
+
+_category_embeddings = None
+
+
+def _get_category_embeddings():
+    """The category list is fixed, so its embeddings are computed only once."""
+    global _category_embeddings
+    if _category_embeddings is None:
+        _category_embeddings = text_model.encode([item.value for item in ProductCategory])
+    return _category_embeddings
+
+
+def find_best_categories(texts: List[str]) -> List[str]:
+    """
+    Finds the most semantically similar ProductCategory for each text, embedding
+    all the texts in a single batched call to the sentence-transformer model.
     """
     if not text_model:
         raise RuntimeError("Text similarity model is not loaded.")
 
-    # Get all possible category values from the enum
     categories = [item.value for item in ProductCategory]
-    
-    # Generate embeddings
-    text_embedding = text_model.encode([text_to_compare])
-    category_embeddings = text_model.encode(categories)
-    
-    # Calculate similarity scores
-    similarities = cosine_similarity(text_embedding, category_embeddings)
-    
-    # Find the index of the highest score
-    best_match_index = np.argmax(similarities)
-    
-    return categories[best_match_index]
\ No newline at end of file
+    similarities = cosine_similarity(text_model.encode(texts), _get_category_embeddings())
+    return [categories[index] for index in np.argmax(similarities, axis=1)]
+
+
+def find_best_category(text_to_compare: str) -> str:
+    """
+    Finds the most semantically similar category from the ProductCategory enum
+    using the pre-loaded sentence-transformer model.
+    """
+    return find_best_categories([text_to_compare])[0]
+
+
+def categorization_text(product_details: dict) -> str:
+    return f"{product_details['name']} {' '.join(product_details['keywords'])}"
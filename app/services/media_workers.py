@@ -0,0 +1,105 @@
+import asyncio
+import multiprocessing
+from multiprocessing.pool import Pool
+from typing import Any, Callable, Optional, Set
+
+from app.core.config import settings
+
+
+class _WorkerPool:
+    """
+    A pool of media worker processes. A job that times out cannot be stopped
+    on its own, so its pool is retired: new jobs go to a fresh pool and the
+    old one is terminated, stuck worker included, once its other jobs finish.
+    """
+
+    def __init__(self):
+        # "spawn" so workers do not inherit the server's event loop, sockets and
+        # loaded ML models; they only import the small modules their jobs live in.
+        self.pool: Pool = multiprocessing.get_context("spawn").Pool(processes=settings.MEDIA_WORKER_PROCESSES)
+        self.active = 0
+        self.retired = False
+
+    def terminate_if_idle(self) -> None:
+        if self.retired and self.active == 0:
+            _retired.discard(self)
+            # terminate() joins the workers, so keep it off the event loop.
+            asyncio.get_running_loop().run_in_executor(None, self.pool.terminate)
+
+
+_workers: Optional[_WorkerPool] = None
+_retired: Set[_WorkerPool] = set()
+# One job per worker process, so a job's timeout only runs while it runs.
+_slots: Optional[asyncio.Semaphore] = None
+
+
+def _submit(pool: Pool, fn: Callable[..., Any], args: tuple) -> asyncio.Future:
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def settle(setter: Callable[[Any], None], value: Any) -> None:
+        if not future.done():
+            setter(value)
+
+    def notify(setter: Callable[[Any], None], value: Any) -> None:
+        # Called from the pool's result thread.
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(settle, setter, value)
+
+    pool.apply_async(
+        fn, args,
+        callback=lambda result: notify(future.set_result, result),
+        error_callback=lambda e: notify(future.set_exception, e),
+    )
+    return future
+
+
+async def run_in_pool(fn: Callable[..., Any], *args: Any, timeout: float) -> Any:
+    """
+    Runs a CPU-bound function in the media worker processes, keeping it off the
+    event loop and out of the GIL. Raises asyncio.TimeoutError if the job runs
+    for more than `timeout` seconds, not counting time spent waiting for a free
+    worker, and kills the worker running it. Without started workers (scripts,
+    tests) it runs in a thread.
+    """
+    if _workers is None:
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(None, fn, *args), timeout=timeout)
+
+    async with _slots:
+        workers = _workers
+        workers.active += 1
+        try:
+            return await asyncio.wait_for(_submit(workers.pool, fn, args), timeout=timeout)
+        except asyncio.TimeoutError:
+            _recycle(workers)
+            raise
+        finally:
+            workers.active -= 1
+            workers.terminate_if_idle()
+
+
+def _recycle(workers: _WorkerPool) -> None:
+    global _workers
+    if workers.retired:
+        return
+    print("Media job timed out; replacing the worker pool")
+    workers.retired = True
+    _retired.add(workers)
+    _workers = _WorkerPool()
+
+
+async def start_media_workers():
+    global _workers, _slots
+    _workers = _WorkerPool()
+    _slots = asyncio.Semaphore(settings.MEDIA_WORKER_PROCESSES)
+
+
+async def stop_media_workers():
+    global _workers, _slots
+    for workers in [_workers, *_retired]:
+        if workers:
+            workers.pool.terminate()
+    _retired.clear()
+    _workers = None
+    _slots = None
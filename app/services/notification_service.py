@@ -1,5 +1,7 @@
 
 
+from typing import List
+
 from fastapi import HTTPException
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
@@ -94,4 +96,38 @@ async def create_and_dispatch_notification(
 
     await manager.send_personal_message(message_data, target_user_id)
     
-    print(f"Dispatched notification and in-app message to user {target_user_id}")
\ No newline at end of file
+    print(f"Dispatched notification and in-app message to user {target_user_id}")
+
+
+async def dispatch_notifications(
+    db: AsyncIOMotorDatabase,
+    target_users: List[dict],
+    subject: str,
+    message_body: str
+):
+    """
+    Like `create_and_dispatch_notification` for many users at once: the
+    notification and in-app message records are written with one insert
+    each instead of two round trips per user.
+    """
+    if not target_users:
+        return
+    target_user_ids = [str(user["_id"]) for user in target_users]
+
+    await crud_notification.notification.create_multi(db, objs_in=[
+        NotificationCreate(target_user_id=user_id, subject=subject, message=message_body)
+        for user_id in target_user_ids
+    ])
+    created_messages = await crud_message.message.create_multi(db, objs_in=[
+        MessageCreate(sender_id=settings.SYSTEM_ADMIN_USER_ID, receiver_id=user_id, encrypted_content=message_body)
+        for user_id in target_user_ids
+    ])
+
+    for target_user, target_user_id, created_message in zip(target_users, target_user_ids, created_messages):
+        if target_user.get("email"):
+            await send_email(to_email=target_user["email"], subject=subject, html_content=f"<p>{message_body}</p>")
+        if target_user.get("phone_number"):
+            await send_sms(phone_number=target_user["phone_number"], message=message_body)
+        await manager.send_personal_message(jsonable_encoder(created_message), target_user_id)
+
+    print(f"Dispatched notification and in-app message to {len(target_users)} users")
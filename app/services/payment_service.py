@@ -1,10 +1,74 @@
+import asyncio
+import random
+import time
 import httpx
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 from app.core.config import settings
 
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx when installed)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 PAYSTACK_BASE_URL = "https://api.paystack.co"
 
+# Endpoints that are slower on Paystack's side get a longer read timeout.
+ENDPOINT_TIMEOUTS = {
+    "/dedicated_account": 20.0,
+    "/transfer": 30.0,
+}
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Endpoints ending in an id, reported under one metrics entry each.
+PARAMETERIZED_ENDPOINTS = ("/transfer/verify/",)
+
+
+def _endpoint_name(endpoint: str) -> str:
+    for prefix in PARAMETERIZED_ENDPOINTS:
+        if endpoint.startswith(prefix):
+            return f"{prefix}:reference"
+    return endpoint
+
+
+class PaystackError(Exception):
+    """A Paystack call failed without a definite answer; it may have taken effect."""
+
+
+class PaystackRejectedError(PaystackError):
+    """Paystack answered with a 4xx, so the request definitely did not take effect."""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class EndpointStats:
+    """Latency and error counters for one Paystack endpoint."""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms: float, failed: bool):
+        self.count += 1
+        self.errors += int(failed)
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 2),
+        }
+
+
 class PaystackService:
     def __init__(self, secret_key: str):
         self.secret_key = secret_key
@@ -12,21 +76,99 @@ class PaystackService:
             "Authorization": f"Bearer {self.secret_key}",
             "Content-Type": "application/json",
         }
+        self.client: Optional[httpx.AsyncClient] = None
+        self.metrics: Dict[str, EndpointStats] = {}
+
+    async def start(self):
+        """Opens the shared, keep-alive HTTP client. Called on app startup."""
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                base_url=PAYSTACK_BASE_URL,
+                headers=self.headers,
+                http2=HTTP2_AVAILABLE,
+                timeout=httpx.Timeout(settings.PAYSTACK_TIMEOUT_SECONDS, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=settings.PAYSTACK_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.PAYSTACK_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+            )
+
+    async def close(self):
+        """Closes the shared HTTP client. Called on app shutdown."""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
 
-    async def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None) -> Dict[str, Any]:
-        """Helper method to make requests to Paystack API."""
-        async with httpx.AsyncClient() as client:
+    def get_metrics(self) -> Dict[str, Dict[str, float]]:
+        return {endpoint: stats.as_dict() for endpoint, stats in self.metrics.items()}
+
+    async def _send(self, method: str, endpoint: str, data: Optional[Dict], params: Optional[Dict]) -> httpx.Response:
+        if self.client is None:
+            # Outside the app lifecycle (scripts, workers) the client is opened lazily.
+            await self.start()
+        timeout = ENDPOINT_TIMEOUTS.get(endpoint, settings.PAYSTACK_TIMEOUT_SECONDS)
+        stats = self.metrics.setdefault(_endpoint_name(endpoint), EndpointStats())
+        started = time.perf_counter()
+        failed = True
+        try:
+            response = await self.client.request(
+                method, endpoint, json=data, params=params,
+                timeout=httpx.Timeout(timeout, connect=5.0),
+            )
+            failed = response.status_code >= 400
+            return response
+        finally:
+            stats.record((time.perf_counter() - started) * 1000, failed)
+
+    async def _make_request(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict] = None,
+        params: Optional[Dict] = None,
+        idempotent: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        """
+        Helper method to make requests to Paystack API.
+        Idempotent calls (GETs by default) are retried on connection errors and
+        429/5xx responses with exponential backoff and full jitter. Raises
+        PaystackRejectedError for 4xx answers and PaystackError otherwise.
+        """
+        if idempotent is None:
+            idempotent = method.upper() == "GET"
+        attempts = settings.PAYSTACK_MAX_RETRIES + 1 if idempotent else 1
+
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
             try:
-                response = await client.request(method, f"{PAYSTACK_BASE_URL}{endpoint}", json=data, headers=self.headers)
+                response = await self._send(method, endpoint, data, params)
+                if response.status_code in RETRYABLE_STATUS_CODES and not last_attempt:
+                    await self._backoff(attempt)
+                    continue
                 response.raise_for_status()
                 return response.json()
             except httpx.HTTPStatusError as e:
                 print(f"Paystack API Error: {e.response.status_code} - {e.response.text}")
-
-                raise Exception(f"Paystack service failed: {e.response.json().get('message', 'Unknown error')}")
+                try:
+                    message = e.response.json().get("message", "Unknown error")
+                except ValueError:
+                    message = "Unknown error"
+                status_code = e.response.status_code
+                if 400 <= status_code < 500:
+                    raise PaystackRejectedError(f"Paystack service failed: {message}", status_code)
+                raise PaystackError(f"Paystack service failed: {message}")
+            except httpx.TransportError as e:
+                if not last_attempt:
+                    await self._backoff(attempt)
+                    continue
+                print(f"An unexpected error occurred with Paystack request: {e}")
+                raise PaystackError("An unexpected error occurred with the payment service.")
             except Exception as e:
                 print(f"An unexpected error occurred with Paystack request: {e}")
-                raise Exception("An unexpected error occurred with the payment service.")
+                raise PaystackError("An unexpected error occurred with the payment service.")
+
+    async def _backoff(self, attempt: int):
+        await asyncio.sleep(random.uniform(0, settings.PAYSTACK_RETRY_BACKOFF_SECONDS * (2 ** attempt)))
 
     async def create_customer(self, email: str, first_name: str, last_name: str, phone: str) -> Dict[str, Any]:
         """Creates a customer on Paystack, which is required for DVA."""
@@ -37,7 +179,8 @@ class PaystackService:
             "last_name": last_name,
             "phone": phone
         }
-        response = await self._make_request("POST", "/customer", data=payload)
+        # Paystack de-duplicates customers by email, so this call is safe to retry.
+        response = await self._make_request("POST", "/customer", data=payload, idempotent=True)
         return response.get("data")
 
     async def create_dedicated_virtual_account(self, customer_code: str) -> Dict[str, Any]:
@@ -52,6 +195,14 @@ class PaystackService:
 
         return response.get("data", response)
 
+    async def get_dedicated_account(self, customer_id: Any) -> Optional[Dict[str, Any]]:
+        """The customer's active Dedicated Virtual Account, or None if it has none yet."""
+        response = await self._make_request(
+            "GET", "/dedicated_account", params={"customer": customer_id, "active": "true"}
+        )
+        accounts = response.get("data") or []
+        return accounts[0] if accounts else None
+
     async def create_transfer_recipient(self, name: str, account_number: str, bank_code: str) -> Dict[str, Any]:
         """Creates a transfer recipient for withdrawals."""
         print(f"--- CREATING PAYSTACK TRANSFER RECIPIENT for {name} ({account_number}) ---")
@@ -62,11 +213,29 @@ class PaystackService:
             "bank_code": bank_code,
             "currency": "NGN"
         }
-        response = await self._make_request("POST", "/transferrecipient", data=payload)
+        # Paystack returns the existing recipient for a repeated account, so retrying is safe.
+        response = await self._make_request("POST", "/transferrecipient", data=payload, idempotent=True)
+        return response.get("data")
+
+    async def list_banks(self, country: str = "nigeria") -> List[Dict[str, Any]]:
+        """Lists the banks Paystack can transfer to, with their bank codes."""
+        response = await self._make_request("GET", "/bank", params={"country": country, "perPage": 100})
+        return response.get("data", [])
+
+    async def resolve_account(self, account_number: str, bank_code: str) -> Dict[str, Any]:
+        """Looks up the account name registered to a bank account."""
+        response = await self._make_request(
+            "GET", "/bank/resolve", params={"account_number": account_number, "bank_code": bank_code}
+        )
         return response.get("data")
 
-    async def initiate_transfer(self, amount_kobo: int, recipient_code: str, reason: str) -> Dict[str, Any]:
-        """Initiates a fund transfer to a recipient."""
+    async def initiate_transfer(
+        self, amount_kobo: int, recipient_code: str, reason: str, reference: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Initiates a fund transfer to a recipient. Passing our own `reference`
+        lets Paystack reject accidental duplicates of the same transfer.
+        """
         print(f"--- INITIATING TRANSFER of {amount_kobo / 100} NGN to {recipient_code} ---")
         payload = {
             "source": "balance",
@@ -74,7 +243,14 @@ class PaystackService:
             "recipient": recipient_code,
             "reason": reason
         }
+        if reference:
+            payload["reference"] = reference
         response = await self._make_request("POST", "/transfer", data=payload)
         return response.get("data")
 
-paystack_service = PaystackService(settings.PAYSTACK_SECRET_KEY)
\ No newline at end of file
+    async def verify_transfer(self, reference: str) -> Dict[str, Any]:
+        """Looks up a transfer by our reference. Raises PaystackRejectedError (404) if Paystack never got it."""
+        response = await self._make_request("GET", f"/transfer/verify/{reference}")
+        return response.get("data")
+
+paystack_service = PaystackService(settings.PAYSTACK_SECRET_KEY)
@@ -0,0 +1,91 @@
+import asyncio
+import hashlib
+from typing import Dict, List, Optional
+
+import httpx
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.config import settings
+from app.services import image_processing, media_workers
+from app.services.storage import get_storage
+
+# Registry of derived variants, keyed by the original image URL.
+MEDIA_VARIANTS_COLLECTION = "media_variants"
+IMAGE_DOWNLOAD_TIMEOUT_SECONDS = 30
+
+
+async def create_variants(db: AsyncIOMotorDatabase, original_url: str, image_bytes: bytes) -> Dict[str, str]:
+    """
+    Derives the thumbnail and model-input variants of an image, stores them
+    next to each other and records them against `original_url`. Returns the
+    variant URLs by name.
+    """
+    variants = await media_workers.run_in_pool(
+        image_processing.derive_variants,
+        image_bytes,
+        settings.IMAGE_THUMBNAIL_MAX_DIMENSION,
+        settings.IMAGE_MODEL_INPUT_MIN_DIMENSION,
+        settings.IMAGE_VARIANT_QUALITY,
+        timeout=settings.IMAGE_PROCESSING_TIMEOUT_SECONDS,
+    )
+    stem = f"variants/{hashlib.sha1(original_url.encode('utf-8')).hexdigest()}"
+    names = list(variants)
+    urls = await asyncio.gather(*(
+        get_storage().save(variants[name], f"{stem}_{name}.jpg", "image/jpeg") for name in names
+    ))
+    urls_by_name = dict(zip(names, urls))
+    await db[MEDIA_VARIANTS_COLLECTION].update_one(
+        {"_id": original_url}, {"$set": urls_by_name}, upsert=True
+    )
+    return urls_by_name
+
+
+async def _fetch_image(client: httpx.AsyncClient, url: str) -> bytes:
+    data = await get_storage().load(url)
+    if data is not None:
+        return data
+    response = await client.get(url, timeout=IMAGE_DOWNLOAD_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    return response.content
+
+
+async def get_variants(db: AsyncIOMotorDatabase, urls: List[str]) -> Dict[str, Dict[str, str]]:
+    """The recorded variants of each of `urls` that has any, keyed by URL."""
+    if not urls:
+        return {}
+    return {
+        doc.pop("_id"): doc
+        async for doc in db[MEDIA_VARIANTS_COLLECTION].find({"_id": {"$in": urls}})
+    }
+
+
+async def attach_image_variants(db: AsyncIOMotorDatabase, product_id: str) -> None:
+    """
+    Background task: makes sure every image of a product has variants, deriving
+    the missing ones, and stores them on the product as `image_variants`.
+    """
+    product = await db.products.find_one({"_id": ObjectId(product_id)}, {"images": 1})
+    if not product or not product.get("images"):
+        return
+    images = product["images"]
+    known = await get_variants(db, images)
+
+    async with httpx.AsyncClient() as client:
+        async def derive(url: str) -> Optional[Dict[str, str]]:
+            try:
+                return await create_variants(db, url, await _fetch_image(client, url))
+            except Exception as e:
+                print(f"Could not derive variants for {url}: {e}")
+                return None
+
+        missing = [url for url in dict.fromkeys(images) if url not in known]
+        for url, variants in zip(missing, await asyncio.gather(*(derive(url) for url in missing))):
+            if variants:
+                known[url] = variants
+
+    image_variants = [{"original": url, **known[url]} for url in images if url in known]
+    # Only write if the images did not change while the variants were derived.
+    await db.products.update_one(
+        {"_id": product["_id"], "images": images}, {"$set": {"image_variants": image_variants}}
+    )
@@ -0,0 +1,103 @@
+"""
+Where generated and uploaded media is stored.
+
+`get_storage()` returns the backend selected by STORAGE_BACKEND: Google Cloud
+Storage in production, or the local filesystem (served under
+LOCAL_STORAGE_BASE_URL) for development and tests. Both run their blocking I/O
+in a worker thread so the event loop is never stalled.
+"""
+
+import io
+import os
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+# Uploads larger than one chunk go through GCS's resumable upload protocol,
+# so a dropped connection retries a chunk instead of the whole file.
+GCS_UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+class StorageBackend(ABC):
+    @abstractmethod
+    async def save(self, data: bytes, path: str, content_type: str) -> str:
+        """Stores `data` at `path` and returns its public URL."""
+
+    async def load(self, url: str) -> Optional[bytes]:
+        """
+        Reads back a file this backend stored, given its public URL. Returns
+        None when the URL is not one of this backend's (fetch it over HTTP).
+        """
+        return None
+
+
+class GCSStorage(StorageBackend):
+    def __init__(self, bucket_name: str):
+        self.bucket_name = bucket_name
+        self._bucket = None
+
+    def _get_bucket(self):
+        if self._bucket is None:
+            from google.cloud import storage
+            self._bucket = storage.Client(project=settings.GOOGLE_CLOUD_PROJECT).bucket(self.bucket_name)
+        return self._bucket
+
+    def _upload(self, data: bytes, path: str, content_type: str) -> str:
+        blob = self._get_bucket().blob(path, chunk_size=GCS_UPLOAD_CHUNK_SIZE)
+        # The ACL is set by the upload itself, saving the separate make_public() call.
+        blob.upload_from_file(
+            io.BytesIO(data), size=len(data), content_type=content_type, predefined_acl="publicRead"
+        )
+        return blob.public_url
+
+    async def save(self, data: bytes, path: str, content_type: str) -> str:
+        from google.api_core import exceptions as google_exceptions
+        try:
+            return await run_in_threadpool(self._upload, data, path, content_type)
+        except google_exceptions.NotFound:
+            raise Exception(f"GCS bucket '{self.bucket_name}' not found.")
+
+
+class LocalStorage(StorageBackend):
+    def __init__(self, root: str, base_url: str):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+
+    def _write(self, data: bytes, path: str) -> None:
+        full_path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "wb") as f:
+            f.write(data)
+
+    async def save(self, data: bytes, path: str, content_type: str) -> str:
+        await run_in_threadpool(self._write, data, path)
+        return f"{self.base_url}/{path}"
+
+    def _read(self, path: str) -> Optional[bytes]:
+        full_path = os.path.join(self.root, path)
+        if not os.path.isfile(full_path):
+            return None
+        with open(full_path, "rb") as f:
+            return f.read()
+
+    async def load(self, url: str) -> Optional[bytes]:
+        prefix = f"{self.base_url}/"
+        if not url.startswith(prefix) or ".." in url:
+            return None
+        return await run_in_threadpool(self._read, url[len(prefix):])
+
+
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    global _storage
+    if _storage is None:
+        if settings.STORAGE_BACKEND == "local":
+            _storage = LocalStorage(settings.LOCAL_STORAGE_PATH, settings.LOCAL_STORAGE_BASE_URL)
+        else:
+            _storage = GCSStorage(settings.GCS_BUCKET_NAME)
+    return _storage
@@ -0,0 +1,79 @@
+import json
+from typing import Any, Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.crud.crud_transfer_recipient import transfer_recipient as crud_transfer_recipient
+from app.services.payment_service import paystack_service
+from app.utils import cache
+
+RECIPIENT_CACHE_TTL_SECONDS = 7 * 24 * 3600
+BANKS_CACHE_TTL_SECONDS = 24 * 3600
+RESOLVED_ACCOUNT_CACHE_TTL_SECONDS = 24 * 3600
+
+
+async def get_or_create_recipient(
+    db: AsyncIOMotorDatabase, redis, *, owner_id: str, name: str, account_number: str, bank_code: str
+) -> str:
+    """
+    Returns the Paystack recipient code for a user's bank account, creating
+    it on Paystack only the first time that account is used (Redis, then
+    Mongo, then Paystack).
+    """
+    cache_key = f"paystack:recipient:{owner_id}:{bank_code}:{account_number}"
+    recipient_code = await cache.read(redis, cache_key)
+    if recipient_code:
+        return recipient_code
+
+    stored = await crud_transfer_recipient.get(
+        db, owner_id=owner_id, account_number=account_number, bank_code=bank_code
+    )
+    if stored:
+        recipient_code = stored["recipient_code"]
+    else:
+        recipient_data = await paystack_service.create_transfer_recipient(
+            name=name, account_number=account_number, bank_code=bank_code
+        )
+        recipient_code = (recipient_data or {}).get("recipient_code")
+        if not recipient_code:
+            raise Exception("Failed to create transfer recipient with payment provider.")
+        details = recipient_data.get("details") or {}
+        await crud_transfer_recipient.upsert(
+            db, owner_id=owner_id, account_number=account_number, bank_code=bank_code,
+            recipient_code=recipient_code, account_name=details.get("account_name"),
+        )
+
+    await cache.write(redis, cache_key, recipient_code, RECIPIENT_CACHE_TTL_SECONDS)
+    return recipient_code
+
+
+async def get_banks(redis) -> List[Dict[str, Any]]:
+    """Paystack's bank list, cached for a day since it rarely changes."""
+    cache_key = "paystack:banks:nigeria"
+    cached = await cache.read(redis, cache_key)
+    if cached:
+        return json.loads(cached)
+    banks = [
+        {"name": bank.get("name"), "code": bank.get("code"), "slug": bank.get("slug")}
+        for bank in await paystack_service.list_banks()
+    ]
+    await cache.write(redis, cache_key, json.dumps(banks), BANKS_CACHE_TTL_SECONDS)
+    return banks
+
+
+async def resolve_account(redis, *, account_number: str, bank_code: str) -> Dict[str, Any]:
+    """Resolves the account holder's name for a bank account, cached per account."""
+    cache_key = f"paystack:resolve:{bank_code}:{account_number}"
+    cached = await cache.read(redis, cache_key)
+    if cached:
+        return json.loads(cached)
+    data = await paystack_service.resolve_account(account_number=account_number, bank_code=bank_code) or {}
+    resolved = {
+        "account_number": data.get("account_number", account_number),
+        "account_name": data.get("account_name"),
+        "bank_code": bank_code,
+    }
+    if resolved["account_name"]:
+        # An unresolved account may just be a Paystack hiccup; ask again next time.
+        await cache.write(redis, cache_key, json.dumps(resolved), RESOLVED_ACCOUNT_CACHE_TTL_SECONDS)
+    return resolved
@@ -0,0 +1,135 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.config import settings
+from app.crud import wallet as crud_wallet
+from app.db.mongodb import get_db
+from app.db.redis_client import get_redis
+from app.models.wallet import WalletStatus
+from app.services import webhook_service
+from app.services.payment_service import paystack_service
+
+WALLET_PROVISIONING_QUEUE = "wallets:provisioning"
+# Longer than the two Paystack calls can take, including their retries.
+PROVISIONING_LEASE_SECONDS = 120
+
+_worker_task: Optional[asyncio.Task] = None
+
+
+async def enqueue_wallet(redis, wallet_id: Any) -> None:
+    await redis.rpush(WALLET_PROVISIONING_QUEUE, str(wallet_id))
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(30 * 2 ** (attempts - 1), 3600))
+
+
+async def provision_wallet(db: AsyncIOMotorDatabase, wallet_id: Any) -> Optional[str]:
+    """
+    Creates the Paystack customer and dedicated virtual account for a pending
+    wallet. Returns the wallet's new status, or None if it was not due (already
+    provisioned, leased by another worker, or waiting out a retry delay).
+    """
+    wallet = await crud_wallet.claim_for_provisioning(
+        db, wallet_id=wallet_id, lease_seconds=PROVISIONING_LEASE_SECONDS
+    )
+    if not wallet:
+        return None
+
+    collection = "agents" if wallet.get("owner_type") == "agent" else "customers"
+    owner = await db[collection].find_one({"_id": ObjectId(wallet["owner_id"])})
+    try:
+        if not owner:
+            raise Exception("Wallet owner no longer exists.")
+        # Paystack's create customer is idempotent, so retries reuse the same customer.
+        ps_customer = await paystack_service.create_customer(
+            email=owner["email"],
+            first_name=owner.get("fName", "User"),
+            last_name=owner.get("lName", wallet["owner_id"]),
+            phone=owner.get("phone_number", "")
+        )
+        # Creating a DVA is not idempotent: an earlier attempt may have created
+        # it on Paystack before failing here, so reuse that one.
+        dva_data = await paystack_service.get_dedicated_account(customer_id=ps_customer["id"])
+        if not dva_data:
+            dva_data = await paystack_service.create_dedicated_virtual_account(
+                customer_code=ps_customer["customer_code"]
+            )
+        paystack_account_id = dva_data.get("account_number")
+        if not paystack_account_id:
+            raise Exception("Failed to retrieve account number from payment service.")
+    except Exception as e:
+        attempts = wallet.get("provisioning_attempts", 1)
+        fields = {"provisioning_error": str(e), "provisioning_lease_until": None}
+        if owner and attempts < settings.WALLET_PROVISIONING_MAX_ATTEMPTS:
+            status = WalletStatus.pending
+            fields["provisioning_next_attempt"] = datetime.utcnow() + _retry_delay(attempts)
+        else:
+            status = WalletStatus.failed
+        await db[crud_wallet.collection_name].update_one(
+            {"_id": wallet["_id"]},
+            {"$set": {"status": status.value, "lastUpdated": datetime.utcnow(), **fields}},
+        )
+        print(f"Wallet {wallet['_id']} provisioning attempt {attempts} failed: {e}")
+        return status.value
+
+    await db[crud_wallet.collection_name].update_one(
+        {"_id": wallet["_id"]},
+        {
+            "$set": {
+                "status": WalletStatus.active.value,
+                "paystack_account_id": paystack_account_id,
+                "lastUpdated": datetime.utcnow(),
+            },
+            "$unset": {
+                "provisioning_error": "",
+                "provisioning_lease_until": "",
+                "provisioning_next_attempt": "",
+            },
+        },
+    )
+    try:
+        # Deposits that arrived before the wallet knew its account.
+        await webhook_service.replay_unmatched_deposits(db, paystack_account_id)
+    except Exception as e:
+        print(f"Could not replay parked deposits for wallet {wallet['_id']}: {e}")
+    return WalletStatus.active.value
+
+
+async def _run_worker():
+    redis = await get_redis()
+    db = await get_db()
+    loop = asyncio.get_running_loop()
+    next_sweep = 0.0
+    while True:
+        try:
+            # The queue gives new wallets a fast first attempt; the sweep picks up
+            # retries and anything whose queue entry was lost (e.g. a restart).
+            if loop.time() >= next_sweep:
+                for wallet_id in await crud_wallet.get_due_for_provisioning(db):
+                    await provision_wallet(db, wallet_id)
+                next_sweep = loop.time() + settings.WALLET_PROVISIONING_SWEEP_SECONDS
+            item = await redis.blpop(WALLET_PROVISIONING_QUEUE, timeout=1)
+            if item:
+                await provision_wallet(db, item[1])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Wallet provisioning worker error: {e}")
+            await asyncio.sleep(1)
+
+
+async def start_wallet_provisioning():
+    global _worker_task
+    _worker_task = asyncio.create_task(_run_worker())
+
+
+async def stop_wallet_provisioning():
+    global _worker_task
+    if _worker_task:
+        _worker_task.cancel()
+        _worker_task = None
@@ -0,0 +1,247 @@
+import asyncio
+import hashlib
+import hmac
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.crud.crud_ledger import ledger
+from app.crud.crud_webhook_event import webhook_event
+from app.db.mongodb import get_db, run_in_transaction
+from app.db.redis_client import get_redis
+from app.models.ledger import LedgerEntryType
+from app.services.withdrawal_service import settle_transfer
+
+PAYSTACK_EVENTS_QUEUE = "paystack:webhook_events"
+UNMATCHED_DEPOSITS_COLLECTION = "unmatched_deposits"
+
+_consumer_task: Optional[asyncio.Task] = None
+
+
+def verify_paystack_signature(body: bytes, signature: Optional[str]) -> bool:
+    """Paystack signs the raw body with HMAC-SHA512 using the secret key."""
+    if not signature:
+        return False
+    expected = hmac.new(settings.PAYSTACK_SECRET_KEY.encode("utf-8"), body, hashlib.sha512).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+async def enqueue_paystack_event(redis, body: bytes) -> None:
+    await redis.rpush(PAYSTACK_EVENTS_QUEUE, body.decode("utf-8"))
+
+
+def _parse_event(raw: str) -> Optional[Dict]:
+    try:
+        payload = json.loads(raw)
+        data = payload["data"]
+        return {"event_id": f"{payload['event']}:{data['id']}", "event": payload["event"], "data": data, "raw": raw}
+    except (ValueError, KeyError, TypeError):
+        print(f"Discarding malformed Paystack event: {raw[:200]}")
+        return None
+
+
+def _deposit_account(event: Dict) -> Optional[str]:
+    """The dedicated account a `charge.success` was paid into, if it is a wallet deposit."""
+    if event["event"] != "charge.success":
+        return None
+    return (event["data"].get("authorization") or {}).get("receiver_bank_account_number")
+
+
+async def _deposit_wallets(db: AsyncIOMotorDatabase, events: List[Dict]) -> Dict[str, Any]:
+    """Resolves the wallets of every deposit in the batch with one query."""
+    account_numbers = {account for account in map(_deposit_account, events) if account}
+    if not account_numbers:
+        return {}
+    return {
+        w["paystack_account_id"]: w["_id"]
+        async for w in db.wallets.find(
+            {"paystack_account_id": {"$in": list(account_numbers)}}, {"paystack_account_id": 1}
+        )
+    }
+
+
+def _deposit_posting(event: Dict, wallet_id: Any) -> Dict[str, Any]:
+    return {
+        "wallet_id": wallet_id,
+        "entry_type": LedgerEntryType.deposit,
+        "amount_kobo": int(event["data"]["amount"]),
+        "reference": event["data"].get("reference"),
+        "event_id": event["event_id"],
+    }
+
+
+async def _settle_transfer_event(db: AsyncIOMotorDatabase, event: Dict, session) -> None:
+    """Transfer outcomes settle the withdrawal they were initiated for."""
+    reference = event["data"].get("reference")
+    if reference and event["event"].startswith("transfer."):
+        await settle_transfer(
+            db, reference=reference, event=event["event"], event_id=event["event_id"], session=session
+        )
+
+
+async def _apply_batch(db: AsyncIOMotorDatabase, events: List[Dict], wallets: Dict[str, Any], session) -> Dict[str, int]:
+    """
+    Claims a batch of events and applies their effects in the caller's
+    transaction: one bulk claim, and every deposit credited through one
+    `ledger.post_batch`.
+    """
+    postings = []
+    claimed = await webhook_event.claim_many(db, events=events, session=session)
+    for event in claimed:
+        account_number = _deposit_account(event)
+        if account_number:
+            postings.append(_deposit_posting(event, wallets[account_number]))
+        else:
+            await _settle_transfer_event(db, event, session)
+    if postings:
+        await ledger.post_batch(db, postings=postings, session=session)
+    return {"new": len(claimed), "credited": len(postings)}
+
+
+async def _apply_event(db: AsyncIOMotorDatabase, event: Dict, wallets: Dict[str, Any], session) -> Optional[bool]:
+    """
+    Claims one event and applies its effect in the caller's transaction.
+    Returns None if the event was already processed, else whether it credited a wallet.
+    """
+    if not await webhook_event.claim(db, event=event, session=session):
+        return None
+    account_number = _deposit_account(event)
+    if account_number:
+        await ledger.post(db, **_deposit_posting(event, wallets[account_number]), session=session)
+        return True
+    await _settle_transfer_event(db, event, session)
+    return False
+
+
+async def _park_unmatched(db: AsyncIOMotorDatabase, events: List[Dict]) -> None:
+    """
+    Keeps deposits to accounts no wallet has (yet) without claiming them, so
+    `replay_unmatched_deposits` can credit them later.
+    """
+    now = datetime.utcnow()
+    for event in events:
+        await db[UNMATCHED_DEPOSITS_COLLECTION].update_one(
+            {"_id": event["event_id"]},
+            {"$set": {"account_number": _deposit_account(event), "raw": event["raw"]}, "$setOnInsert": {"received": now}},
+            upsert=True,
+        )
+        print(f"No wallet for dedicated account {_deposit_account(event)}; parked event {event['event_id']}.")
+
+
+async def process_batch(db: AsyncIOMotorDatabase, raw_events: List[str]) -> Dict[str, Any]:
+    """
+    Applies a batch of queued Paystack events. The whole batch is claimed and
+    credited in one transaction with bulk writes; if that fails, each event is
+    retried in a transaction of its own, so one bad event does not hold up the
+    rest. Either way an event's claim and its ledger effect persist together or
+    not at all, and events already processed (Paystack redelivers) are skipped.
+    Deposits to an unknown account are parked rather than claimed. Events that
+    failed come back under `retry` (their raw payloads) and are safe to
+    re-queue: nothing of theirs was applied.
+    """
+    events = {}
+    for raw in raw_events:
+        event = _parse_event(raw)
+        if event:
+            events.setdefault(event["event_id"], event)
+
+    wallets = await _deposit_wallets(db, list(events.values()))
+    unmatched, matched = [], []
+    for event in events.values():
+        account_number = _deposit_account(event)
+        (unmatched if account_number and account_number not in wallets else matched).append(event)
+    await _park_unmatched(db, unmatched)
+
+    result = {"received": len(raw_events), "new": 0, "credited": 0, "unmatched": len(unmatched), "retry": []}
+    if not matched:
+        return result
+    try:
+        applied = await run_in_transaction(db, lambda session: _apply_batch(db, matched, wallets, session))
+        result.update(applied)
+        return result
+    except Exception as e:
+        # Includes another consumer claiming one of the events first.
+        print(f"Could not apply Paystack batch at once, applying events one by one: {e}")
+
+    for event in matched:
+        try:
+            applied = await run_in_transaction(
+                db, lambda session, event=event: _apply_event(db, event, wallets, session)
+            )
+        except DuplicateKeyError:
+            # Another consumer committed the same event first.
+            applied = None
+        except Exception as e:
+            print(f"Could not apply Paystack event {event['event_id']}: {e}")
+            result["retry"].append(event["raw"])
+            continue
+        if applied is not None:
+            result["new"] += 1
+            result["credited"] += int(applied)
+    return result
+
+
+async def replay_unmatched_deposits(db: AsyncIOMotorDatabase, account_number: str) -> int:
+    """
+    Applies the deposits parked for `account_number`, e.g. once its wallet is
+    provisioned. Returns how many were replayed; failed ones stay parked.
+    """
+    parked = await db[UNMATCHED_DEPOSITS_COLLECTION].find({"account_number": account_number}).to_list(length=None)
+    if not parked:
+        return 0
+    result = await process_batch(db, [doc["raw"] for doc in parked])
+    if result["unmatched"]:
+        return 0
+    failed = set(result["retry"])
+    done = [doc["_id"] for doc in parked if doc["raw"] not in failed]
+    await db[UNMATCHED_DEPOSITS_COLLECTION].delete_many({"_id": {"$in": done}})
+    return len(done)
+
+
+async def _run_consumer():
+    redis = await get_redis()
+    db = await get_db()
+    while True:
+        batch = []
+        try:
+            # Block briefly for the first event, then drain up to a full batch.
+            first = await redis.blpop(PAYSTACK_EVENTS_QUEUE, timeout=1)
+            if not first:
+                continue
+            batch = [first[1]]
+            more = await redis.lpop(PAYSTACK_EVENTS_QUEUE, count=settings.PAYSTACK_WEBHOOK_BATCH_SIZE - 1)
+            if more:
+                batch.extend(more)
+            result = await process_batch(db, batch)
+            batch = []
+            retry = result.pop("retry")
+            print(f"Processed Paystack events: {result}")
+            if retry:
+                await redis.rpush(PAYSTACK_EVENTS_QUEUE, *retry)
+                await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            if batch:
+                await redis.rpush(PAYSTACK_EVENTS_QUEUE, *batch)
+            raise
+        except Exception as e:
+            print(f"Paystack webhook consumer error: {e}")
+            if batch:
+                # Safe to retry: applied events are skipped as already claimed.
+                await redis.rpush(PAYSTACK_EVENTS_QUEUE, *batch)
+            await asyncio.sleep(1)
+
+
+async def start_webhook_consumer():
+    global _consumer_task
+    _consumer_task = asyncio.create_task(_run_consumer())
+
+
+async def stop_webhook_consumer():
+    global _consumer_task
+    if _consumer_task:
+        _consumer_task.cancel()
+        _consumer_task = None
@@ -0,0 +1,130 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.config import settings
+from app.crud import transaction as crud_transaction
+from app.crud.crud_ledger import ledger
+from app.db.mongodb import get_db, run_in_transaction
+from app.models.ledger import LedgerEntryType
+from app.models.wallet import WalletTransactionStatus
+from app.services.payment_service import PaystackRejectedError, paystack_service
+
+# Paystack transfer statuses (from verification) and the event each one settles as.
+TRANSFER_OUTCOMES = {"success": "transfer.success", "failed": "transfer.failed", "reversed": "transfer.reversed"}
+# Statuses from initiating a transfer that mean it will definitely not be paid.
+# Anything else ("otp", "received", "queued", ...) may still complete.
+FAILED_INITIATION_STATUSES = ("failed", "rejected")
+
+_reconciler_task: Optional[asyncio.Task] = None
+
+
+async def settle_transfer(
+    db: AsyncIOMotorDatabase,
+    *,
+    reference: str,
+    event: str,
+    event_id: Optional[str] = None,
+    failure_reason: Optional[str] = None,
+    session=None,
+) -> Optional[Dict]:
+    """
+    Applies a transfer outcome (`transfer.success`, `transfer.failed` or
+    `transfer.reversed`) to the withdrawal with `reference`: marks successes,
+    and reverses the debit of a failed or reversed transfer exactly once.
+    Returns the withdrawal if its status changed.
+    """
+    if session is None:
+        return await run_in_transaction(db, lambda session: settle_transfer(
+            db, reference=reference, event=event, event_id=event_id,
+            failure_reason=failure_reason, session=session,
+        ))
+
+    if event == "transfer.success":
+        return await crud_transaction.set_withdrawal_status_by_reference(
+            db, reference=reference, status=WalletTransactionStatus.success,
+            from_statuses=[WalletTransactionStatus.pending], session=session,
+        )
+    if event not in ("transfer.failed", "transfer.reversed"):
+        return None
+
+    fields = {"failure_reason": failure_reason} if failure_reason else {}
+    withdrawal = await crud_transaction.set_withdrawal_status_by_reference(
+        db, reference=reference, status=WalletTransactionStatus.failed,
+        from_statuses=[WalletTransactionStatus.pending, WalletTransactionStatus.success],
+        session=session, **fields,
+    )
+    if withdrawal:
+        await ledger.post(
+            db,
+            wallet_id=withdrawal["wallet_id"],
+            entry_type=LedgerEntryType.withdrawal_reversal,
+            amount_kobo=int(round(withdrawal["amount"] * 100)),
+            reference=reference,
+            event_id=event_id,
+            session=session,
+        )
+    return withdrawal
+
+
+async def reconcile_withdrawal(db: AsyncIOMotorDatabase, withdrawal: Dict) -> Optional[str]:
+    """
+    Asks Paystack for the outcome of a withdrawal still pending here (e.g. its
+    transfer call timed out, or the webhook never arrived) and settles it.
+    Returns the event it was settled as, or None if it is still in flight.
+    """
+    reference = withdrawal["reference"]
+    try:
+        transfer = await paystack_service.verify_transfer(reference)
+        event = TRANSFER_OUTCOMES.get((transfer or {}).get("status"))
+    except PaystackRejectedError as e:
+        if e.status_code != 404:
+            raise
+        # Paystack has no transfer with this reference: it never received it.
+        event = "transfer.failed"
+
+    if event:
+        await settle_transfer(db, reference=reference, event=event, failure_reason="Reconciled with Paystack.")
+    else:
+        # Still in flight: bumping `lastUpdated` defers the next check.
+        await crud_transaction.set_status(db, transaction_id=withdrawal["_id"], status=WalletTransactionStatus.pending)
+    return event
+
+
+async def reconcile_pending_withdrawals(db: AsyncIOMotorDatabase) -> int:
+    """Reconciles withdrawals pending for longer than WITHDRAWAL_RECONCILE_AFTER_SECONDS."""
+    older_than = datetime.utcnow() - timedelta(seconds=settings.WITHDRAWAL_RECONCILE_AFTER_SECONDS)
+    settled = 0
+    for withdrawal in await crud_transaction.get_stale_pending_withdrawals(db, older_than=older_than):
+        try:
+            if await reconcile_withdrawal(db, withdrawal):
+                settled += 1
+        except Exception as e:
+            print(f"Could not reconcile withdrawal {withdrawal['reference']}: {e}")
+    return settled
+
+
+async def _run_reconciler():
+    db = await get_db()
+    while True:
+        try:
+            settled = await reconcile_pending_withdrawals(db)
+            if settled:
+                print(f"Reconciled {settled} pending withdrawal(s) with Paystack.")
+        except Exception as e:
+            print(f"Withdrawal reconciler error: {e}")
+        await asyncio.sleep(settings.WITHDRAWAL_RECONCILE_INTERVAL_SECONDS)
+
+
+async def start_withdrawal_reconciler():
+    global _reconciler_task
+    _reconciler_task = asyncio.create_task(_run_reconciler())
+
+
+async def stop_withdrawal_reconciler():
+    global _reconciler_task
+    if _reconciler_task:
+        _reconciler_task.cancel()
+        _reconciler_task = None
@@ -0,0 +1,146 @@
+"""
+Redis-backed response cache shared by the routers.
+
+Entries live under a per-namespace version, so `invalidate(namespace)` drops
+every entry of that namespace at once (old entries simply age out by TTL).
+Concurrent misses for the same key are collapsed: within a process callers
+share one in-flight computation, and across processes a short Redis lock lets
+one worker compute while the others wait for its result.
+"""
+
+import asyncio
+import functools
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from redis.exceptions import RedisError
+
+from app.db.redis_client import get_redis
+
+CACHE_KEY = "cache:{namespace}:{version}:{key}"
+VERSION_KEY = "cache:{namespace}:version"
+LOCK_TIMEOUT_MS = 10_000
+LOCK_POLL_SECONDS = 0.05
+LOCK_WAIT_SECONDS = 5
+
+_inflight: Dict[str, asyncio.Task] = {}
+
+
+def encode(value: Any) -> str:
+    return json.dumps(jsonable_encoder(value, custom_encoder={ObjectId: str}))
+
+
+async def read(redis, key: str) -> Optional[str]:
+    """
+    Reads a plain Redis key. The cache is an optimization only, so an
+    unavailable Redis reads as a miss.
+    """
+    if redis is None:
+        return None
+    try:
+        return await redis.get(key)
+    except RedisError as e:
+        print(f"Redis cache read failed for {key}: {e}")
+        return None
+
+
+async def write(redis, key: str, value: str, ttl: int) -> None:
+    """Writes a plain Redis key with a TTL, ignoring an unavailable Redis."""
+    if redis is None:
+        return
+    try:
+        await redis.set(key, value, ex=ttl)
+    except RedisError as e:
+        print(f"Redis cache write failed for {key}: {e}")
+
+
+async def _fill(redis, cache_key: str, ttl: int, producer: Callable[[], Awaitable[Any]]) -> str:
+    if redis is None:  # Not connected (e.g. scripts and tests): no caching.
+        return encode(await producer())
+    lock_key = f"{cache_key}:lock"
+    acquired = False
+    try:
+        acquired = await redis.set(lock_key, "1", nx=True, px=LOCK_TIMEOUT_MS)
+        if not acquired:
+            # Another worker is computing this entry; wait for its result.
+            for _ in range(int(LOCK_WAIT_SECONDS / LOCK_POLL_SECONDS)):
+                await asyncio.sleep(LOCK_POLL_SECONDS)
+                cached = await redis.get(cache_key)
+                if cached is not None:
+                    return cached
+    except RedisError as e:
+        print(f"Response cache lock failed for {cache_key}: {e}")
+
+    body = encode(await producer())
+    try:
+        await redis.set(cache_key, body, ex=ttl)
+        if acquired:
+            await redis.delete(lock_key)
+    except RedisError as e:
+        print(f"Response cache write failed for {cache_key}: {e}")
+    return body
+
+
+async def get_or_set(namespace: str, key: str, ttl: int, producer: Callable[[], Awaitable[Any]]) -> str:
+    """
+    Returns the cached JSON for `key`, computing it with `producer` on a miss.
+    If Redis is unavailable nothing is cached, but concurrent callers in this
+    process still share one call to the producer.
+    """
+    redis = await get_redis()
+    cache_key = CACHE_KEY.format(namespace=namespace, version="0", key=key)
+    if redis is not None:
+        try:
+            version = await redis.get(VERSION_KEY.format(namespace=namespace)) or "0"
+            cache_key = CACHE_KEY.format(namespace=namespace, version=version, key=key)
+            cached = await redis.get(cache_key)
+            if cached is not None:
+                return cached
+        except RedisError as e:
+            print(f"Response cache read failed for {namespace}: {e}")
+            redis = None
+
+    task = _inflight.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(_fill(redis, cache_key, ttl, producer))
+        _inflight[cache_key] = task
+        task.add_done_callback(lambda _: _inflight.pop(cache_key, None))
+    # Shielded so one caller disconnecting does not cancel the others' result.
+    return await asyncio.shield(task)
+
+
+async def invalidate(*namespaces: str) -> None:
+    """Drops every cached entry of the given namespaces. Call after writes."""
+    redis = await get_redis()
+    if redis is None:
+        return
+    try:
+        pipe = redis.pipeline(transaction=False)
+        for namespace in namespaces:
+            pipe.incr(VERSION_KEY.format(namespace=namespace))
+        await pipe.execute()
+    except RedisError as e:
+        print(f"Response cache invalidation failed for {namespaces}: {e}")
+
+
+def cached(namespace: str, ttl: int, key_params: Sequence[str] = ()):
+    """
+    Caches a JSON endpoint's result. Place it below the route decorator:
+
+        @router.get("/things")
+        @cached("things", ttl=30, key_params=("limit", "cursor"))
+        async def list_things(limit: int, cursor: str = None, ...): ...
+
+    The key is the endpoint name plus the `key_params` values, so list every
+    parameter that changes the response (dependencies like `db` are ignored).
+    """
+    def decorator(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            key = ":".join([endpoint.__name__] + [f"{name}={kwargs.get(name)}" for name in key_params])
+            body = await get_or_set(namespace, key, ttl, lambda: endpoint(*args, **kwargs))
+            return json.loads(body)
+        return wrapper
+    return decorator
@@ -0,0 +1,52 @@
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds its size cap."""
+
+
+def _check_declared_size(file: UploadFile, max_bytes: int) -> None:
+    # Reject early when the multipart parser already knows the size.
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLargeError(f"File is larger than the {max_bytes // (1024 * 1024)} MB limit.")
+
+
+async def read_upload(file: UploadFile, *, max_bytes: int) -> bytes:
+    """Reads an upload in chunks, failing as soon as it passes `max_bytes`."""
+    _check_declared_size(file, max_bytes)
+    data = bytearray()
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        data.extend(chunk)
+        if len(data) > max_bytes:
+            raise UploadTooLargeError(f"File is larger than the {max_bytes // (1024 * 1024)} MB limit.")
+    return bytes(data)
+
+
+@asynccontextmanager
+async def spool_upload(file: UploadFile, *, max_bytes: int, suffix: str = "") -> AsyncIterator[str]:
+    """
+    Streams an upload chunk by chunk into a uniquely named temporary file and
+    yields its path, so tools that need a path (like OpenCV) can read it
+    without the whole upload in memory. The file is deleted on exit.
+    """
+    _check_declared_size(file, max_bytes)
+    fd, path = tempfile.mkstemp(prefix="o42_upload_", suffix=suffix)
+    try:
+        size = 0
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"File is larger than the {max_bytes // (1024 * 1024)} MB limit.")
+                await run_in_threadpool(out.write, chunk)
+        yield path
+    finally:
+        os.remove(path)
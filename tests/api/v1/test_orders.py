@@ -6,7 +6,7 @@ async def test_create_purchase_order(
 ):
     # Mock external services to avoid real calls and control test outcomes
     mocker.patch("app.services.geo.get_agents_in_radius", return_value=[])
-    mocker.patch("app.services.notification_service.create_and_dispatch_notification")
+    mocker.patch("app.services.notification_service.dispatch_notifications")
     
     # The test_customer fixture doesn't have location, so add it
     test_customer["location"] = {"type": "Point", "coordinates": [3.3792, 6.5244]}
@@ -0,0 +1,42 @@
+# tests/api/v1/test_products.py
+
+import json
+
+from httpx import AsyncClient
+from pytest_mock import MockerFixture
+
+from app.core.config import settings
+
+
+async def test_batch_analysis_reports_bad_images_without_ending_the_stream(
+    client: AsyncClient, customer_auth_token: str, mocker: MockerFixture
+):
+    async def analyze_media(db, redis, media_bytes, mime_type, **kwargs):
+        if media_bytes == b"broken":
+            raise RuntimeError("worker pool crashed")
+        if media_bytes == b"no-keywords":
+            return {"name": "Lamp", "description": "A desk lamp"}
+        return {"name": "Shoe", "description": "A red shoe", "keywords": ["shoe", "red"]}
+
+    mocker.patch("app.services.media_analysis_service.analyze_media", side_effect=analyze_media)
+    mocker.patch(
+        "app.services.media_analysis_service.find_best_categories",
+        side_effect=lambda texts: ["shoes and accesories"] * len(texts),
+    )
+
+    headers = {"Authorization": f"Bearer {customer_auth_token}"}
+    files = [
+        ("files", ("good.jpg", b"good", "image/jpeg")),
+        ("files", ("broken.jpg", b"broken", "image/jpeg")),
+        ("files", ("notes.txt", b"text", "text/plain")),
+        ("files", ("no-keywords.jpg", b"no-keywords", "image/jpeg")),
+    ]
+    response = await client.post(f"{settings.API_V1_STR}/products/analyze-images", headers=headers, files=files)
+
+    assert response.status_code == 200
+    lines = {line["filename"]: line for line in map(json.loads, response.text.splitlines())}
+    assert set(lines) == {"good.jpg", "broken.jpg", "notes.txt", "no-keywords.jpg"}
+    assert lines["good.jpg"]["suggested_category"] == "shoes and accesories"
+    assert lines["broken.jpg"]["error"] == "Could not analyze this image."
+    assert lines["notes.txt"]["error"] == "Invalid file type. Please upload an image."
+    assert "error" in lines["no-keywords.jpg"]
@@ -0,0 +1,35 @@
+# tests/api/v1/test_webhooks.py
+
+import hashlib
+import hmac
+from httpx import AsyncClient
+from pytest_mock import MockerFixture
+
+from app.core.config import settings
+
+
+def _sign(body: bytes) -> str:
+    return hmac.new(settings.PAYSTACK_SECRET_KEY.encode("utf-8"), body, hashlib.sha512).hexdigest()
+
+
+async def test_paystack_webhook_rejects_bad_signature(client: AsyncClient):
+    response = await client.post(
+        f"{settings.API_V1_STR}/webhooks/paystack",
+        content=b'{"event": "charge.success"}',
+        headers={"x-paystack-signature": "bad"},
+    )
+    assert response.status_code == 401
+
+
+async def test_paystack_webhook_enqueues_signed_event(client: AsyncClient, mocker: MockerFixture):
+    mock_enqueue = mocker.patch("app.api.v1.webhooks.enqueue_paystack_event")
+    body = b'{"event": "charge.success", "data": {"id": 1}}'
+
+    response = await client.post(
+        f"{settings.API_V1_STR}/webhooks/paystack",
+        content=body,
+        headers={"x-paystack-signature": _sign(body)},
+    )
+
+    assert response.status_code == 200
+    mock_enqueue.assert_called_once()
@@ -0,0 +1,29 @@
+# tests/crud/test_crud_agent.py
+
+import numpy as np
+import pytest
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.crud import agent
+from app.crud.loader import BatchLoader
+
+
+@pytest.mark.asyncio
+async def test_face_mapping_is_stored_packed_and_left_out_of_reads(db: AsyncIOMotorDatabase):
+    result = await db.agents.insert_one({"email": "agent@example.com"})
+    encoding = np.linspace(-0.2, 0.2, 128, dtype=np.float32)
+
+    updated = await agent.set_face_mapping(
+        db, db_obj={"_id": result.inserted_id}, face_mapping=encoding.tobytes()
+    )
+
+    assert "face_mapping" not in updated
+    assert "face_mapping" not in await agent.get(db, id=str(result.inserted_id))
+    assert "face_mapping" not in await agent.get_by_email(db, email="agent@example.com")
+    assert "face_mapping" not in await agent.load(BatchLoader(db), str(result.inserted_id))
+    assert all("face_mapping" not in doc for doc in await agent.get_multi(db))
+    renamed = await agent.update(db, db_obj={"_id": result.inserted_id}, obj_in={"fName": "Renamed"})
+    assert renamed["fName"] == "Renamed" and "face_mapping" not in renamed
+    stored = await agent.get_face_mapping(db, id=str(result.inserted_id))
+    assert len(stored) == 128 * 4
+    assert np.array_equal(np.frombuffer(stored, np.float32), encoding)
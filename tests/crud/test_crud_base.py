@@ -0,0 +1,31 @@
+# tests/crud/test_crud_base.py
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.crud import review
+from app.models.review import ReviewCreate
+
+
+@pytest.mark.asyncio
+async def test_create_returns_inserted_document(db: AsyncIOMotorDatabase):
+    review_in = ReviewCreate(author_id="author", target_agent_id="agent", message="Great", stars=5)
+
+    created = await review.create(db, obj_in=review_in)
+
+    assert created["_id"] is not None
+    assert created["message"] == "Great"
+    assert await db.reviews.find_one({"_id": created["_id"]}) == created
+
+
+@pytest.mark.asyncio
+async def test_update_returns_updated_document(db: AsyncIOMotorDatabase):
+    review_in = ReviewCreate(author_id="author", target_agent_id="agent", message="Great", stars=5)
+    created = await review.create(db, obj_in=review_in)
+
+    updated = await review.update(db, db_obj=created, obj_in={"stars": 3})
+    assert updated["stars"] == 3
+    assert updated["message"] == "Great"
+
+    projected = await review.update(db, db_obj=created, obj_in={"stars": 4}, projection={"stars": 1})
+    assert projected == {"_id": created["_id"], "stars": 4}
@@ -0,0 +1,77 @@
+# tests/crud/test_crud_ledger.py
+
+import asyncio
+import pytest
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
+from pytest_mock import MockerFixture
+
+from app.crud import wallet
+from app.crud.crud_ledger import ledger
+from app.db.indexes import INDEXES
+from app.models.ledger import LedgerEntryType
+from app.models.wallet import WalletCreate
+
+
+async def _new_wallet(db, balance=100.0):
+    return await wallet.create(db, obj_in=WalletCreate(owner_id="owner", balance=balance), paystack_id="123")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_debits_cannot_overdraw(db: AsyncIOMotorDatabase):
+    new_wallet = await _new_wallet(db)
+
+    results = await asyncio.gather(*(
+        ledger.post(db, wallet_id=new_wallet["_id"], entry_type=LedgerEntryType.withdrawal,
+                    amount_kobo=-6000, require_funds=True)
+        for _ in range(5)
+    ))
+
+    assert sum(1 for r in results if r is not None) == 1
+    stored = await wallet.get_by_owner_id(db, owner_id="owner")
+    assert stored["balance_kobo"] == 4000
+    assert stored["balance"] == 40.0
+
+
+@pytest.mark.asyncio
+async def test_balance_is_rebuilt_from_snapshot_and_tail(db: AsyncIOMotorDatabase):
+    new_wallet = await _new_wallet(db)
+    wallet_id = str(new_wallet["_id"])
+
+    await ledger.post(db, wallet_id=wallet_id, entry_type=LedgerEntryType.deposit, amount_kobo=2500)
+    await ledger.snapshot(db, wallet_id=wallet_id)
+    await ledger.post(db, wallet_id=wallet_id, entry_type=LedgerEntryType.fee, amount_kobo=-500)
+
+    balance = await ledger.get_balance(db, wallet_id=wallet_id)
+    assert balance == {"balance_kobo": 12000, "seq": 2, "complete": True}
+    assert (await wallet.get_by_owner_id(db, owner_id="owner"))["balance_kobo"] == 12000
+
+
+@pytest.mark.asyncio
+async def test_concurrent_snapshots_roll_once(db: AsyncIOMotorDatabase):
+    # Only one snapshot per ledger position is guaranteed by this unique index.
+    await db.balance_snapshots.create_indexes(INDEXES["balance_snapshots"])
+    new_wallet = await _new_wallet(db)
+    wallet_id = str(new_wallet["_id"])
+    await ledger.post(db, wallet_id=wallet_id, entry_type=LedgerEntryType.deposit, amount_kobo=2500)
+
+    # Every worker runs a compactor; racing them must neither fail nor duplicate.
+    results = await asyncio.gather(*(ledger.snapshot(db, wallet_id=wallet_id) for _ in range(3)))
+
+    assert sum(1 for r in results if r is not None) == 1
+    assert await db.balance_snapshots.count_documents({"wallet_id": wallet_id}) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_entry_insert_leaves_balance_untouched(db: AsyncIOMotorDatabase, mocker: MockerFixture):
+    new_wallet = await _new_wallet(db)
+    mocker.patch.object(
+        AsyncIOMotorCollection, "insert_one", side_effect=PyMongoError("connection lost")
+    )
+
+    with pytest.raises(PyMongoError):
+        await ledger.post(db, wallet_id=new_wallet["_id"], entry_type=LedgerEntryType.deposit, amount_kobo=2500)
+
+    stored = await db.wallets.find_one({"_id": new_wallet["_id"]})
+    assert stored["balance_kobo"] == 10000
+    assert stored["ledger_seq"] == 0
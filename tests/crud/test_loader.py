@@ -0,0 +1,45 @@
+# tests/crud/test_loader.py
+
+import asyncio
+import pytest
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.crud import product
+from app.crud.loader import BatchLoader
+
+
+@pytest.mark.asyncio
+async def test_loads_in_same_tick_are_batched_and_memoized(db: AsyncIOMotorDatabase):
+    result = await db.products.insert_many([{"name": "Phone"}, {"name": "Shoe"}])
+    phone_id, shoe_id = (str(i) for i in result.inserted_ids)
+    missing_id = str(ObjectId())
+
+    loader = BatchLoader(db)
+    phone, shoe, missing = await asyncio.gather(
+        product.load(loader, phone_id), product.load(loader, shoe_id), product.load(loader, missing_id)
+    )
+
+    assert phone["name"] == "Phone"
+    assert shoe["name"] == "Shoe"
+    assert missing is None
+
+    # A later load for the same id is served from the request cache.
+    await db.products.update_one({"_id": ObjectId(phone_id)}, {"$set": {"name": "Changed"}})
+    assert (await product.load(loader, phone_id)) is phone
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_load(db: AsyncIOMotorDatabase):
+    result = await db.products.insert_one({"name": "Phone"})
+    phone_id = str(result.inserted_id)
+
+    loader = BatchLoader(db)
+    impatient = asyncio.ensure_future(product.load(loader, phone_id))
+    patient = asyncio.ensure_future(product.load(loader, phone_id))
+    await asyncio.sleep(0)
+    impatient.cancel()
+
+    assert (await patient)["name"] == "Phone"
+    with pytest.raises(asyncio.CancelledError):
+        await impatient
@@ -0,0 +1,39 @@
+# tests/crud/test_pagination.py
+
+import pytest
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.crud import pagination
+
+
+def test_cursor_round_trip():
+    doc_id = ObjectId()
+    cursor = pagination.encode_cursor({"_id": doc_id})
+    assert pagination.decode_cursor(cursor) == {"_id": {"$lt": doc_id}}
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(pagination.InvalidCursorError):
+        pagination.decode_cursor("not-a-cursor")
+
+
+def test_clamp_limit():
+    assert pagination.clamp_limit(None) == pagination.DEFAULT_PAGE_SIZE
+    assert pagination.clamp_limit(10_000) == pagination.MAX_PAGE_SIZE
+    assert pagination.clamp_limit(-5) == 1
+
+
+@pytest.mark.asyncio
+async def test_paginate_walks_every_document_once(db: AsyncIOMotorDatabase):
+    await db.reviews.insert_many([{"author_id": "author", "stars": i} for i in range(7)])
+
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = await pagination.paginate(db.reviews, {"author_id": "author"}, limit=3, cursor=cursor)
+        seen.extend(doc["stars"] for doc in page)
+        if cursor is None:
+            break
+
+    assert seen == list(reversed(range(7)))
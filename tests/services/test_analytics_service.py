@@ -0,0 +1,67 @@
+# tests/services/test_analytics_service.py
+
+import pytest
+from datetime import date, datetime, timedelta
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.db.indexes import INDEXES
+from app.models.analytics import AnalyticsGranularity
+from app.services.analytics_service import backfill_snapshots, calculate_metrics_for_period, get_snapshot_series
+
+
+@pytest.mark.asyncio
+async def test_metrics_for_period(db: AsyncIOMotorDatabase):
+    start = datetime(2024, 1, 2)
+    end = start + timedelta(days=1)
+    await db.customers.insert_many([
+        {"email": "new@example.com", "created": start + timedelta(hours=1), "last_login": start + timedelta(hours=2)},
+        {"email": "old@example.com", "created": start - timedelta(days=5), "last_login": start + timedelta(hours=3)},
+        {"email": "idle@example.com", "created": start - timedelta(days=5)},
+    ])
+    await db.purchase_orders.insert_one({"created": start + timedelta(hours=4)})
+    await db.transactions.insert_many([
+        {"created": start + timedelta(hours=5), "amount": 1500.0},
+        {"created": start + timedelta(hours=6), "amount": 999.0, "type": "withdrawal"},
+    ])
+
+    metrics = await calculate_metrics_for_period(db, start, end)
+
+    assert metrics["total_customers"] == 3
+    assert metrics["new_customers_today"] == 1
+    assert metrics["dau_customers"] == 2
+    assert metrics["new_agents_today"] == 0
+    assert metrics["new_purchase_orders_today"] == 1
+    assert metrics["orders_fulfilled_today"] == 1
+    assert metrics["total_transaction_value_today"] == 1500.0
+
+
+@pytest.mark.asyncio
+async def test_backfill_creates_only_missing_days(db: AsyncIOMotorDatabase):
+    await db.analytics.create_indexes(INDEXES["analytics"])
+    await db.purchase_orders.insert_one({"created": datetime(2024, 1, 3, 12)})
+
+    first = await backfill_snapshots(db, date(2024, 1, 2), date(2024, 1, 3))
+    second = await backfill_snapshots(db, date(2024, 1, 1), date(2024, 1, 4))
+
+    assert set(first) == {date(2024, 1, 2), date(2024, 1, 3)}
+    assert set(second) == {date(2024, 1, 1), date(2024, 1, 4)}
+
+    series = await get_snapshot_series(
+        db, start=date(2024, 1, 1), end=date(2024, 1, 4), granularity=AnalyticsGranularity.day
+    )
+    assert [doc["_id"] for doc in series] == ["2024-01-04", "2024-01-03", "2024-01-02", "2024-01-01"]
+    assert series[1]["new_purchase_orders_today"] == 1
+
+
+@pytest.mark.asyncio
+async def test_backfilled_days_count_users_as_of_that_day(db: AsyncIOMotorDatabase):
+    await db.analytics.create_indexes(INDEXES["analytics"])
+    await db.customers.insert_many([
+        {"email": "early@example.com", "created": datetime(2024, 1, 1, 9)},
+        {"email": "later@example.com", "created": datetime(2024, 1, 3, 9)},
+        {"email": "recent@example.com", "created": datetime.utcnow()},
+    ])
+
+    created = await backfill_snapshots(db, date(2024, 1, 1), date(2024, 1, 3))
+
+    assert [created[date(2024, 1, day)]["total_customers"] for day in (1, 2, 3)] == [1, 1, 2]
@@ -1,23 +1,41 @@
 # tests/services/test_face_verification.py
 
+import numpy as np
 import pytest
 from pytest_mock import MockerFixture
-from unittest.mock import AsyncMock
+
+
+def _fake_capture(mocker: MockerFixture, frame_count: int):
+    capture = mocker.MagicMock()
+    capture.isOpened.return_value = True
+    capture.get.return_value = frame_count
+    capture.read.return_value = (True, np.zeros((1080, 1920, 3), np.uint8))
+    mocker.patch("cv2.VideoCapture", return_value=capture)
+    return capture
+
 
 @pytest.mark.asyncio
 async def test_create_face_mapping_from_video(mocker: MockerFixture):
     # Mock the lower-level face_recognition library functions
-    fake_encoding = [[0.1, 0.2, 0.3]]
+    fake_encoding = [np.array([0.1, 0.2, 0.3])]
     mocker.patch("face_recognition.face_encodings", return_value=fake_encoding)
-    mocker.patch("face_recognition.face_locations", return_value=[(0, 100, 100, 0)])
-    mocker.patch("cv2.VideoCapture")
-
-    # Create a mock file object
-    mock_video_file = AsyncMock()
-    mock_video_file.read.return_value = b"fakevideodata"
-    mock_video_file.filename = "video.mp4"
+    mock_locations = mocker.patch("face_recognition.face_locations", return_value=[(0, 100, 100, 0)])
+    capture = _fake_capture(mocker, frame_count=300)
 
     from app.services import face_verification
-    result = await face_verification.create_face_mapping_from_video(mock_video_file)
+    result = await face_verification.create_face_mapping_from_video("video.mp4")
+
+    assert np.frombuffer(result, np.float32).tolist() == pytest.approx([0.1, 0.2, 0.3])
+    # Detection ran on downscaled frames and stopped once the encoding was stable.
+    assert max(mock_locations.call_args.args[0].shape) == 640
+    assert capture.read.call_count == 3
+    capture.release.assert_called_once()
 
-    assert result == fake_encoding[0]
\ No newline at end of file
+
+@pytest.mark.asyncio
+async def test_create_face_mapping_without_a_face(mocker: MockerFixture):
+    mocker.patch("face_recognition.face_locations", return_value=[])
+    _fake_capture(mocker, frame_count=300)
+
+    from app.services import face_verification
+    assert await face_verification.create_face_mapping_from_video("video.mp4") is None
@@ -0,0 +1,23 @@
+# tests/services/test_frame_extraction.py
+
+import cv2
+import numpy as np
+
+from app.services.frame_extraction import extract_sharpest_frame
+
+
+def test_sharpest_frame_is_selected_and_downscaled(tmp_path):
+    video_path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (640, 480))
+    checkerboard = (np.indices((480, 640)).sum(axis=0) // 20 % 2 * 255).astype(np.uint8)
+    for i in range(30):
+        # Only the middle third of the clip has any detail in it.
+        gray = checkerboard if 10 <= i < 20 else np.full((480, 640), 128, np.uint8)
+        writer.write(cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR))
+    writer.release()
+
+    jpeg = extract_sharpest_frame(video_path, samples=5, max_dimension=320, jpeg_quality=85)
+
+    frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_GRAYSCALE)
+    assert frame.shape == (240, 320)
+    assert frame.std() > 50
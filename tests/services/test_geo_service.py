@@ -13,7 +13,7 @@ async def test_get_agents_in_radius(db: AsyncIOMotorDatabase):
     # Insert mock agents
     agents_to_insert = [
         # In radius (< 10km), should be returned
-        {"_id": "agent_1", "location": {"type": "Point", "coordinates": [3.38, 6.52]}, "subscription_tier": AgentSubscriptionTier.runner}, # ~0.1km away
+        {"_id": "agent_1", "location": {"type": "Point", "coordinates": [3.38, 6.52]}, "subscription_tier": AgentSubscriptionTier.runner, "face_mapping": b"\x00" * 512}, # ~0.1km away
         {"_id": "agent_2", "location": {"type": "Point", "coordinates": [3.40, 6.55]}, "subscription_tier": AgentSubscriptionTier.tycoon}, # ~3.7km away
         # Out of radius (> 10km), should NOT be returned
         {"_id": "agent_3", "location": {"type": "Point", "coordinates": [3.50, 6.60]}, "subscription_tier": AgentSubscriptionTier.starter}, # ~15km away
@@ -36,6 +36,7 @@ async def test_get_agents_in_radius(db: AsyncIOMotorDatabase):
     assert "agent_2" in nearby_agent_ids
     assert "agent_4" in nearby_agent_ids
     assert "agent_3" not in nearby_agent_ids
+    assert all("face_mapping" not in agent for agent in nearby_agents)
     
     # Assert correct sorting: Tycoon > Runner > Starter
     assert nearby_agent_ids[0] == "agent_2" # Tycoon is first
@@ -1,5 +1,6 @@
 # tests/services/test_image_generation.py
 
+import asyncio
 import pytest
 from pytest_mock import MockerFixture
 from app.services import image_generation
@@ -13,7 +14,8 @@ async def test_generate_product_image_from_prompt(mocker: MockerFixture):
     mock_generated_image._image_bytes = b"fakeimagedata"
     mock_image_model.generate_images.return_value.images = [mock_generated_image]
     mocker.patch("app.services.image_generation.ImageGenerationModel.from_pretrained", return_value=mock_image_model)
-    mock_upload = mocker.patch("app.services.image_generation._upload_to_gcs", return_value="http://fake.url/image.png")
+    mocker.patch.object(image_generation, "_image_model", None)
+    mock_upload = mocker.patch("app.services.image_generation._upload_image", return_value="http://fake.url/image.png")
 
     # Test with a valid prompt
     prompt = "A red shoe"
@@ -24,4 +26,38 @@ async def test_generate_product_image_from_prompt(mocker: MockerFixture):
 
     # Test with a forbidden prompt
     with pytest.raises(ValueError, match="The provided description contains terms that are not allowed."):
-        await image_generation.generate_product_image_from_prompt("A picture of a person")
\ No newline at end of file
+        await image_generation.generate_product_image_from_prompt("A picture of a person")
+
+@pytest.mark.asyncio
+async def test_identical_prompts_generate_one_image(db, mocker: MockerFixture):
+    async def slow_generate(prompt, db=None):
+        await asyncio.sleep(0.01)
+        return "http://fake.url/shoe.png"
+
+    mock_generate = mocker.patch(
+        "app.services.image_generation.generate_product_image_from_prompt", side_effect=slow_generate
+    )
+
+    # Concurrent calls share one generation; the later one is served from Mongo.
+    urls = await asyncio.gather(
+        image_generation.get_or_generate_product_image(db, "A red shoe"),
+        image_generation.get_or_generate_product_image(db, "  a RED   shoe "),
+    )
+    later = await image_generation.get_or_generate_product_image(db, "a red shoe")
+
+    assert urls == ["http://fake.url/shoe.png"] * 2
+    assert later == "http://fake.url/shoe.png"
+    mock_generate.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_failed_search_is_not_cached(db, mocker: MockerFixture):
+    results = {"items": [{"link": "http://example.com/shoe"}]}
+    mock_search = mocker.patch(
+        "app.services.image_generation.search_google_for_prompt",
+        side_effect=[{"error": "Google Search failed: quota"}, results, results],
+    )
+
+    assert "error" in await image_generation.get_or_search_google(db, "red shoe")
+    assert await image_generation.get_or_search_google(db, "red shoe") == results
+    assert await image_generation.get_or_search_google(db, "Red  Shoe") == results
+    assert mock_search.call_count == 2
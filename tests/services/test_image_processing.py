@@ -0,0 +1,39 @@
+# tests/services/test_image_processing.py
+
+import io
+from PIL import Image
+
+from app.services.image_processing import EXIF_ORIENTATION, derive_variants, prepare_image
+
+
+def _jpeg(size, orientation=None) -> bytes:
+    image = Image.new("RGB", size, (200, 30, 30))
+    exif = Image.Exif()
+    if orientation:
+        exif[EXIF_ORIENTATION] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+def test_large_rotated_photo_is_oriented_and_downscaled():
+    # Orientation 6 means the camera was rotated 90 degrees clockwise.
+    encoded, mime_type = prepare_image(_jpeg((4000, 3000), orientation=6), 1024, "WEBP", 80)
+
+    image = Image.open(io.BytesIO(encoded))
+    assert mime_type == "image/webp"
+    assert image.size == (768, 1024)
+
+
+def test_small_photo_is_left_alone_when_re_encoding_does_not_help():
+    original = _jpeg((200, 100))
+    encoded, mime_type = prepare_image(original, 1024, "JPEG", 100)
+    assert mime_type == "image/jpeg"
+    assert len(encoded) <= len(original)
+
+
+def test_variants_are_sized_for_thumbnails_and_the_model():
+    variants = derive_variants(_jpeg((1600, 1200)), 320, 224, 80)
+
+    assert Image.open(io.BytesIO(variants["thumbnail"])).size == (320, 240)
+    assert Image.open(io.BytesIO(variants["model_input"])).size == (299, 224)
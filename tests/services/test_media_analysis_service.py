@@ -0,0 +1,27 @@
+# tests/services/test_media_analysis_service.py
+
+import pytest
+from pytest_mock import MockerFixture
+from unittest.mock import AsyncMock
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.services import media_analysis_service
+
+
+@pytest.mark.asyncio
+async def test_prompt_version_bump_invalidates_stored_analyses(db: AsyncIOMotorDatabase, mocker: MockerFixture):
+    mock_generate = mocker.patch(
+        "app.services.media_analysis_service.generate_product_details_from_media",
+        AsyncMock(side_effect=[{"name": "Old prompt"}, {"name": "New prompt"}]),
+    )
+    mocker.patch.object(media_analysis_service, "ANALYSIS_PROMPT_VERSION", "1")
+    first = await media_analysis_service.analyze_media(db, None, b"same-image", "image/jpeg", preprocess=False)
+    repeat = await media_analysis_service.analyze_media(db, None, b"same-image", "image/jpeg", preprocess=False)
+
+    mocker.patch.object(media_analysis_service, "ANALYSIS_PROMPT_VERSION", "2")
+    bumped = await media_analysis_service.analyze_media(db, None, b"same-image", "image/jpeg", preprocess=False)
+
+    assert first == repeat == {"name": "Old prompt"}
+    assert bumped == {"name": "New prompt"}
+    assert mock_generate.call_count == 2
+    assert await db[media_analysis_service.ANALYSIS_COLLECTION].count_documents({}) == 2
@@ -0,0 +1,38 @@
+# tests/services/test_media_workers.py
+
+import asyncio
+import time
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app.services import media_workers
+
+
+@pytest.fixture
+async def one_worker(mocker: MockerFixture):
+    mocker.patch.object(media_workers.settings, "MEDIA_WORKER_PROCESSES", 1)
+    await media_workers.start_media_workers()
+    # Let the spawned worker start before timing anything.
+    await media_workers.run_in_pool(abs, -1, timeout=30)
+    yield
+    await media_workers.stop_media_workers()
+
+
+@pytest.mark.asyncio
+async def test_timeout_excludes_time_waiting_for_a_worker(one_worker):
+    # Back to back the two jobs take longer than the timeout, each on its own does not.
+    results = await asyncio.gather(
+        media_workers.run_in_pool(time.sleep, 0.5, timeout=0.8),
+        media_workers.run_in_pool(time.sleep, 0.5, timeout=0.8),
+    )
+    assert results == [None, None]
+
+
+@pytest.mark.asyncio
+async def test_timed_out_job_does_not_keep_its_worker(one_worker):
+    with pytest.raises(asyncio.TimeoutError):
+        await media_workers.run_in_pool(time.sleep, 60, timeout=0.5)
+
+    # The only worker is still sleeping, so this needs the replacement pool.
+    assert await media_workers.run_in_pool(abs, -3, timeout=10) == 3
@@ -31,4 +31,17 @@ async def test_create_and_dispatch_notification(db: AsyncIOMotorDatabase, mocker
     mock_send_email.assert_called_once_with(to_email=test_user["email"], subject=subject, html_content=f"<p>{body}</p>")
     mock_send_sms.assert_called_once_with(phone_number=test_user["phone_number"], message=body)
     mock_crud_msg.assert_called_once()
-    mock_ws_push.assert_called_once()
\ No newline at end of file
+    mock_ws_push.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_dispatch_notifications_writes_one_batch(db: AsyncIOMotorDatabase, mocker: MockerFixture):
+    mocker.patch("app.services.notification_service.send_email", return_value=True)
+    mocker.patch("app.services.notification_service.send_sms", return_value=True)
+    mock_ws_push = mocker.patch("app.services.connection_manager.manager.send_personal_message")
+
+    users = [{"_id": f"60d5ec49e7ef5b2d3c1a2b3{i}", "email": f"user{i}@example.com"} for i in range(3)]
+    await notification_service.dispatch_notifications(db, users, "Subject", "Body")
+
+    assert await db.notifications.count_documents({}) == 3
+    assert await db.messages.count_documents({}) == 3
+    assert mock_ws_push.call_count == 3
@@ -0,0 +1,46 @@
+# tests/services/test_payment_service.py
+
+import httpx
+import pytest
+from pytest_mock import MockerFixture
+from unittest.mock import AsyncMock
+
+from app.services.payment_service import PaystackService, PAYSTACK_BASE_URL
+
+
+def _service_with_responses(statuses):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        status = statuses[min(len(calls), len(statuses)) - 1]
+        return httpx.Response(status, json={"status": status == 200, "message": "msg", "data": {"ok": True}})
+
+    service = PaystackService("sk_test")
+    service.client = httpx.AsyncClient(base_url=PAYSTACK_BASE_URL, transport=httpx.MockTransport(handler))
+    return service, calls
+
+
+@pytest.mark.asyncio
+async def test_idempotent_call_is_retried(mocker: MockerFixture):
+    mocker.patch.object(PaystackService, "_backoff", AsyncMock())
+    service, calls = _service_with_responses([503, 200])
+
+    result = await service.create_customer("a@b.com", "A", "B", "")
+
+    assert result == {"ok": True}
+    assert calls == ["/customer", "/customer"]
+    assert service.get_metrics()["/customer"]["count"] == 2
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_transfer_is_not_retried(mocker: MockerFixture):
+    mocker.patch.object(PaystackService, "_backoff", AsyncMock())
+    service, calls = _service_with_responses([503, 200])
+
+    with pytest.raises(Exception, match="Paystack service failed"):
+        await service.initiate_transfer(1000, "RCP_x", "test")
+
+    assert calls == ["/transfer"]
+    await service.close()
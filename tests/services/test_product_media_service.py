@@ -0,0 +1,34 @@
+# tests/services/test_product_media_service.py
+
+import io
+
+import pytest
+from PIL import Image
+from pytest_mock import MockerFixture
+
+from app.services import product_media_service
+from app.services.storage import LocalStorage
+
+
+def _jpeg(size) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (30, 120, 200)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+@pytest.mark.asyncio
+async def test_product_images_get_variants_stored_alongside(db, tmp_path, mocker: MockerFixture):
+    storage = LocalStorage(str(tmp_path), "/media")
+    mocker.patch("app.services.product_media_service.get_storage", return_value=storage)
+    original_url = await storage.save(_jpeg((1200, 900)), "products/shoe.jpg", "image/jpeg")
+    result = await db.products.insert_one({"name": "Shoe", "images": [original_url]})
+
+    await product_media_service.attach_image_variants(db, str(result.inserted_id))
+
+    product = await db.products.find_one({"_id": result.inserted_id})
+    [variants] = product["image_variants"]
+    assert variants["original"] == original_url
+    model_input = await storage.load(variants["model_input"])
+    assert Image.open(io.BytesIO(model_input)).size == (299, 224)
+    assert await storage.load(variants["thumbnail"]) is not None
+    assert await db[product_media_service.MEDIA_VARIANTS_COLLECTION].find_one({"_id": original_url})
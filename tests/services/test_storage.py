@@ -0,0 +1,15 @@
+# tests/services/test_storage.py
+
+import pytest
+
+from app.services.storage import LocalStorage
+
+
+@pytest.mark.asyncio
+async def test_local_storage_writes_file_and_returns_url(tmp_path):
+    storage = LocalStorage(str(tmp_path), "/media/")
+
+    url = await storage.save(b"fakeimagedata", "products/abc.png", "image/png")
+
+    assert url == "/media/products/abc.png"
+    assert (tmp_path / "products" / "abc.png").read_bytes() == b"fakeimagedata"
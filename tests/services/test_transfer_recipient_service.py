@@ -0,0 +1,58 @@
+# tests/services/test_transfer_recipient_service.py
+
+import pytest
+from pytest_mock import MockerFixture
+from unittest.mock import AsyncMock
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.services import transfer_recipient_service
+from app.services.payment_service import PaystackError
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+
+
+@pytest.mark.asyncio
+async def test_failed_recipient_creation_is_not_cached(db: AsyncIOMotorDatabase, mocker: MockerFixture):
+    mock_create = mocker.patch(
+        "app.services.transfer_recipient_service.paystack_service.create_transfer_recipient",
+        AsyncMock(side_effect=[
+            PaystackError("Paystack service failed: timeout"),
+            {"recipient_code": "RCP_123", "details": {"account_name": "TEST USER"}},
+        ]),
+    )
+    redis = FakeRedis()
+    kwargs = dict(owner_id="owner", name="Test User", account_number="0123456789", bank_code="058")
+
+    with pytest.raises(PaystackError):
+        await transfer_recipient_service.get_or_create_recipient(db, redis, **kwargs)
+    assert redis.store == {}
+    assert await db.transfer_recipients.count_documents({}) == 0
+
+    assert await transfer_recipient_service.get_or_create_recipient(db, redis, **kwargs) == "RCP_123"
+    assert await transfer_recipient_service.get_or_create_recipient(db, redis, **kwargs) == "RCP_123"
+    assert mock_create.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_unresolved_account_is_not_cached(mocker: MockerFixture):
+    mock_resolve = mocker.patch(
+        "app.services.transfer_recipient_service.paystack_service.resolve_account",
+        AsyncMock(side_effect=[None, {"account_number": "0123456789", "account_name": "TEST USER"}]),
+    )
+    redis = FakeRedis()
+
+    first = await transfer_recipient_service.resolve_account(redis, account_number="0123456789", bank_code="058")
+    second = await transfer_recipient_service.resolve_account(redis, account_number="0123456789", bank_code="058")
+
+    assert first["account_name"] is None
+    assert second["account_name"] == "TEST USER"
+    assert mock_resolve.call_count == 2
@@ -0,0 +1,69 @@
+# tests/services/test_wallet_provisioning_service.py
+
+import pytest
+from pytest_mock import MockerFixture
+from unittest.mock import AsyncMock
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.crud import wallet
+from app.models.wallet import WalletCreate
+from app.services import wallet_provisioning_service
+
+
+@pytest.mark.asyncio
+async def test_pending_wallet_is_retried_then_activated(db: AsyncIOMotorDatabase, mocker: MockerFixture):
+    owner = await db.customers.insert_one({"email": "buyer@example.com", "fName": "Test", "lName": "Buyer"})
+    created = await wallet.create(
+        db, obj_in=WalletCreate(owner_id=str(owner.inserted_id)), owner_type="customer"
+    )
+    assert created["status"] == "pending"
+
+    mocker.patch(
+        "app.services.wallet_provisioning_service.paystack_service.create_customer",
+        AsyncMock(return_value={"id": 123, "customer_code": "CUS_123"}),
+    )
+    mocker.patch(
+        "app.services.wallet_provisioning_service.paystack_service.get_dedicated_account",
+        AsyncMock(return_value=None),
+    )
+    mocker.patch(
+        "app.services.wallet_provisioning_service.paystack_service.create_dedicated_virtual_account",
+        AsyncMock(side_effect=[Exception("Paystack unavailable"), {"account_number": "9930000001"}]),
+    )
+
+    assert await wallet_provisioning_service.provision_wallet(db, created["_id"]) == "pending"
+    # The failed attempt scheduled a retry, so the wallet is not due yet.
+    assert await wallet_provisioning_service.provision_wallet(db, created["_id"]) is None
+
+    await db.wallets.update_one({"_id": created["_id"]}, {"$set": {"provisioning_next_attempt": None}})
+    assert await wallet_provisioning_service.provision_wallet(db, created["_id"]) == "active"
+
+    stored = await wallet.get_by_owner_id(db, owner_id=str(owner.inserted_id))
+    assert stored["paystack_account_id"] == "9930000001"
+    assert stored["provisioning_attempts"] == 2
+
+
+@pytest.mark.asyncio
+async def test_existing_dedicated_account_is_reused(db: AsyncIOMotorDatabase, mocker: MockerFixture):
+    owner = await db.customers.insert_one({"email": "buyer@example.com", "fName": "Test", "lName": "Buyer"})
+    created = await wallet.create(
+        db, obj_in=WalletCreate(owner_id=str(owner.inserted_id)), owner_type="customer"
+    )
+    mocker.patch(
+        "app.services.wallet_provisioning_service.paystack_service.create_customer",
+        AsyncMock(return_value={"id": 123, "customer_code": "CUS_123"}),
+    )
+    # A previous attempt timed out after Paystack had already created the account.
+    mocker.patch(
+        "app.services.wallet_provisioning_service.paystack_service.get_dedicated_account",
+        AsyncMock(return_value={"account_number": "9930000001"}),
+    )
+    mock_create_dva = mocker.patch(
+        "app.services.wallet_provisioning_service.paystack_service.create_dedicated_virtual_account",
+        AsyncMock(),
+    )
+
+    assert await wallet_provisioning_service.provision_wallet(db, created["_id"]) == "active"
+    mock_create_dva.assert_not_called()
+    stored = await wallet.get_by_owner_id(db, owner_id=str(owner.inserted_id))
+    assert stored["paystack_account_id"] == "9930000001"
@@ -0,0 +1,103 @@
+# tests/services/test_webhook_service.py
+
+import json
+import pytest
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
+from pytest_mock import MockerFixture
+
+from app.crud import wallet
+from app.crud.crud_ledger import ledger
+from app.db.indexes import INDEXES
+from app.models.wallet import WalletCreate
+from app.services import webhook_service
+
+
+def _deposit(event_id: int, amount_kobo: int, account_number: str = "9930000001") -> str:
+    return json.dumps({
+        "event": "charge.success",
+        "data": {
+            "id": event_id,
+            "amount": amount_kobo,
+            "reference": f"ref_{event_id}",
+            "authorization": {"receiver_bank_account_number": account_number},
+        },
+    })
+
+
+@pytest.mark.asyncio
+async def test_deposits_are_credited_once(db: AsyncIOMotorDatabase):
+    await db.webhook_events.create_indexes(INDEXES["webhook_events"])
+    await db.ledger_entries.create_indexes(INDEXES["ledger_entries"])
+    await wallet.create(db, obj_in=WalletCreate(owner_id="owner", balance=0.0), paystack_id="9930000001")
+
+    # Event 1 is redelivered within the batch and again in a later batch.
+    await webhook_service.process_batch(db, [_deposit(1, 5000), _deposit(2, 2500), _deposit(1, 5000)])
+    result = await webhook_service.process_batch(db, [_deposit(1, 5000)])
+
+    assert result["new"] == 0
+    stored = await wallet.get_by_owner_id(db, owner_id="owner")
+    assert stored["balance_kobo"] == 7500
+    assert await db.ledger_entries.count_documents({}) == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_event_is_retried_without_recrediting_the_rest(db: AsyncIOMotorDatabase, mocker: MockerFixture):
+    await db.webhook_events.create_indexes(INDEXES["webhook_events"])
+    await db.ledger_entries.create_indexes(INDEXES["ledger_entries"])
+    await wallet.create(db, obj_in=WalletCreate(owner_id="owner", balance=0.0), paystack_id="9930000001")
+
+    post = ledger.post
+
+    async def flaky_post(db, **kwargs):
+        if kwargs.get("event_id") == "charge.success:2":
+            raise PyMongoError("connection lost")
+        return await post(db, **kwargs)
+
+    # The bulk path fails as a whole, so the batch falls back to one event at a time.
+    mocker.patch.object(ledger, "post_batch", side_effect=PyMongoError("connection lost"))
+    mocker.patch.object(ledger, "post", side_effect=flaky_post)
+    first = await webhook_service.process_batch(db, [_deposit(1, 5000), _deposit(2, 2500)])
+    mocker.stopall()
+    # The consumer re-queues only the failed event, but even a full batch replay is safe.
+    second = await webhook_service.process_batch(db, [_deposit(1, 5000), _deposit(2, 2500)])
+
+    assert first["retry"] == [_deposit(2, 2500)]
+    assert second["new"] == 1
+    stored = await wallet.get_by_owner_id(db, owner_id="owner")
+    assert stored["balance_kobo"] == 7500
+    assert await db.webhook_events.count_documents({}) == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_is_credited_with_one_ledger_write(db: AsyncIOMotorDatabase, mocker: MockerFixture):
+    await db.webhook_events.create_indexes(INDEXES["webhook_events"])
+    await db.ledger_entries.create_indexes(INDEXES["ledger_entries"])
+    await wallet.create(db, obj_in=WalletCreate(owner_id="owner", balance=0.0), paystack_id="9930000001")
+    post_batch = mocker.spy(ledger, "post_batch")
+
+    result = await webhook_service.process_batch(db, [_deposit(i, 1000) for i in range(1, 6)])
+
+    assert result["credited"] == 5
+    post_batch.assert_called_once()
+    stored = await wallet.get_by_owner_id(db, owner_id="owner")
+    assert stored["balance_kobo"] == 5000
+
+
+@pytest.mark.asyncio
+async def test_deposit_before_its_wallet_is_parked_then_replayed(db: AsyncIOMotorDatabase):
+    await db.webhook_events.create_indexes(INDEXES["webhook_events"])
+    await db.ledger_entries.create_indexes(INDEXES["ledger_entries"])
+
+    result = await webhook_service.process_batch(db, [_deposit(1, 5000, account_number="9930000002")])
+
+    assert result["unmatched"] == 1
+    assert await db.webhook_events.count_documents({}) == 0
+    assert await db.unmatched_deposits.count_documents({}) == 1
+
+    await wallet.create(db, obj_in=WalletCreate(owner_id="late", balance=0.0), paystack_id="9930000002")
+    assert await webhook_service.replay_unmatched_deposits(db, "9930000002") == 1
+
+    stored = await wallet.get_by_owner_id(db, owner_id="late")
+    assert stored["balance_kobo"] == 5000
+    assert await db.unmatched_deposits.count_documents({}) == 0
@@ -0,0 +1,52 @@
+# tests/services/test_withdrawal_service.py
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pytest_mock import MockerFixture
+
+from app.crud import transaction, wallet
+from app.crud.crud_ledger import ledger
+from app.models.ledger import LedgerEntryType
+from app.models.wallet import WalletCreate, WithdrawalTransaction
+from app.services import withdrawal_service
+from app.services.payment_service import PaystackError, PaystackRejectedError
+
+
+async def _pending_withdrawal(db):
+    """A 40 NGN withdrawal already debited from a 100 NGN wallet."""
+    new_wallet = await wallet.create(db, obj_in=WalletCreate(owner_id="owner", balance=100.0), paystack_id="123")
+    await ledger.post(db, wallet_id=new_wallet["_id"], entry_type=LedgerEntryType.withdrawal,
+                      amount_kobo=-4000, reference="wd_1", require_funds=True)
+    return await transaction.create_withdrawal(db, withdrawal_in=WithdrawalTransaction(
+        wallet_id=str(new_wallet["_id"]), owner_id="owner", amount=40.0, reference="wd_1",
+    ))
+
+
+@pytest.mark.asyncio
+async def test_transfer_paystack_never_received_is_reversed_once(db: AsyncIOMotorDatabase, mocker: MockerFixture):
+    withdrawal = await _pending_withdrawal(db)
+    mocker.patch.object(
+        withdrawal_service.paystack_service, "verify_transfer",
+        side_effect=PaystackRejectedError("Transfer not found", 404),
+    )
+
+    assert await withdrawal_service.reconcile_withdrawal(db, withdrawal) == "transfer.failed"
+    # A late transfer.failed webhook for the same reference changes nothing.
+    assert await withdrawal_service.settle_transfer(db, reference="wd_1", event="transfer.failed") is None
+
+    assert (await wallet.get_by_owner_id(db, owner_id="owner"))["balance_kobo"] == 10000
+    assert (await db.transactions.find_one({"reference": "wd_1"}))["status"] == "failed"
+
+
+@pytest.mark.asyncio
+async def test_unknown_transfer_outcome_stays_pending(db: AsyncIOMotorDatabase, mocker: MockerFixture):
+    withdrawal = await _pending_withdrawal(db)
+    mocker.patch.object(
+        withdrawal_service.paystack_service, "verify_transfer", side_effect=PaystackError("timed out")
+    )
+
+    with pytest.raises(PaystackError):
+        await withdrawal_service.reconcile_withdrawal(db, withdrawal)
+
+    assert (await wallet.get_by_owner_id(db, owner_id="owner"))["balance_kobo"] == 6000
+    assert (await db.transactions.find_one({"reference": "wd_1"}))["status"] == "pending"
@@ -1,6 +1,41 @@
+from unittest.mock import AsyncMock
+
 from httpx import AsyncClient
+from pytest_mock import MockerFixture
+
+from app.db import mongodb, redis_client
 
 async def test_read_root(client: AsyncClient):
     response = await client.get("/")
     assert response.status_code == 200
-    assert response.json() == {"message": "Welcome to o42 Marketplace"}
\ No newline at end of file
+    assert response.json() == {"message": "Welcome to o42 Marketplace"}
+
+async def test_health_reports_status_without_error_details(client: AsyncClient, mocker: MockerFixture):
+    mocker.patch.object(mongodb.database, "client", mocker.MagicMock(
+        admin=mocker.MagicMock(command=AsyncMock(side_effect=Exception("auth failed for user 'o42:s3cret'")))
+    ))
+    mocker.patch.object(redis_client.redis_client, "client", mocker.MagicMock(
+        ping=AsyncMock(), connection_pool=redis_client.CountingConnectionPool(max_connections=5)
+    ))
+
+    response = await client.get("/health")
+
+    assert response.status_code == 503
+    data = response.json()
+    assert data["mongodb"]["status"] == "error"
+    assert data["redis"] == {"status": "ok", "max_connections": 5, "in_use_connections": 0}
+    assert "s3cret" not in response.text
+
+
+async def test_redis_pool_counts_checked_out_connections(mocker: MockerFixture):
+    connection = mocker.MagicMock()
+    mocker.patch("redis.asyncio.ConnectionPool.get_connection", AsyncMock(return_value=connection))
+    mocker.patch("redis.asyncio.ConnectionPool.release", AsyncMock())
+    pool = redis_client.CountingConnectionPool(max_connections=5)
+
+    first = await pool.get_connection("PING")
+    await pool.get_connection("PING")
+    assert pool.in_use == 2
+
+    await pool.release(first)
+    assert pool.in_use == 1
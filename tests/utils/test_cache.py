@@ -0,0 +1,27 @@
+# tests/utils/test_cache.py
+
+import asyncio
+import pytest
+from pytest_mock import MockerFixture
+from unittest.mock import AsyncMock
+
+from app.utils import cache
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_compute_once(mocker: MockerFixture):
+    redis = mocker.MagicMock(get=AsyncMock(return_value=None), set=AsyncMock(return_value=True), delete=AsyncMock())
+    mocker.patch("app.utils.cache.get_redis", AsyncMock(return_value=redis))
+    calls = 0
+
+    async def produce():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"total": 42}
+
+    results = await asyncio.gather(*(cache.get_or_set("things", "all", 30, produce) for _ in range(5)))
+
+    assert calls == 1
+    assert set(results) == {'{"total": 42}'}
+    redis.set.assert_any_call("cache:things:0:all", '{"total": 42}', ex=30)
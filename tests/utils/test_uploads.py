@@ -0,0 +1,29 @@
+# tests/utils/test_uploads.py
+
+import io
+import os
+import pytest
+from fastapi import UploadFile
+
+from app.utils.uploads import UploadTooLargeError, read_upload, spool_upload
+
+
+@pytest.mark.asyncio
+async def test_spool_upload_writes_unique_file_and_cleans_up():
+    payload = os.urandom(3 * 1024 * 1024)
+    async with spool_upload(UploadFile(io.BytesIO(payload)), max_bytes=len(payload), suffix=".mp4") as first:
+        async with spool_upload(UploadFile(io.BytesIO(payload)), max_bytes=len(payload), suffix=".mp4") as second:
+            assert first != second
+            with open(first, "rb") as f:
+                assert f.read() == payload
+    assert not os.path.exists(first)
+    assert not os.path.exists(second)
+
+
+@pytest.mark.asyncio
+async def test_uploads_over_the_cap_are_rejected():
+    with pytest.raises(UploadTooLargeError):
+        await read_upload(UploadFile(io.BytesIO(b"x" * 2048)), max_bytes=1024)
+    with pytest.raises(UploadTooLargeError):
+        async with spool_upload(UploadFile(io.BytesIO(b"x" * 2048)), max_bytes=1024):
+            pass